@@ -2,98 +2,569 @@
 """
 Analyze token usage from Claude Code session transcripts.
 Breaks down usage by main session and individual subagents.
+
+Usage:
+    analyze-token-usage.py <session-file.jsonl>
+    analyze-token-usage.py <dir|glob|file> [...] [--jobs N]   # batch rollup
+    analyze-token-usage.py sessions.tar.zst                   # compressed archive
+    analyze-token-usage.py <after...> --baseline <before...>  # A/B comparison
+    analyze-token-usage.py <dir|glob|file> --export usage.npz # columnar export
 """
 
+import argparse
+import functools
+import glob
+import gzip
+import hashlib
 import json
+import mmap
+import multiprocessing
+import os
+import re
+import sqlite3
 import sys
-from pathlib import Path
+import tarfile
+import time
+import zlib
 from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path, PurePosixPath
 
-def analyze_main_session(filepath):
-    """Analyze a session file and return token usage broken down by agent."""
-    main_usage = {
-        'input_tokens': 0,
-        'output_tokens': 0,
-        'cache_creation': 0,
-        'cache_read': 0,
-        'messages': 0
-    }
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst transcripts and archives
+    zstandard = None
 
-    # Track usage per subagent
-    subagent_usage = defaultdict(lambda: {
-        'input_tokens': 0,
-        'output_tokens': 0,
-        'cache_creation': 0,
-        'cache_read': 0,
-        'messages': 0,
-        'description': None
-    })
+# Every line we count carries a usage block (assistant message usage or a
+# subagent toolUseResult usage), so lines without this needle are skipped
+# before any JSON decoding happens.
+USAGE_NEEDLE = b'"usage"'
+
+# Compressed transcripts are recognized by extension first, then by magic bytes
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.tgz': 'gzip', '.zst': 'zstd', '.tzst': 'zstd'}
+COMPRESSION_MAGIC = ((b'\x1f\x8b', 'gzip'), (b'\x28\xb5\x2f\xfd', 'zstd'))
+TRANSCRIPT_SUFFIXES = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.zst', '.tzst')
+# Decompressed bytes read per chunk when streaming
+STREAM_CHUNK = 1 << 20
+
+READ_ERRORS = (OSError, ValueError, EOFError, tarfile.TarError, zlib.error)
+if zstandard is not None:
+    READ_ERRORS += (zstandard.ZstdError,)
+
+def detect_compression(filepath):
+    """Return 'gzip', 'zstd' or None for a file, by extension or magic bytes."""
+    codec = COMPRESSION_SUFFIXES.get(Path(filepath).suffix.lower())
+    if codec is not None:
+        return codec
+    with open(filepath, 'rb') as f:
+        head = f.read(4)
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+def _decompressing_reader(raw, codec):
+    """Wrap a binary stream so reads return decompressed bytes."""
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd input requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    return raw
+
+def open_decompressed(filepath):
+    """Open a transcript or archive for streaming reads, decompressing on the fly."""
+    codec = detect_compression(filepath)
+    if codec == 'gzip':
+        return gzip.open(filepath, 'rb')
+    raw = open(filepath, 'rb')
+    try:
+        return _decompressing_reader(raw, codec)
+    except ValueError:
+        raw.close()
+        raise
+
+def is_transcript_name(name):
+    """Return True for *.jsonl transcripts, plain or compressed."""
+    return str(name).lower().endswith(TRANSCRIPT_SUFFIXES)
+
+def transcript_stem(filepath):
+    """Return a transcript's name without .jsonl and compression suffixes (its session or agent id)."""
+    path = Path(filepath)
+    if path.suffix.lower() in COMPRESSION_SUFFIXES:
+        path = path.with_suffix('')
+    if path.suffix.lower() == '.jsonl':
+        path = path.with_suffix('')
+    return path.name
+
+def is_archive(filepath):
+    """Return True for tar archives of sessions (plain, gzip or zstd)."""
+    return str(filepath).lower().endswith(ARCHIVE_SUFFIXES)
+
+def _iter_needle_lines(buf, pos, limit, needle):
+    """Yield the lines of buf[pos:limit] containing needle (every line if None).
+
+    Works on any buffer with find/rfind and slicing (mmap or bytes), jumping
+    from one needle hit to the next.
+    """
+    while pos < limit:
+        hit = pos if needle is None else buf.find(needle, pos, limit)
+        if hit < 0:
+            break
+        newline = buf.rfind(b'\n', pos, hit)
+        line_start = newline + 1 if newline >= 0 else pos
+        line_end = buf.find(b'\n', hit, limit)
+        if line_end < 0:
+            line_end = limit
+        pos = line_end + 1
+        yield buf[line_start:line_end]
+
+def _iter_stream_lines(stream, needle, start, partial_tail, position):
+    """Yield matching lines from a binary stream, read in STREAM_CHUNK pieces.
+
+    Bytes before start are read and discarded. position['end_offset'] and
+    position['bytes'] track decompressed offsets as the scan advances.
+    """
+    remaining = start
+    while remaining > 0:
+        skipped = stream.read(min(remaining, STREAM_CHUNK))
+        if not skipped:
+            break
+        remaining -= len(skipped)
+    offset = start - remaining
+    position['end_offset'] = offset
+    pending = b''
+    while True:
+        chunk = stream.read(STREAM_CHUNK)
+        if not chunk:
+            break
+        offset += len(chunk)
+        buf = pending + chunk
+        last_newline = buf.rfind(b'\n')
+        if last_newline < 0:
+            pending = buf
+            continue
+        pending = buf[last_newline + 1:]
+        position['end_offset'] = offset - len(pending)
+        yield from _iter_needle_lines(buf, 0, last_newline, needle)
+    position['bytes'] = offset - start
+    if pending and partial_tail:
+        yield from _iter_needle_lines(pending, 0, len(pending), needle)
+
+def iter_transcript_records(filepath, needle=None, stats=None, start=0, partial_tail=True):
+    """Yield decoded transcript lines, optionally only those containing needle.
+
+    Plain files are scanned through a read-only memory map. With a needle the
+    scanner jumps from one hit to the next with mmap.find, so lines in
+    between are never copied or decoded; with needle=None every line is
+    decoded. Memory stays constant regardless of transcript size.
+
+    gzip/zstd files are decompressed as a stream, in STREAM_CHUNK pieces and
+    without temp files; filepath may also be an open binary stream such as
+    an archive member. Offsets then count decompressed bytes.
+
+    start is a byte offset at a line boundary to resume from. With
+    partial_tail=False a final line without a trailing newline (still being
+    written) is left for the next scan. If stats is a dict, it is filled with
+    start/end_offset/bytes/seconds/decoded/mb_per_s once the scan finishes;
+    end_offset is just past the last complete line. Compressed files also
+    record codec and compressed_bytes (the size read from disk).
+    """
+    started = time.perf_counter()
+    position = {'end_offset': start, 'bytes': 0}
+    decoded = 0
+    codec = None
+
+    if hasattr(filepath, 'read'):
+        lines = _iter_stream_lines(filepath, needle, start, partial_tail, position)
+        source = None
+    else:
+        codec = detect_compression(filepath)
+        source = open(filepath, 'rb') if codec is None else open_decompressed(filepath)
 
-    with open(filepath, 'r') as f:
-        for line in f:
+    try:
+        if codec is not None:
+            lines = _iter_stream_lines(source, needle, start, partial_tail, position)
+        elif source is not None:
+            lines = _iter_mmap_lines(source, needle, start, partial_tail, position)
+        for line in lines:
             try:
-                data = json.loads(line)
-
-                # Main session assistant messages
-                if data.get('type') == 'assistant' and 'message' in data:
-                    main_usage['messages'] += 1
-                    msg_usage = data['message'].get('usage', {})
-                    main_usage['input_tokens'] += msg_usage.get('input_tokens', 0)
-                    main_usage['output_tokens'] += msg_usage.get('output_tokens', 0)
-                    main_usage['cache_creation'] += msg_usage.get('cache_creation_input_tokens', 0)
-                    main_usage['cache_read'] += msg_usage.get('cache_read_input_tokens', 0)
-
-                # Subagent tool results
-                if data.get('type') == 'user' and 'toolUseResult' in data:
-                    result = data['toolUseResult']
-                    if 'usage' in result and 'agentId' in result:
-                        agent_id = result['agentId']
-                        usage = result['usage']
-
-                        # Get description from prompt if available
-                        if subagent_usage[agent_id]['description'] is None:
-                            prompt = result.get('prompt', '')
-                            # Extract first line as description
-                            first_line = prompt.split('\n')[0] if prompt else f"agent-{agent_id}"
-                            if first_line.startswith('You are '):
-                                first_line = first_line[8:]  # Remove "You are "
-                            subagent_usage[agent_id]['description'] = first_line[:60]
-
-                        subagent_usage[agent_id]['messages'] += 1
-                        subagent_usage[agent_id]['input_tokens'] += usage.get('input_tokens', 0)
-                        subagent_usage[agent_id]['output_tokens'] += usage.get('output_tokens', 0)
-                        subagent_usage[agent_id]['cache_creation'] += usage.get('cache_creation_input_tokens', 0)
-                        subagent_usage[agent_id]['cache_read'] += usage.get('cache_read_input_tokens', 0)
-            except:
-                pass
-
-    return main_usage, dict(subagent_usage)
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            decoded += 1
+            yield record
+    finally:
+        if source is not None:
+            source.close()
 
-def format_tokens(n):
-    """Format token count with thousands separators."""
-    return f"{n:,}"
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        scanned = position['bytes']
+        stats['start'] = start
+        stats['end_offset'] = position['end_offset']
+        stats['bytes'] = scanned
+        stats['seconds'] = elapsed
+        stats['decoded'] = decoded
+        stats['mb_per_s'] = (scanned / 1_000_000) / elapsed if elapsed > 0 else 0.0
+        if codec is not None:
+            stats['codec'] = codec
+            stats['compressed_bytes'] = os.path.getsize(filepath)
 
-def calculate_cost(usage, input_cost_per_m=3.0, output_cost_per_m=15.0):
-    """Calculate estimated cost in dollars."""
-    total_input = usage['input_tokens'] + usage['cache_creation'] + usage['cache_read']
-    input_cost = total_input * input_cost_per_m / 1_000_000
-    output_cost = usage['output_tokens'] * output_cost_per_m / 1_000_000
-    return input_cost + output_cost
+def _iter_mmap_lines(f, needle, start, partial_tail, position):
+    """Yield matching lines of a plain file through a read-only memory map."""
+    size = os.fstat(f.fileno()).st_size
+    position['bytes'] = max(size - start, 0)
+    if size <= start:
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        last_newline = mm.rfind(b'\n', start)
+        position['end_offset'] = last_newline + 1 if last_newline >= 0 else start
+        limit = size if partial_tail else position['end_offset']
+        yield from _iter_needle_lines(mm, start, limit, needle)
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: analyze-token-usage.py <session-file.jsonl>")
-        sys.exit(1)
+def iter_usage_records(filepath, stats=None, start=0, partial_tail=True):
+    """Yield only the transcript lines that contain the usage needle."""
+    return iter_transcript_records(filepath, USAGE_NEEDLE, stats, start, partial_tail)
 
-    main_session_file = sys.argv[1]
+# ---------------------------------------------------------------------------
+# Pricing: per-model rates, applied per message
+# ---------------------------------------------------------------------------
 
-    if not Path(main_session_file).exists():
-        print(f"Error: Session file not found: {main_session_file}")
-        sys.exit(1)
+# List prices in dollars per million tokens, matched in order against the
+# lowercased message.model (dated ids such as claude-sonnet-4-5-20250929 and
+# bare Agent-tool aliases such as "opus"). cache_write is the 5-minute TTL
+# rate; 1-hour cache writes are billed at twice the input rate.
+MODEL_PRICING = [
+    (r'opus-4-(?:1-)?\d{8}|opus-4$|opus-4-1$|3-opus',
+     {'input': 15.00, 'output': 75.00, 'cache_write': 18.75, 'cache_read': 1.50}),
+    (r'opus',
+     {'input': 5.00, 'output': 25.00, 'cache_write': 6.25, 'cache_read': 0.50}),
+    (r'3-5-haiku|haiku-3-5',
+     {'input': 0.80, 'output': 4.00, 'cache_write': 1.00, 'cache_read': 0.08}),
+    (r'3-haiku',
+     {'input': 0.25, 'output': 1.25, 'cache_write': 0.30, 'cache_read': 0.03}),
+    (r'haiku',
+     {'input': 1.00, 'output': 5.00, 'cache_write': 1.25, 'cache_read': 0.10}),
+    (r'sonnet',
+     {'input': 3.00, 'output': 15.00, 'cache_write': 3.75, 'cache_read': 0.30}),
+]
+# Unknown or missing models are priced at Sonnet rates
+DEFAULT_PRICING = MODEL_PRICING[-1][1]
+
+@functools.lru_cache(maxsize=None)
+def price_for_model(model):
+    """Return the per-million-token rates for a model id or alias."""
+    name = (model or '').lower()
+    for pattern, rates in MODEL_PRICING:
+        if re.search(pattern, name):
+            return rates
+    return DEFAULT_PRICING
+
+def message_cost(api_usage, model=None):
+    """Return the dollar cost of one API usage block at the model's rates."""
+    rates = price_for_model(model)
+    cache_creation = api_usage.get('cache_creation_input_tokens', 0) or 0
+    breakdown = api_usage.get('cache_creation')
+    one_hour = (breakdown.get('ephemeral_1h_input_tokens', 0) or 0) if isinstance(breakdown, dict) else 0
+    one_hour = min(one_hour, cache_creation)
+    return ((api_usage.get('input_tokens', 0) or 0) * rates['input']
+            + (api_usage.get('output_tokens', 0) or 0) * rates['output']
+            + (cache_creation - one_hour) * rates['cache_write']
+            + one_hour * rates['input'] * 2
+            + (api_usage.get('cache_read_input_tokens', 0) or 0) * rates['cache_read']) / 1_000_000
+
+# ---------------------------------------------------------------------------
+# Usage accumulation
+# ---------------------------------------------------------------------------
+
+USAGE_KEYS = ('input_tokens', 'output_tokens', 'cache_creation', 'cache_read', 'messages', 'cost')
+MAIN_DESCRIPTION = 'Main session (coordinator)'
+# Tool names that dispatch subagents (Task is the pre-rename name)
+AGENT_TOOLS = ('Agent', 'Task')
+
+def new_usage():
+    """Return a zeroed usage accumulator."""
+    return {key: 0 for key in USAGE_KEYS}
+
+def add_api_usage(target, api_usage, model=None, messages=1):
+    """Add one API usage block (Anthropic field names) to a usage accumulator.
+
+    messages is 0 for the usage increase of a message already counted.
+    """
+    target['messages'] += messages
+    target['input_tokens'] += api_usage.get('input_tokens', 0) or 0
+    target['output_tokens'] += api_usage.get('output_tokens', 0) or 0
+    target['cache_creation'] += api_usage.get('cache_creation_input_tokens', 0) or 0
+    target['cache_read'] += api_usage.get('cache_read_input_tokens', 0) or 0
+    target['cost'] += message_cost(api_usage, model)
+
+def merge_usage(target, usage):
+    """Add one usage accumulator into another."""
+    for key in USAGE_KEYS:
+        target[key] += usage[key]
+
+# Recently counted message.ids kept per context. The lines of one streamed
+# message are adjacent in a transcript, so a bounded window (oldest evicted
+# first) dedups as well as a full set while keeping checkpoints small.
+SEEN_IDS_LIMIT = 4096
+# Usage counters repeated (and possibly grown) on every line of a message
+MESSAGE_COUNTERS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens',
+                    'cache_read_input_tokens', 'ephemeral_1h_input_tokens')
+
+def new_context():
+    """Return the per-session state used to price lines and count repeated messages once.
+
+    seen_ids is an insertion-ordered dict mapping recently counted
+    message.ids to the usage counted for them (a dict so it round-trips
+    through JSON checkpoints).
+    """
+    return {'model': None, 'agent_models': {}, 'seen_ids': {}}
+
+def _message_counters(api_usage):
+    """Flatten an API usage block into MESSAGE_COUNTERS values."""
+    breakdown = api_usage.get('cache_creation')
+    one_hour = (breakdown.get('ephemeral_1h_input_tokens', 0) or 0) if isinstance(breakdown, dict) else 0
+    counters = {key: api_usage.get(key, 0) or 0 for key in MESSAGE_COUNTERS[:-1]}
+    counters['ephemeral_1h_input_tokens'] = one_hour
+    return counters
+
+def usage_increase(seen, message_id, api_usage):
+    """Return the usage of one message line not yet counted for its message.id.
+
+    A message written as several lines repeats its usage on each, and
+    output_tokens may grow as later content blocks stream in. The first
+    line counts in full and later lines add only their per-counter
+    increase, so a message totals the maximum of each counter over its
+    lines in a single pass. seen (message.id -> counted counters) is
+    updated and bounded to SEEN_IDS_LIMIT ids.
 
-    # Analyze the session
-    main_usage, subagent_usage = analyze_main_session(main_session_file)
+    Returns (api_usage, messages) with messages 1 for the first line and 0
+    for an increase, or None when a later line adds nothing.
+    """
+    counters = _message_counters(api_usage)
+    counted = seen.get(message_id)
+    if counted is None:
+        seen[message_id] = counters
+        if len(seen) > SEEN_IDS_LIMIT:
+            del seen[next(iter(seen))]
+        return api_usage, 1
+    increase = {key: max(value - counted.get(key, 0), 0) for key, value in counters.items()}
+    if not any(increase.values()):
+        return None
+    for key, value in increase.items():
+        counted[key] = counted.get(key, 0) + value
+    increase['cache_creation'] = {'ephemeral_1h_input_tokens': increase.pop('ephemeral_1h_input_tokens')}
+    return increase, 0
 
+def _describe_agent(agent_id, result):
+    """Derive a short description for a subagent from its dispatch prompt."""
+    prompt = result.get('prompt', '')
+    # Extract first line as description
+    first_line = prompt.split('\n')[0] if prompt else f"agent-{agent_id}"
+    if first_line.startswith('You are '):
+        first_line = first_line[8:]  # Remove "You are "
+    return first_line[:60]
+
+def _tool_result_id(data):
+    """Return the tool_use_id answered by a user line, if any."""
+    content = data.get('message', {}).get('content') if isinstance(data.get('message'), dict) else None
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict) and block.get('type') == 'tool_result':
+                return block.get('tool_use_id')
+    return None
+
+def extract_usage_event(data, context=None):
+    """Classify one decoded transcript line as a usage event.
+
+    Returns (agent_id, result, api_usage, model, messages) where agent_id is
+    None for a main session assistant message, result is the subagent's
+    toolUseResult dict and messages is the number of new messages (1, or 0
+    for a later line of one already counted); returns None for lines that
+    carry no countable usage.
+
+    With a context from new_context(), subagent usage is attributed to the
+    model requested in its Agent tool call, falling back to the coordinator's
+    current model (subagents inherit it by default), and an assistant message
+    written as several lines (one per content block, sharing message.id) is
+    counted once: later lines update the context and return only the usage
+    they add (see usage_increase), or None.
+    """
+    # Main session assistant messages
+    if data.get('type') == 'assistant' and isinstance(data.get('message'), dict):
+        message = data['message']
+        model = message.get('model')
+        if context is not None:
+            if model and model != '<synthetic>':
+                context['model'] = model
+            for block in message.get('content') or []:
+                if (isinstance(block, dict) and block.get('type') == 'tool_use'
+                        and block.get('name') in AGENT_TOOLS
+                        and isinstance(block.get('input'), dict) and block['input'].get('model')):
+                    context['agent_models'][block.get('id')] = block['input']['model']
+            message_id = message.get('id')
+            if message_id is not None:
+                counted = usage_increase(context.setdefault('seen_ids', {}), message_id,
+                                         message.get('usage') or {})
+                if counted is None:
+                    return None
+                api_usage, messages = counted
+                return None, None, api_usage, model, messages
+        return None, None, message.get('usage') or {}, model, 1
+
+    # Subagent tool results
+    if data.get('type') == 'user' and 'toolUseResult' in data:
+        result = data['toolUseResult']
+        # toolUseResult is a plain string for most non-Agent tools
+        if isinstance(result, dict) and 'usage' in result and 'agentId' in result:
+            model = result.get('model')
+            if context is not None:
+                requested = context['agent_models'].pop(_tool_result_id(data), None)
+                model = model or requested or context['model']
+            return result['agentId'], result, result['usage'] or {}, model, 1
+
+    return None
+
+def accumulate_record(data, main_usage, subagent_usage, daily=None, context=None):
+    """Add one decoded transcript line to the main/subagent accumulators.
+
+    subagent_usage is a plain dict keyed by agentId so that it round-trips
+    through JSON checkpoints unchanged. Each message is priced at its own
+    model's rates as it is added.
+    """
+    event = extract_usage_event(data, context)
+    if event is None:
+        return
+    agent_id, result, api_usage, model, messages = event
+
+    if agent_id is None:
+        add_api_usage(main_usage, api_usage, model, messages)
+    else:
+        agent = subagent_usage.get(agent_id)
+        if agent is None:
+            agent = subagent_usage[agent_id] = dict(
+                new_usage(), description=_describe_agent(agent_id, result))
+        add_api_usage(agent, api_usage, model, messages)
+
+    if daily is not None:
+        day = str(data.get('timestamp') or '')[:10] or 'unknown'
+        add_api_usage(daily.setdefault(day, new_usage()), api_usage, model, messages)
+
+def analyze_main_session(filepath, stats=None, daily=None):
+    """Analyze a session file and return token usage broken down by agent.
+
+    If daily is a dict, usage is also accumulated per UTC date
+    (YYYY-MM-DD from each line's timestamp) for batch rollups.
+    """
+    main_usage = new_usage()
+    subagent_usage = {}
+    context = new_context()
+    for data in iter_usage_records(filepath, stats):
+        accumulate_record(data, main_usage, subagent_usage, daily, context)
+    return main_usage, subagent_usage
+
+# ---------------------------------------------------------------------------
+# Incremental mode: byte-offset checkpoints for live sessions
+# ---------------------------------------------------------------------------
+
+CHECKPOINT_VERSION = 4
+# Leading bytes hashed to detect a transcript that was replaced or rewritten
+FINGERPRINT_BYTES = 4096
+
+def default_checkpoint_path(filepath):
+    """Return the sidecar checkpoint path for a session file."""
+    return f"{filepath}.usage-checkpoint.json"
+
+def _fingerprint(filepath, length):
+    """Hash the first bytes of the file, up to the checkpointed offset."""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read(min(length, FINGERPRINT_BYTES))).hexdigest()
+
+def load_checkpoint(filepath, checkpoint_path):
+    """Return the saved running totals for filepath, or a fresh state.
+
+    A checkpoint is discarded when its version differs, the file shrank below
+    the saved offset, or the leading bytes no longer match (file replaced).
+    """
+    fresh = {'offset': 0, 'main': new_usage(), 'subagents': {}, 'context': new_context()}
+    try:
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return fresh
+    if not isinstance(state, dict) or state.get('version') != CHECKPOINT_VERSION:
+        return fresh
+    offset = state.get('offset', 0)
+    if offset > os.path.getsize(filepath) or state.get('fingerprint') != _fingerprint(filepath, offset):
+        return fresh
+    return state
+
+def save_checkpoint(filepath, checkpoint_path, state):
+    """Atomically write the running totals and byte offset to the sidecar."""
+    state = dict(state, version=CHECKPOINT_VERSION, path=str(filepath),
+                 fingerprint=_fingerprint(filepath, state['offset']))
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def update_session_checkpoint(filepath, checkpoint_path, stats=None):
+    """Parse only the lines appended since the last checkpoint and save it.
+
+    Returns the updated state dict with offset, main and subagents keys.
+    """
+    stats = {} if stats is None else stats
+    state = load_checkpoint(filepath, checkpoint_path)
+    for data in iter_usage_records(filepath, stats, start=state['offset'], partial_tail=False):
+        accumulate_record(data, state['main'], state['subagents'], context=state['context'])
+    state['offset'] = stats['end_offset']
+    save_checkpoint(filepath, checkpoint_path, state)
+    return state
+
+def follow_session(filepath, checkpoint_path, interval):
+    """Refresh the session report whenever new lines are appended (Ctrl-C exits)."""
+    last_offset = None
+    try:
+        while True:
+            stats = {}
+            state = update_session_checkpoint(filepath, checkpoint_path, stats)
+            if state['offset'] != last_offset:
+                if sys.stdout.isatty():
+                    print("\033[2J\033[H", end="")
+                print_session_report(state['main'], state['subagents'], stats)
+                last_offset = state['offset']
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+
+def format_tokens(n):
+    """Format token count with thousands separators."""
+    return f"{n:,}"
+
+def calculate_cost(usage, model=None):
+    """Calculate estimated cost in dollars.
+
+    Accumulators built by add_api_usage carry a 'cost' already priced per
+    message at each message's model rates. Otherwise the four counters are
+    priced at model's rates, with cache writes and reads at their own rates.
+    """
+    if 'cost' in usage:
+        return usage['cost']
+    rates = price_for_model(model)
+    return (usage['input_tokens'] * rates['input']
+            + usage['output_tokens'] * rates['output']
+            + usage['cache_creation'] * rates['cache_write']
+            + usage['cache_read'] * rates['cache_read']) / 1_000_000
+
+def print_session_report(main_usage, subagent_usage, scan_stats):
+    """Print the per-agent breakdown and totals for a single session."""
     print("=" * 100)
     print("TOKEN USAGE ANALYSIS")
     print("=" * 100)
@@ -129,20 +600,10 @@ def main():
     print("-" * 100)
 
     # Calculate totals
-    total_usage = {
-        'input_tokens': main_usage['input_tokens'],
-        'output_tokens': main_usage['output_tokens'],
-        'cache_creation': main_usage['cache_creation'],
-        'cache_read': main_usage['cache_read'],
-        'messages': main_usage['messages']
-    }
-
+    total_usage = new_usage()
+    merge_usage(total_usage, main_usage)
     for usage in subagent_usage.values():
-        total_usage['input_tokens'] += usage['input_tokens']
-        total_usage['output_tokens'] += usage['output_tokens']
-        total_usage['cache_creation'] += usage['cache_creation']
-        total_usage['cache_read'] += usage['cache_read']
-        total_usage['messages'] += usage['messages']
+        merge_usage(total_usage, usage)
 
     total_input = total_usage['input_tokens'] + total_usage['cache_creation'] + total_usage['cache_read']
     total_tokens = total_input + total_usage['output_tokens']
@@ -160,9 +621,2008 @@ def main():
     print(f"  Total tokens:             {format_tokens(total_tokens)}")
     print()
     print(f"  Estimated cost: ${total_cost:.2f}")
-    print("  (at $3/$15 per M tokens for input/output)")
+    print("  (priced per message by model: input, output, cache write and cache read rates)")
+    print()
+    if 'index_seconds' in scan_stats:
+        print(f"  Answered from index in {scan_stats['index_seconds'] * 1000:,.1f} ms")
+    else:
+        print(f"  Scanned {scan_stats['bytes'] / 1_000_000:,.1f} MB in {scan_stats['seconds']:.2f}s "
+              f"({scan_stats['mb_per_s']:,.1f} MB/s, {format_tokens(scan_stats['decoded'])} lines decoded)")
+        if scan_stats.get('codec'):
+            print(f"  ({scan_stats['codec']}: {scan_stats['compressed_bytes'] / 1_000_000:,.1f} MB read from disk)")
+    if scan_stats.get('start'):
+        print(f"  (incremental: resumed from checkpoint at byte {format_tokens(scan_stats['start'])})")
+    print()
+    print("=" * 100)
+
+# ---------------------------------------------------------------------------
+# Batch mode: many sessions across a process pool
+# ---------------------------------------------------------------------------
+
+def _is_sidechain_file(path):
+    """Return True for subagent transcripts, already counted via toolUseResult."""
+    return path.parent.name == 'subagents' or path.name.startswith('agent-')
+
+def discover_session_files(paths):
+    """Expand files, directories and glob patterns into session transcript paths.
+
+    Directories are searched recursively for *.jsonl (also .jsonl.gz and
+    .jsonl.zst), skipping subagent sidechain transcripts so their usage is
+    not counted twice. Explicitly named files, including tar archives of
+    sessions, are always kept.
+    """
+    found = []
+    for arg in paths:
+        arg = os.path.expanduser(arg)
+        matches = sorted(glob.glob(arg, recursive=True)) if glob.has_magic(arg) else [arg]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir():
+                found.extend(f for f in sorted(path.rglob('*.jsonl*'))
+                             if f.is_file() and is_transcript_name(f.name) and not _is_sidechain_file(f))
+            elif path.is_file():
+                found.append(path)
+    return list(dict.fromkeys(found))
+
+def iter_archive_sessions(archive_path):
+    """Yield (member_path, stream) for each main session transcript in a tar archive.
+
+    The archive is read in a single streaming pass (tarfile 'r|' mode over the
+    decompressed stream), so each member must be consumed before the next is
+    requested. Compressed members (.jsonl.gz, .jsonl.zst) are decompressed too.
+    """
+    with open_decompressed(archive_path) as raw, tarfile.open(fileobj=raw, mode='r|') as tar:
+        for member in tar:
+            name = PurePosixPath(member.name)
+            if not member.isfile() or not is_transcript_name(name) or _is_sidechain_file(name):
+                continue
+            member_stream = tar.extractfile(member)
+            codec = COMPRESSION_SUFFIXES.get(name.suffix.lower())
+            yield name, _decompressing_reader(member_stream, codec)
+
+def _session_result(path, project, source):
+    """Analyze one session (a file path or open stream) into a batch result."""
+    stats = {}
+    daily = {}
+    main_usage, subagent_usage = analyze_main_session(source, stats, daily)
+    return {
+        'path': str(path),
+        'project': project,
+        'main': main_usage,
+        'subagents': subagent_usage,
+        'daily': daily,
+        'bytes': stats['bytes'],
+    }
+
+def _batch_worker(filepath):
+    """Analyze one session file or archive in a pool worker.
+
+    Returns a list of small picklable results, one per session (archives
+    hold many); a read error becomes an error result.
+    """
+    if not is_archive(filepath):
+        try:
+            return [_session_result(filepath, Path(filepath).parent.name, filepath)]
+        except READ_ERRORS as e:
+            return [{'path': str(filepath), 'error': str(e)}]
+    results = []
+    try:
+        for name, stream in iter_archive_sessions(filepath):
+            results.append(_session_result(f"{filepath}:{name}", name.parent.name, stream))
+    except READ_ERRORS as e:
+        results.append({'path': str(filepath), 'error': str(e)})
+    return results
+
+def _new_rollup():
+    """Return an empty batch rollup."""
+    return {
+        'projects': defaultdict(new_usage),
+        'project_sessions': defaultdict(int),
+        'days': defaultdict(new_usage),
+        'agents': defaultdict(new_usage),
+        'total': new_usage(),
+        'sessions': 0,
+        'bytes': 0,
+        'errors': [],
+    }
+
+def merge_session_result(rollup, result):
+    """Fold one worker result into the per-project/day/agent rollup."""
+    if 'error' in result:
+        rollup['errors'].append((result['path'], result['error']))
+        return
+    rollup['sessions'] += 1
+    rollup['bytes'] += result['bytes']
+    project = result['project']
+    rollup['project_sessions'][project] += 1
+
+    session_total = new_usage()
+    merge_usage(session_total, result['main'])
+    merge_usage(rollup['agents'][MAIN_DESCRIPTION], result['main'])
+    for agent_id, usage in result['subagents'].items():
+        merge_usage(session_total, usage)
+        merge_usage(rollup['agents'][usage['description'] or f"agent-{agent_id}"], usage)
+
+    merge_usage(rollup['projects'][project], session_total)
+    merge_usage(rollup['total'], session_total)
+    for day, usage in result['daily'].items():
+        merge_usage(rollup['days'][day], usage)
+
+def _print_progress(done, total, scanned_bytes, started):
+    """Draw a single-line progress indicator on stderr."""
+    elapsed = time.perf_counter() - started
+    rate = (scanned_bytes / 1_000_000) / elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r  [{done:>{len(str(total))}}/{total}] {done / total:6.1%}  "
+                     f"{scanned_bytes / 1_000_000:,.1f} MB  {rate:,.1f} MB/s")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+def _map_files(worker, files, jobs):
+    """Yield worker(file) for every file, across a process pool when jobs > 1.
+
+    Results arrive in completion order (imap_unordered), so the slowest
+    transcript never holds back the others. The pool is closed and joined
+    once the generator is exhausted or discarded.
+    """
+    if jobs <= 1 or len(files) <= 1:
+        yield from map(worker, files)
+        return
+    pool = multiprocessing.Pool(min(jobs, len(files)))
+    try:
+        yield from pool.imap_unordered(worker, files, chunksize=max(1, len(files) // (jobs * 8)))
+    finally:
+        pool.close()
+        pool.join()
+
+def run_batch(files, jobs, progress=True):
+    """Analyze many sessions across a process pool and return the merged rollup.
+
+    Files are handed out by _map_files; each worker returns only its small
+    usage dicts.
+    An archive is one work item and is read sequentially by its worker.
+    """
+    rollup = _new_rollup()
+    started = time.perf_counter()
+    total = len(files)
+    for done, file_results in enumerate(_map_files(_batch_worker, files, jobs), 1):
+        for result in file_results:
+            merge_session_result(rollup, result)
+        if progress:
+            _print_progress(done, total, rollup['bytes'], started)
+    rollup['seconds'] = time.perf_counter() - started
+    return rollup
+
+def _print_rollup_table(title, label, rows, counts=None):
+    """Print one rollup table of (key, usage) rows."""
+    print(f"{title}:")
+    print("-" * 100)
+    print(f"{label:<50} {'Sess' if counts is not None else 'Msgs':>6} {'Input':>10} {'Output':>10} {'Cache':>12} {'Cost':>9}")
+    print("-" * 100)
+    for key, usage in rows:
+        count = counts[key] if counts is not None else usage['messages']
+        print(f"{str(key)[:50]:<50} {count:>6} "
+              f"{format_tokens(usage['input_tokens']):>10} "
+              f"{format_tokens(usage['output_tokens']):>10} "
+              f"{format_tokens(usage['cache_read']):>12} "
+              f"${calculate_cost(usage):>8.2f}")
+    print()
+
+def _by_cost(item):
+    """Sort key for (key, usage) rows: most expensive first, ties by name."""
+    return -calculate_cost(item[1]), str(item[0])
+
+def print_batch_report(rollup, top=20):
+    """Print per-project, per-day and per-agent-description rollups."""
+    print("=" * 100)
+    print("TOKEN USAGE ANALYSIS (BATCH)")
+    print("=" * 100)
+    print()
+    _print_rollup_table("By project", "Project",
+                        sorted(rollup['projects'].items(), key=_by_cost),
+                        rollup['project_sessions'])
+    _print_rollup_table("By day (UTC)", "Day", sorted(rollup['days'].items()))
+    _print_rollup_table(f"By agent description (top {top})", "Description",
+                        sorted(rollup['agents'].items(), key=_by_cost)[:top])
+
+    total = rollup['total']
+    print("TOTALS:")
+    print(f"  Sessions:               {format_tokens(rollup['sessions'])}")
+    print(f"  Total messages:         {format_tokens(total['messages'])}")
+    print(f"  Input tokens:           {format_tokens(total['input_tokens'])}")
+    print(f"  Output tokens:          {format_tokens(total['output_tokens'])}")
+    print(f"  Cache creation tokens:  {format_tokens(total['cache_creation'])}")
+    print(f"  Cache read tokens:      {format_tokens(total['cache_read'])}")
+    print()
+    print(f"  Estimated cost: ${calculate_cost(total):.2f}")
+    print("  (priced per message by model: input, output, cache write and cache read rates)")
+    print()
+    seconds = rollup['seconds']
+    if rollup.get('from_index'):
+        print(f"  Answered from index in {seconds * 1000:,.1f} ms "
+              f"({rollup['bytes'] / 1_000_000:,.1f} MB of transcripts indexed)")
+    else:
+        rate = (rollup['bytes'] / 1_000_000) / seconds if seconds > 0 else 0.0
+        print(f"  Scanned {rollup['bytes'] / 1_000_000:,.1f} MB in {seconds:.2f}s ({rate:,.1f} MB/s)")
+    if rollup['errors']:
+        print()
+        print(f"  Skipped {len(rollup['errors'])} unreadable file(s):")
+        for path, error in rollup['errors'][:10]:
+            print(f"    {path}: {error}")
+    print()
+    print("=" * 100)
+
+# ---------------------------------------------------------------------------
+# SQLite usage index: ingest once, query many times
+# ---------------------------------------------------------------------------
+
+# Bump when the schema changes; an index at another version is rebuilt
+INDEX_VERSION = 4
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     INTEGER PRIMARY KEY,
+    path        TEXT NOT NULL UNIQUE,
+    project     TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    file_id        INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE,
+    ts             TEXT,
+    day            TEXT NOT NULL,
+    agent_id       TEXT,            -- NULL for the main session (coordinator)
+    description    TEXT,
+    model          TEXT,
+    input_tokens   INTEGER NOT NULL,
+    output_tokens  INTEGER NOT NULL,
+    cache_creation INTEGER NOT NULL,
+    cache_read     INTEGER NOT NULL,
+    cost           REAL NOT NULL    -- dollars, priced at this row's model rates
+);
+CREATE INDEX IF NOT EXISTS usage_file ON usage(file_id);
+CREATE INDEX IF NOT EXISTS usage_day ON usage(day);
+CREATE INDEX IF NOT EXISTS usage_description ON usage(description);
+"""
+
+# Column order matches _usage_from_row
+USAGE_SUMS = ("COUNT(*), SUM(u.input_tokens), SUM(u.output_tokens), "
+              "SUM(u.cache_creation), SUM(u.cache_read), SUM(u.cost)")
+
+def open_index(db_path):
+    """Open (creating if needed) the SQLite usage index."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    if conn.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+        conn.executescript('DROP TABLE IF EXISTS usage; DROP TABLE IF EXISTS files;')
+        conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+    conn.executescript(INDEX_SCHEMA)
+    return conn
+
+def iter_usage_rows(filepath):
+    """Yield one normalized usage row per message in a session file.
+
+    Rows are (ts, day, agent_id, description, model, input_tokens,
+    output_tokens, cache_creation, cache_read, cost). Each subagent keeps the
+    description derived from its first toolUseResult. Rows are held, keyed
+    by agent and message.id, for as long as usage_increase remembers the id,
+    so usage added by later lines of a message is folded into that message's
+    own row even when other messages are interleaved.
+    """
+    descriptions = {}
+    context = new_context()
+    pending = {}
+    for line_no, data in enumerate(iter_usage_records(filepath)):
+        event = extract_usage_event(data, context)
+        if event is None:
+            continue
+        agent_id, result, api_usage, model, messages = event
+        values = (
+            api_usage.get('input_tokens', 0) or 0,
+            api_usage.get('output_tokens', 0) or 0,
+            api_usage.get('cache_creation_input_tokens', 0) or 0,
+            api_usage.get('cache_read_input_tokens', 0) or 0,
+            message_cost(api_usage, model),
+        )
+        message_id = data['message'].get('id') if agent_id is None else None
+        key = (agent_id, line_no if message_id is None else message_id)
+        if not messages and key in pending:
+            held = pending[key]
+            pending[key] = held[:5] + tuple(a + b for a, b in zip(held[5:], values))
+            continue
+        description = None
+        if agent_id is not None:
+            description = descriptions.get(agent_id)
+            if description is None:
+                description = descriptions[agent_id] = _describe_agent(agent_id, result)
+        ts = data.get('timestamp')
+        pending[key] = (ts, str(ts or '')[:10] or 'unknown', agent_id, description, model) + values
+        if len(pending) > SEEN_IDS_LIMIT:
+            yield pending.pop(next(iter(pending)))
+    yield from pending.values()
+
+def _ingest_worker(filepath):
+    """Parse one session into index rows in a pool worker."""
+    try:
+        # Stat before parsing: if the file grows meanwhile, the next ingest
+        # sees a changed size and re-reads it.
+        st = os.stat(filepath)
+        rows = list(iter_usage_rows(filepath))
+    except READ_ERRORS as e:
+        return {'path': str(filepath), 'error': str(e)}
+    return {
+        'path': str(filepath),
+        'project': Path(filepath).parent.name,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'rows': rows,
+    }
+
+def ingest_sessions(conn, files, jobs, progress=True):
+    """Add new or changed session files to the index.
+
+    Files whose size and mtime match the indexed copy are skipped without
+    being opened; changed files have their old rows replaced.
+    """
+    known = {path: (size, mtime_ns)
+             for path, size, mtime_ns in conn.execute('SELECT path, size, mtime_ns FROM files')}
+    stale = []
+    archives = [f for f in files if is_archive(f)]
+    files = [f for f in files if not is_archive(f)]
+    errors = [(str(f), 'archives are not indexed; extract them or use batch mode') for f in archives]
+    unchanged = 0
+    for f in files:
+        path = str(Path(f).resolve())
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            # Deleted or rotated since discovery
+            errors.append((path, str(e)))
+            continue
+        if known.get(path) == (st.st_size, st.st_mtime_ns):
+            unchanged += 1
+        else:
+            stale.append(path)
+
+    summary = {'files': len(files), 'ingested': 0, 'skipped': unchanged,
+               'rows': 0, 'errors': errors}
+    if not stale:
+        return summary
+
+    started = time.perf_counter()
+    ingested_bytes = 0
+    for done, result in enumerate(_map_files(_ingest_worker, stale, jobs), 1):
+        if 'error' in result:
+            summary['errors'].append((result['path'], result['error']))
+            continue
+        with conn:
+            conn.execute('DELETE FROM files WHERE path = ?', (result['path'],))
+            cursor = conn.execute(
+                'INSERT INTO files (path, project, size, mtime_ns, ingested_at) '
+                "VALUES (?, ?, ?, ?, datetime('now'))",
+                (result['path'], result['project'], result['size'], result['mtime_ns']))
+            conn.executemany(
+                'INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((cursor.lastrowid,) + row for row in result['rows']))
+        summary['ingested'] += 1
+        summary['rows'] += len(result['rows'])
+        ingested_bytes += result['size']
+        if progress:
+            _print_progress(done, len(stale), ingested_bytes, started)
+    return summary
+
+def _usage_from_row(row):
+    """Build a usage accumulator from a USAGE_SUMS result row."""
+    messages, input_tokens, output_tokens, cache_creation, cache_read, cost = row
+    return {
+        'input_tokens': int(input_tokens or 0),
+        'output_tokens': int(output_tokens or 0),
+        'cache_creation': int(cache_creation or 0),
+        'cache_read': int(cache_read or 0),
+        'messages': int(messages or 0),
+        'cost': float(cost or 0.0),
+    }
+
+def index_session_usage(conn, filepath):
+    """Return (main_usage, subagent_usage) for one indexed session file."""
+    main_usage = new_usage()
+    subagent_usage = {}
+    query = (f"SELECT u.agent_id, MIN(u.description), {USAGE_SUMS} "
+             "FROM usage u JOIN files f USING (file_id) WHERE f.path = ? GROUP BY u.agent_id")
+    for agent_id, description, *sums in conn.execute(query, (str(Path(filepath).resolve()),)):
+        if agent_id is None:
+            main_usage = _usage_from_row(sums)
+        else:
+            subagent_usage[agent_id] = dict(_usage_from_row(sums), description=description)
+    return main_usage, subagent_usage
+
+def index_rollup(conn, files=None, since=None):
+    """Build the batch rollup (per project/day/agent) with SQL aggregates.
+
+    files restricts the rollup to those session paths (default: everything
+    in the index); since (YYYY-MM-DD) drops usage before that UTC date.
+    """
+    started = time.perf_counter()
+    file_clauses, usage_clauses = [], []
+    params = {'since': since, 'main': MAIN_DESCRIPTION}
+    if files is not None:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS selected (path TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM selected')
+        conn.executemany('INSERT OR IGNORE INTO selected VALUES (?)',
+                         ((str(Path(f).resolve()),) for f in files))
+        file_clauses.append('f.path IN (SELECT path FROM selected)')
+    if since:
+        usage_clauses.append('u.day >= :since')
+        # A session counts only if it has usage in the window
+        file_clauses.append('f.file_id IN (SELECT file_id FROM usage WHERE day >= :since)')
+    where = ' AND '.join(file_clauses + usage_clauses)
+    source = f"FROM usage u JOIN files f USING (file_id) {'WHERE ' + where if where else ''}"
+    file_where = ' AND '.join(file_clauses)
+    file_source = f"FROM files f {'WHERE ' + file_where if file_where else ''}"
+
+    rollup = _new_rollup()
+    for project, *sums in conn.execute(
+            f"SELECT f.project, {USAGE_SUMS} {source} GROUP BY f.project", params):
+        rollup['projects'][project] = _usage_from_row(sums)
+    for project, sessions in conn.execute(
+            f"SELECT f.project, COUNT(*) {file_source} GROUP BY f.project", params):
+        rollup['project_sessions'][project] = sessions
+        rollup['projects'].setdefault(project, new_usage())
+    for day, *sums in conn.execute(
+            f"SELECT u.day, {USAGE_SUMS} {source} GROUP BY u.day", params):
+        rollup['days'][day] = _usage_from_row(sums)
+    for description, *sums in conn.execute(
+            f"SELECT COALESCE(u.description, :main), {USAGE_SUMS} {source} "
+            f"GROUP BY COALESCE(u.description, :main)", params):
+        rollup['agents'][description] = _usage_from_row(sums)
+    rollup['total'] = _usage_from_row(
+        conn.execute(f"SELECT {USAGE_SUMS} {source}", params).fetchone())
+    sessions, size = conn.execute(f"SELECT COUNT(*), SUM(f.size) {file_source}", params).fetchone()
+    rollup['sessions'] = sessions
+    rollup['bytes'] = size or 0
+    rollup['seconds'] = time.perf_counter() - started
+    rollup['from_index'] = True
+    return rollup
+
+# ---------------------------------------------------------------------------
+# Columnar export: one typed row per usage event (.npz, Parquet, Arrow)
+# ---------------------------------------------------------------------------
+
+EXPORT_COUNTERS = ('input_tokens', 'output_tokens', 'cache_creation', 'cache_read')
+EXPORT_FORMATS = {'.npz': 'npz', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+
+def _export_worker(filepath):
+    """Collect the usage rows of one session file or archive in a pool worker.
+
+    Returns a list of (session_path, rows) pairs, or an error result.
+    """
+    try:
+        if not is_archive(filepath):
+            return [(str(filepath), list(iter_usage_rows(filepath)))]
+        return [(f"{filepath}:{name}", list(iter_usage_rows(stream)))
+                for name, stream in iter_archive_sessions(filepath)]
+    except READ_ERRORS as e:
+        return [{'path': str(filepath), 'error': str(e)}]
+
+def collect_usage_columns(files, jobs):
+    """Gather every usage event of files into plain column lists.
+
+    Returns (columns, errors). columns maps timestamp (epoch ms, None if
+    absent), session, agent_id ('' for the main session), model ('' if
+    unknown), the four token counters and cost to equal-length lists,
+    ordered by session path then transcript order.
+    """
+    sessions = []
+    errors = []
+    for file_results in _map_files(_export_worker, files, jobs):
+        for item in file_results:
+            if isinstance(item, dict):
+                errors.append((item['path'], item['error']))
+            else:
+                sessions.append(item)
+
+    columns = {name: [] for name in ('timestamp', 'session', 'agent_id', 'model') + EXPORT_COUNTERS + ('cost',)}
+    for session, rows in sorted(sessions, key=lambda item: item[0]):
+        for ts, _, agent_id, _, model, *counters, cost in rows:
+            seconds = _parse_timestamp(ts)
+            columns['timestamp'].append(round(seconds * 1000) if seconds is not None else None)
+            columns['session'].append(session)
+            columns['agent_id'].append(agent_id or '')
+            columns['model'].append(model or '')
+            for name, value in zip(EXPORT_COUNTERS, counters):
+                columns[name].append(value)
+            columns['cost'].append(cost)
+    return columns, errors
+
+def _write_npz(path, columns):
+    """Write columns as a compressed .npz of typed arrays.
+
+    timestamp is datetime64[ms] (NaT when absent); session, agent_id and
+    model are dictionary-encoded as int32 codes into <name>_values string
+    arrays, so the file loads without pickle.
+    """
+    import numpy as np
+    arrays = {
+        'timestamp': np.array([t if t is not None else np.iinfo(np.int64).min
+                               for t in columns['timestamp']], dtype=np.int64).view('datetime64[ms]'),
+        'cost': np.array(columns['cost'], dtype=np.float64),
+    }
+    for name in EXPORT_COUNTERS:
+        arrays[name] = np.array(columns[name], dtype=np.int64)
+    for name in ('session', 'agent_id', 'model'):
+        values, codes = np.unique(np.array(columns[name], dtype=str), return_inverse=True)
+        arrays[name] = codes.astype(np.int32)
+        arrays[f"{name}_values"] = values
+    np.savez_compressed(path, **arrays)
+
+def _write_arrow(path, columns, fmt):
+    """Write columns as a Parquet or Arrow IPC (Feather v2) table."""
+    import pyarrow as pa
+    table = pa.table({
+        'timestamp': pa.array(columns['timestamp'], type=pa.timestamp('ms', tz='UTC')),
+        **{name: pa.array(columns[name], type=pa.string()).dictionary_encode()
+           for name in ('session', 'agent_id', 'model')},
+        **{name: pa.array(columns[name], type=pa.int64()) for name in EXPORT_COUNTERS},
+        'cost': pa.array(columns['cost'], type=pa.float64()),
+    })
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, compression='zstd')
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, compression='zstd')
+
+def export_usage(path, columns):
+    """Write the usage columns to path in the format its extension names."""
+    fmt = EXPORT_FORMATS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f"unsupported export format {Path(path).suffix or '(none)'}; "
+                         f"use one of {', '.join(sorted(EXPORT_FORMATS))}")
+    if fmt == 'npz':
+        _write_npz(path, columns)
+    else:
+        _write_arrow(path, columns, fmt)
+    return fmt
+
+def main_export(args):
+    """Handle --export: write one row per usage event of the PATH sessions and exit."""
+    files = discover_session_files(args.paths)
+    if not files:
+        print(f"Error: No session files found in: {' '.join(args.paths)}")
+        sys.exit(1)
+    columns, errors = collect_usage_columns(files, args.jobs)
+    try:
+        fmt = export_usage(args.export, columns)
+    except ImportError as e:
+        print(f"Error: --export {Path(args.export).suffix} needs {e.name} "
+              f"(.npz needs numpy; .parquet/.arrow need pyarrow)")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Exported {format_tokens(len(columns['session']))} usage events from "
+          f"{len(set(columns['session']))} session(s) to {args.export} ({fmt})")
+    for path, error in errors:
+        print(f"  Skipped unreadable file {path}: {error}")
+
+# ---------------------------------------------------------------------------
+# Profiles: per-turn analyses that need every line, not just usage lines
+# ---------------------------------------------------------------------------
+
+def _parse_timestamp(value):
+    """Parse an ISO-8601 transcript timestamp into epoch seconds (None if absent)."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def _percentile(values, q):
+    """Return the q-th percentile (0-100) with linear interpolation, like numpy."""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def _content_blocks(data):
+    """Return the message content blocks of a line as a list."""
+    message = data.get('message')
+    content = message.get('content') if isinstance(message, dict) else None
+    if isinstance(content, list):
+        return [block for block in content if isinstance(block, dict)]
+    if isinstance(content, str):
+        return [{'type': 'text', 'text': content}]
+    return []
+
+def _is_human_prompt(data):
+    """Return True for a user line typed by the human (not a tool result or meta line)."""
+    if data.get('type') != 'user' or data.get('isMeta') or data.get('isCompactSummary'):
+        return False
+    blocks = _content_blocks(data)
+    return bool(blocks) and not any(block.get('type') == 'tool_result' for block in blocks)
+
+def _prompt_snippet(data, width=40):
+    """Return the first line of a human prompt, truncated for tables."""
+    for block in _content_blocks(data):
+        if block.get('type') == 'text' and block.get('text'):
+            return block['text'].strip().split('\n')[0][:width]
+    return ''
+
+def _merged_seconds(intervals):
+    """Return wall-clock seconds covered by possibly overlapping intervals."""
+    total = 0.0
+    end = None
+    for lo, hi in sorted(intervals):
+        if end is None or lo > end:
+            total += hi - lo
+            end = hi
+        elif hi > end:
+            total += hi - end
+            end = hi
+    return total
+
+def _close_turn(turn, calls):
+    """Finish a turn: derive latency, tool wait and model throughput."""
+    turn['latency'] = turn['end'] - turn['start']
+    turn['tool_wait'] = min(_merged_seconds(turn.pop('tool_intervals')), turn['latency'])
+    turn['model_seconds'] = turn['latency'] - turn['tool_wait']
+    turn['output_tokens'] = sum(call['output'] for call in calls.values())
+    generation = sum(max(call['end'] - call['start'], 0.0) for call in calls.values())
+    turn['tokens_per_second'] = turn['output_tokens'] / generation if generation > 0 else None
+    turn['api_calls'] = len(calls)
+
+def analyze_latency(filepath):
+    """Pair each human turn with its responses and time where the wall clock went.
+
+    A turn runs from a human prompt to the last assistant or tool-result line
+    before the next prompt. Each API call (one message.id, possibly split over several
+    lines) runs from the preceding user/tool-result line to its last line.
+    Tool waits run from the assistant line issuing a tool_use to the line
+    carrying its tool_result; overlapping parallel waits count once per turn.
+
+    Returns dict with turns (list), tool_waits ({tool name: [seconds]}) and
+    call_rates (output tokens/s per API call).
+    """
+    turns = []
+    tool_waits = defaultdict(list)
+    call_rates = []
+    current = None
+    calls = {}
+    pending_tools = {}
+    last_input = None
+    seen_usage = {}
+
+    def finish():
+        if current is not None and calls:
+            _close_turn(current, calls)
+            turns.append(current)
+            for call in calls.values():
+                seconds = call['end'] - call['start']
+                if seconds > 0 and call['output']:
+                    call_rates.append(call['output'] / seconds)
+
+    for data in iter_transcript_records(filepath):
+        # Old-format transcripts inline subagent lines; they have their own clock
+        if data.get('isSidechain'):
+            continue
+        ts = _parse_timestamp(data.get('timestamp'))
+        if ts is None:
+            continue
+
+        if _is_human_prompt(data):
+            finish()
+            current = {'start': ts, 'end': ts, 'prompt': _prompt_snippet(data),
+                       'timestamp': data.get('timestamp'), 'first_response': None,
+                       'tool_intervals': [], 'tool_calls': 0}
+            calls = {}
+            pending_tools = {}
+            last_input = ts
+        elif data.get('type') == 'user':
+            for block in _content_blocks(data):
+                if block.get('type') != 'tool_result':
+                    continue
+                pending = pending_tools.pop(block.get('tool_use_id'), None)
+                if pending is not None and current is not None:
+                    name, issued = pending
+                    tool_waits[name].append(max(ts - issued, 0.0))
+                    current['tool_intervals'].append((issued, max(ts, issued)))
+                    current['end'] = max(current['end'], ts)
+            last_input = ts
+        elif data.get('type') == 'assistant' and current is not None:
+            message = data.get('message') if isinstance(data.get('message'), dict) else {}
+            call_id = message.get('id') or data.get('uuid')
+            call = calls.get(call_id)
+            if call is None:
+                call = calls[call_id] = {'start': last_input, 'end': ts, 'output': 0}
+            call['end'] = ts
+            counted = usage_increase(seen_usage, call_id, message.get('usage') or {})
+            if counted is not None:
+                call['output'] += counted[0].get('output_tokens', 0) or 0
+            current['end'] = max(current['end'], ts)
+            if current['first_response'] is None:
+                current['first_response'] = ts - current['start']
+            for block in _content_blocks(data):
+                if block.get('type') == 'tool_use':
+                    pending_tools[block.get('id')] = (block.get('name') or 'unknown', ts)
+                    current['tool_calls'] += 1
+    finish()
+
+    return {'turns': turns, 'tool_waits': dict(tool_waits), 'call_rates': call_rates}
+
+def _print_percentile_row(label, values, fmt="{:>9.1f}"):
+    """Print one metric row with count and p50/p90/p99/max."""
+    if not values:
+        print(f"  {label:<30} {0:>6}")
+        return
+    cells = [fmt.format(_percentile(values, q)) for q in (50, 90, 99)] + [fmt.format(max(values))]
+    print(f"  {label:<30} {len(values):>6} " + " ".join(cells))
+
+def print_latency_report(profile, top=10):
+    """Print per-turn latency percentiles, tool waits and the slowest turns."""
+    turns = profile['turns']
+    print()
+    print("LATENCY PROFILE:")
+    print("-" * 100)
+    print(f"  {'Metric':<30} {'N':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    print("-" * 100)
+    _print_percentile_row("Turn latency (s)", [t['latency'] for t in turns])
+    _print_percentile_row("Time to first response (s)",
+                          [t['first_response'] for t in turns if t['first_response'] is not None])
+    _print_percentile_row("Tool wait per turn (s)", [t['tool_wait'] for t in turns])
+    _print_percentile_row("Model time per turn (s)", [t['model_seconds'] for t in turns])
+    _print_percentile_row("Output tok/s per turn",
+                          [t['tokens_per_second'] for t in turns if t['tokens_per_second'] is not None])
+    _print_percentile_row("Output tok/s per API call", profile['call_rates'])
+
+    total_latency = sum(t['latency'] for t in turns)
+    total_wait = sum(t['tool_wait'] for t in turns)
+    if total_latency > 0:
+        print()
+        print(f"  Wall clock in turns: {total_latency:,.1f}s "
+              f"(model {total_latency - total_wait:,.1f}s, tools {total_wait:,.1f}s = "
+              f"{total_wait / total_latency:.1%})")
+
+    if profile['tool_waits']:
+        print()
+        print(f"  {'Tool':<30} {'Calls':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'Total':>10}")
+        ranked = sorted(profile['tool_waits'].items(), key=lambda item: -sum(item[1]))
+        for name, waits in ranked[:top]:
+            cells = " ".join(f"{_percentile(waits, q):>9.1f}" for q in (50, 90, 99))
+            print(f"  {name[:30]:<30} {len(waits):>6} {cells} {max(waits):>9.1f} {sum(waits):>9.1f}s")
+
+    if turns:
+        print()
+        print(f"  Slowest turns (top {min(top, len(turns))}):")
+        print(f"  {'Started':<20} {'Latency':>9} {'Tools':>9} {'Calls':>6} {'tok/s':>7}  Prompt")
+        for turn in sorted(turns, key=lambda t: -t['latency'])[:top]:
+            rate = f"{turn['tokens_per_second']:>7.1f}" if turn['tokens_per_second'] else f"{'-':>7}"
+            print(f"  {str(turn['timestamp'])[:19]:<20} {turn['latency']:>8.1f}s "
+                  f"{turn['tool_wait']:>8.1f}s {turn['api_calls']:>6} {rate}  {turn['prompt']}")
+    print("-" * 100)
+
+# Cache-bust detection thresholds: a call busts the cache when the prefix
+# cached by the previous call is not read back and at least this many tokens
+# (and this fraction of that prefix) had to be read uncached instead.
+BUST_MIN_TOKENS = 10_000
+BUST_FRACTION = 0.5
+# Anthropic's default prompt-cache TTL; longer idle gaps expire the prefix
+CACHE_TTL_SECONDS = 300
+
+def _cache_event(data):
+    """Label transcript lines that can invalidate the prompt cache, else None."""
+    kind = data.get('type')
+    subtype = str(data.get('subtype') or '')
+    if subtype == 'compact_boundary' or data.get('isCompactSummary'):
+        return 'compaction'
+    if kind == 'attachment':
+        attachment = data.get('attachment') if isinstance(data.get('attachment'), dict) else {}
+        if 'hook' in str(attachment.get('type', '')):
+            return 'hook output'
+    if kind == 'system' and ('hook' in subtype.lower() or 'hookEvent' in data or 'hookName' in data):
+        return 'hook output'
+    if kind == 'user' and data.get('isMeta'):
+        text = ' '.join(block.get('text', '') for block in _content_blocks(data)
+                        if isinstance(block.get('text'), str))
+        if 'hook' in text.lower():
+            return 'hook output'
+    return None
+
+def _bust_cause(events, previous, call):
+    """Attribute a cache bust to the most specific event seen since the last call."""
+    for label in ('compaction', 'hook output'):
+        if label in events:
+            return label
+    if previous['model'] != call['model']:
+        return f"model switch ({previous['model']} -> {call['model']})"
+    if previous['ts'] is not None and call['ts'] is not None:
+        idle = call['ts'] - previous['ts']
+        if idle > CACHE_TTL_SECONDS:
+            return f"cache TTL expiry (idle {idle / 60:.1f}m)"
+    return 'unattributed (system prompt or tool definitions changed?)'
+
+def iter_main_calls(filepath):
+    """Yield (events, call) for each main-session API call, in transcript order.
+
+    One API call may be written as several lines sharing a message.id; it is
+    yielded once. events lists the (label, record) pairs from _cache_event
+    seen since the previous call. A final (events, None) carries events
+    after the last call. call has index, timestamp, ts, model, input, read
+    and creation.
+    """
+    seen_ids = set()
+    events = []
+    index = 0
+
+    for data in iter_transcript_records(filepath):
+        if data.get('isSidechain'):
+            continue
+        event = _cache_event(data)
+        if event is not None:
+            events.append((event, data))
+            continue
+        if data.get('type') != 'assistant' or not isinstance(data.get('message'), dict):
+            continue
+        message = data['message']
+        usage = message.get('usage')
+        if not usage or message.get('model') == '<synthetic>':
+            continue
+        call_id = message.get('id')
+        if call_id is not None:
+            if call_id in seen_ids:
+                continue
+            seen_ids.add(call_id)
+
+        index += 1
+        yield events, {
+            'index': index,
+            'timestamp': data.get('timestamp'),
+            'ts': _parse_timestamp(data.get('timestamp')),
+            'model': message.get('model'),
+            'input': usage.get('input_tokens', 0) or 0,
+            'read': usage.get('cache_read_input_tokens', 0) or 0,
+            'creation': usage.get('cache_creation_input_tokens', 0) or 0,
+        }
+        events = []
+    if events:
+        yield events, None
+
+def analyze_cache(filepath):
+    """Build a per-call prompt-cache timeline for the main session and find busts.
+
+    Each main-session API call (one message.id) gets a hit ratio of
+    cache_read / (input + cache_read + cache_creation). A call is flagged as
+    a cache bust when it fails to read back the prefix the previous call had
+    cached (cache_read + cache_creation) by at least BUST_MIN_TOKENS and
+    BUST_FRACTION of that prefix. The bust is attributed to the event that
+    preceded it: compaction, hook output injection, model switch, or an idle
+    gap longer than the cache TTL.
+
+    Returns dict with calls (list) and busts (list).
+    """
+    calls = []
+    busts = []
+    previous = None
+
+    for events, call in iter_main_calls(filepath):
+        if call is None:
+            break
+        read = call['read']
+        creation = call['creation']
+        total = call['input'] + read + creation
+        call['hit_ratio'] = read / total if total else 0.0
+
+        if previous is not None:
+            expected = previous['read'] + previous['creation']
+            lost = expected - read
+            if lost >= max(BUST_MIN_TOKENS, BUST_FRACTION * expected):
+                rates = price_for_model(call['model'])
+                busts.append({
+                    'index': call['index'],
+                    'timestamp': call['timestamp'],
+                    'expected_prefix': expected,
+                    'lost_prefix': lost,
+                    'creation': creation,
+                    'cause': _bust_cause([label for label, _ in events], previous, call),
+                    # The part of the lost prefix written again instead of read back
+                    'extra_cost': (min(lost, creation) * (rates['cache_write'] - rates['cache_read'])
+                                   / 1_000_000),
+                })
+        calls.append(call)
+        previous = call
+
+    return {'calls': calls, 'busts': busts}
+
+def print_cache_report(profile, buckets=20, top=10):
+    """Print cache hit ratio, a bucketed timeline and the detected cache busts."""
+    calls = profile['calls']
+    busts = profile['busts']
+    print()
+    print("PROMPT CACHE EFFICIENCY:")
+    print("-" * 100)
+    if not calls:
+        print("  No main-session API calls with usage found.")
+        print("-" * 100)
+        return
+
+    read = sum(c['read'] for c in calls)
+    total = sum(c['input'] + c['read'] + c['creation'] for c in calls)
+    print(f"  API calls: {len(calls):,}   overall hit ratio: {read / total if total else 0.0:.1%}   "
+          f"cache busts: {len(busts)}   "
+          f"bust cost: ${sum(b['extra_cost'] for b in busts):.2f}")
+    print()
+
+    size = max(1, -(-len(calls) // buckets))
+    bust_indexes = [b['index'] for b in busts]
+    print(f"  {'Calls':<13} {'Started':<20} {'Hit':>6}  {'':<40} {'Busts':>5}")
+    for start in range(0, len(calls), size):
+        chunk = calls[start:start + size]
+        chunk_read = sum(c['read'] for c in chunk)
+        chunk_total = sum(c['input'] + c['read'] + c['creation'] for c in chunk)
+        ratio = chunk_read / chunk_total if chunk_total else 0.0
+        first, last = chunk[0]['index'], chunk[-1]['index']
+        n_busts = sum(1 for i in bust_indexes if first <= i <= last)
+        print(f"  {f'{first}-{last}':<13} {str(chunk[0]['timestamp'])[:19]:<20} {ratio:>6.1%}  "
+              f"{'#' * round(ratio * 40):<40} {n_busts or '':>5}")
+
+    if busts:
+        print()
+        print(f"  Cache busts (top {min(top, len(busts))} by cost):")
+        print(f"  {'Call':>6} {'Time':<20} {'Lost prefix':>12} {'Re-cached':>12} {'Extra':>8}  Cause")
+        for bust in sorted(busts, key=lambda b: -b['extra_cost'])[:top]:
+            print(f"  {bust['index']:>6} {str(bust['timestamp'])[:19]:<20} "
+                  f"{format_tokens(bust['lost_prefix']):>12} {format_tokens(bust['creation']):>12} "
+                  f"${bust['extra_cost']:>7.2f}  {bust['cause']}")
+        causes = defaultdict(lambda: [0, 0.0])
+        for bust in busts:
+            key = bust['cause'].split(' (')[0]
+            causes[key][0] += 1
+            causes[key][1] += bust['extra_cost']
+        print()
+        print("  By cause: " + ", ".join(f"{cause} x{count} (${cost:.2f})"
+                                         for cause, (count, cost) in sorted(causes.items(), key=lambda i: -i[1][1])))
+    print("-" * 100)
+
+# ---------------------------------------------------------------------------
+# Context growth: effective context per call, compactions and projections
+# ---------------------------------------------------------------------------
+
+# Context tiers as the SDD skill defines them (budget-and-wave-cap.md)
+CONTEXT_LIMITS = (('standard', 200_000), ('extended', 1_000_000))
+EXTENDED_CONTEXT_MODELS = re.compile(r'\[1m\]|sonnet-5|fable-5')
+
+def context_tier(model):
+    """Return 'extended' for [1m] or 1M-native model ids, else 'standard'."""
+    return 'extended' if EXTENDED_CONTEXT_MODELS.search(str(model or '').lower()) else 'standard'
+
+def _fit_slope(xs, ys):
+    """Least-squares slope of ys over xs, or None with fewer than two distinct xs."""
+    n = len(xs)
+    if n < 2:
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+
+def _close_phase(phase):
+    """Fit a phase's growth per API call and per minute of wall clock."""
+    calls = phase['calls']
+    sizes = [c['context'] for c in calls]
+    phase['per_call'] = _fit_slope([c['index'] for c in calls], sizes)
+    timed = [c for c in calls if c['ts'] is not None]
+    phase['per_minute'] = _fit_slope([(c['ts'] - timed[0]['ts']) / 60 for c in timed],
+                                     [c['context'] for c in timed]) if timed else None
+    phase['peak'] = max(sizes)
+
+def analyze_context(filepath):
+    """Track the main session's effective context size and its growth per phase.
+
+    Effective context of an API call is input + cache_read + cache_creation:
+    everything the model was sent. Compactions (compact_boundary or compact
+    summary lines) split the session into phases; each phase gets a linear
+    growth rate in tokens per call and tokens per minute.
+
+    Returns dict with calls, compactions and phases; each phase holds its
+    calls, per_call/per_minute slopes (None when not fittable), peak and
+    ended_by (the compaction that closed it, or None for the last phase).
+    """
+    calls = []
+    compactions = []
+    phases = [{'calls': [], 'ended_by': None}]
+
+    for events, call in iter_main_calls(filepath):
+        boundaries = [data for label, data in events if label == 'compaction']
+        if boundaries:
+            # A compaction writes a boundary line and a summary line; count it once
+            metadata = next((data['compactMetadata'] for data in boundaries
+                             if isinstance(data.get('compactMetadata'), dict)), {})
+            compaction = {
+                'after_call': calls[-1]['index'] if calls else 0,
+                'timestamp': boundaries[0].get('timestamp'),
+                'trigger': metadata.get('trigger'),
+                'pre_tokens': metadata.get('preTokens'),
+                'observed': calls[-1]['context'] if calls else None,
+            }
+            compactions.append(compaction)
+            if phases[-1]['calls']:
+                phases[-1]['ended_by'] = compaction
+                phases.append({'calls': [], 'ended_by': None})
+        if call is None:
+            break
+        call['context'] = call['input'] + call['read'] + call['creation']
+        calls.append(call)
+        phases[-1]['calls'].append(call)
+
+    phases = [phase for phase in phases if phase['calls']]
+    for phase in phases:
+        _close_phase(phase)
+    return {'calls': calls, 'compactions': compactions, 'phases': phases}
+
+def print_context_report(profile, buckets=20):
+    """Print the context-size timeline, per-phase growth and limit projections."""
+    calls = profile['calls']
+    print()
+    print("CONTEXT WINDOW GROWTH:")
+    print("-" * 100)
+    if not calls:
+        print("  No main-session API calls with usage found.")
+        print("-" * 100)
+        return
+
+    tier = context_tier(calls[-1]['model'])
+    scale = dict(CONTEXT_LIMITS)[tier]
+    print(f"  API calls: {len(calls):,}   peak context: {format_tokens(max(c['context'] for c in calls))}   "
+          f"compactions: {len(profile['compactions'])}   "
+          f"tier: {tier} ({format_tokens(scale)}, from {calls[-1]['model']})")
+    print()
+
+    size = max(1, -(-len(calls) // buckets))
+    compacted_after = [c['after_call'] for c in profile['compactions']]
+    print(f"  {'Calls':<13} {'Started':<20} {'Peak':>10}  {'(bar: share of ' + tier + ' limit)':<40} {'Compact':>7}")
+    for start in range(0, len(calls), size):
+        chunk = calls[start:start + size]
+        peak = max(c['context'] for c in chunk)
+        first, last = chunk[0]['index'], chunk[-1]['index']
+        n_compactions = sum(1 for i in compacted_after if first <= i <= last)
+        print(f"  {f'{first}-{last}':<13} {str(chunk[0]['timestamp'])[:19]:<20} {format_tokens(peak):>10}  "
+              f"{'#' * min(40, round(peak / scale * 40)):<40} {n_compactions or '':>7}")
+
+    print()
+    print(f"  {'Phase':<6} {'Calls':<13} {'Start':>10} {'Peak':>10} {'Tok/call':>10} {'Tok/min':>10}  Ended by")
+    for number, phase in enumerate(profile['phases'], 1):
+        phase_calls = phase['calls']
+        compaction = phase['ended_by']
+        if compaction is None:
+            ended = 'end of transcript'
+        else:
+            ended = f"compaction ({compaction['trigger'] or 'unknown trigger'}"
+            if compaction['pre_tokens']:
+                ended += f", {format_tokens(compaction['pre_tokens'])} pre-compact tokens"
+            ended += ')'
+        span = f"{phase_calls[0]['index']}-{phase_calls[-1]['index']}"
+        per_call, per_minute = (format_tokens(round(value)) if value is not None else 'n/a'
+                                for value in (phase['per_call'], phase['per_minute']))
+        print(f"  {number:<6} {span:<13} "
+              f"{format_tokens(phase_calls[0]['context']):>10} {format_tokens(phase['peak']):>10} "
+              f"{per_call:>10} {per_minute:>10}  {ended}")
+
+    current = profile['phases'][-1]
+    last = current['calls'][-1]
+    print()
+    print(f"  Projection (last phase rate, from call {last['index']} at {format_tokens(last['context'])} tokens):")
+    for name, limit in CONTEXT_LIMITS:
+        headroom = limit - last['context']
+        if headroom <= 0:
+            print(f"    {name:<9} ({format_tokens(limit)}): already reached")
+        elif not current['per_call'] or current['per_call'] <= 0:
+            print(f"    {name:<9} ({format_tokens(limit)}): not growing in this phase")
+        else:
+            line = f"    {name:<9} ({format_tokens(limit)}): ~{headroom / current['per_call']:,.0f} more calls"
+            if current['per_minute'] and current['per_minute'] > 0:
+                line += f", ~{headroom / current['per_minute']:,.0f} min"
+            print(line)
+    observed = [c['observed'] for c in profile['compactions'] if c['observed']]
+    if observed:
+        print(f"  Context at the last call before each compaction: "
+              f"{', '.join(format_tokens(o) for o in observed)}")
+    print("-" * 100)
+
+# ---------------------------------------------------------------------------
+# Tool-result attribution: which tool outputs inflate input tokens
+# ---------------------------------------------------------------------------
+
+# Rough size of tool output in tokens: ~4 characters per token for code and
+# logs; images are billed by pixel area, capped near this many tokens
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1_600
+# Tool input fields that best identify what a call touched, in order
+TOOL_TARGET_KEYS = ('file_path', 'notebook_path', 'path', 'command', 'pattern', 'url', 'query',
+                    'description', 'prompt')
+
+def estimate_result_tokens(content):
+    """Estimate the tokens of a tool_result content (string or list of blocks)."""
+    if isinstance(content, str):
+        return -(-len(content) // CHARS_PER_TOKEN)
+    if not isinstance(content, list):
+        return 0
+    tokens = 0
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        if block.get('type') == 'image':
+            tokens += IMAGE_TOKENS
+        elif isinstance(block.get('text'), str):
+            tokens += -(-len(block['text']) // CHARS_PER_TOKEN)
+    return tokens
+
+def _tool_target(tool_input, width=50):
+    """Return a short description of what a tool call operated on."""
+    if not isinstance(tool_input, dict):
+        return ''
+    for key in TOOL_TARGET_KEYS:
+        value = tool_input.get(key)
+        if isinstance(value, str) and value.strip():
+            return ' '.join(value.split())[:width]
+    return ''
+
+def _credit_results(pending, previous, call):
+    """Split the input growth between two API calls across the tool results in between.
+
+    The growth is the next call's effective context minus the previous
+    call's context and output (which the next call also carries); each
+    result gets a share proportional to its estimated size.
+    """
+    delta = (call['context'] - previous['context'] - previous['output'])
+    estimated = sum(result['estimated'] for result in pending)
+    for result in pending:
+        result['next_call'] = call['index']
+        result['model'] = call['model']
+        if delta > 0 and estimated > 0:
+            result['credited'] = round(delta * result['estimated'] / estimated)
+
+def analyze_tool_results(filepath):
+    """Join each main-session tool_use to its tool_result and attribute input growth.
+
+    Each result gets an estimated token size and a credited share of the
+    input-token delta of the API call that first carried it (see
+    _credit_results). Its carried cost prices those tokens as one cache
+    write plus a cache read on every later call until the next compaction,
+    since the result stays in context until then.
+
+    Returns dict with calls (count) and results (list of dicts with tool,
+    target, tool_use_id, timestamp, estimated, credited, next_call,
+    carried_calls and cost).
+    """
+    uses = {}
+    results = []
+    pending = []
+    calls_by_id = {}
+    call_count = 0
+    previous = None
+    phase = 0
+    phase_last_call = {}
+
+    for data in iter_transcript_records(filepath):
+        if data.get('isSidechain'):
+            continue
+        if _cache_event(data) == 'compaction':
+            # Growth across a compaction says nothing about the results in flight
+            phase += 1
+            pending = []
+            previous = None
+            continue
+        kind = data.get('type')
+        if kind == 'assistant' and isinstance(data.get('message'), dict):
+            message = data['message']
+            usage = message.get('usage')
+            call = calls_by_id.get(message.get('id'))
+            if call is None and usage and message.get('model') != '<synthetic>':
+                call_count += 1
+                call = {
+                    'index': call_count,
+                    'model': message.get('model'),
+                    'context': ((usage.get('input_tokens', 0) or 0)
+                                + (usage.get('cache_read_input_tokens', 0) or 0)
+                                + (usage.get('cache_creation_input_tokens', 0) or 0)),
+                    'output': usage.get('output_tokens', 0) or 0,
+                }
+                if message.get('id') is not None:
+                    calls_by_id[message['id']] = call
+                if pending and previous is not None:
+                    _credit_results(pending, previous, call)
+                pending = []
+                previous = call
+                phase_last_call[phase] = call_count
+            for block in _content_blocks(data):
+                if block.get('type') == 'tool_use' and block.get('id'):
+                    uses[block['id']] = {'tool': block.get('name') or '?',
+                                         'target': _tool_target(block.get('input'))}
+        elif kind == 'user':
+            for block in _content_blocks(data):
+                if block.get('type') != 'tool_result':
+                    continue
+                use = uses.get(block.get('tool_use_id'), {'tool': '?', 'target': ''})
+                result = dict(use, tool_use_id=block.get('tool_use_id'), timestamp=data.get('timestamp'),
+                              estimated=estimate_result_tokens(block.get('content')),
+                              credited=None, next_call=None, model=None, phase=phase)
+                results.append(result)
+                pending.append(result)
+
+    for result in results:
+        if result['next_call'] is None:
+            result['carried_calls'] = 0
+            result['cost'] = 0.0
+            continue
+        result['carried_calls'] = phase_last_call[result['phase']] - result['next_call'] + 1
+        tokens = result['credited'] if result['credited'] is not None else result['estimated']
+        rates = price_for_model(result['model'])
+        result['cost'] = tokens * (rates['cache_write']
+                                   + (result['carried_calls'] - 1) * rates['cache_read']) / 1_000_000
+    return {'calls': call_count, 'results': results}
+
+def print_tool_report(profile, top=10):
+    """Print per-tool totals and the costliest individual tool results."""
+    results = profile['results']
+    print()
+    print("TOOL RESULT ATTRIBUTION:")
+    print("-" * 100)
+    if not results:
+        print("  No main-session tool results found.")
+        print("-" * 100)
+        return
+
+    credited = sum(r['credited'] or 0 for r in results)
+    print(f"  Tool results: {len(results):,}   estimated size: {format_tokens(sum(r['estimated'] for r in results))}   "
+          f"credited input growth: {format_tokens(credited)}   "
+          f"carried cost: ${sum(r['cost'] for r in results):.2f}")
+    print()
+
+    by_tool = defaultdict(lambda: {'count': 0, 'estimated': 0, 'credited': 0, 'cost': 0.0})
+    for result in results:
+        totals = by_tool[result['tool']]
+        totals['count'] += 1
+        totals['estimated'] += result['estimated']
+        totals['credited'] += result['credited'] or 0
+        totals['cost'] += result['cost']
+    print(f"  {'Tool':<24} {'Calls':>6} {'Est tokens':>12} {'Credited':>12} {'Avg/call':>10} {'Cost':>8}")
+    for tool, totals in sorted(by_tool.items(), key=lambda item: (-item[1]['cost'], item[0])):
+        print(f"  {tool[:24]:<24} {totals['count']:>6} {format_tokens(totals['estimated']):>12} "
+              f"{format_tokens(totals['credited']):>12} "
+              f"{format_tokens(totals['estimated'] // totals['count']):>10} ${totals['cost']:>7.2f}")
+
+    print()
+    print(f"  Costliest tool results (top {min(top, len(results))}; carried = calls it stayed in context):")
+    print(f"  {'Call':>6} {'Tool':<12} {'Target':<40} {'Est tok':>9} {'Credited':>9} {'Carried':>8} {'Cost':>8}")
+    for result in sorted(results, key=lambda r: -r['cost'])[:top]:
+        credited_text = format_tokens(result['credited']) if result['credited'] is not None else 'n/a'
+        print(f"  {result['next_call'] or '-':>6} {result['tool'][:12]:<12} {result['target'][:40]:<40} "
+              f"{format_tokens(result['estimated']):>9} {credited_text:>9} "
+              f"{result['carried_calls']:>8} ${result['cost']:>7.2f}")
+    print("-" * 100)
+
+# ---------------------------------------------------------------------------
+# Agent tree: inclusive/exclusive cost across sidechain transcripts
+# ---------------------------------------------------------------------------
+
+def _first_record(filepath):
+    """Return the decoded first line of a transcript, or {} if unreadable."""
+    try:
+        with open_decompressed(filepath) as f:
+            record = json.loads(f.readline())
+    except READ_ERRORS:
+        return {}
+    return record if isinstance(record, dict) else {}
+
+def discover_subagent_files(filepath):
+    """Find the sidechain transcripts belonging to a main session file.
+
+    Current Claude Code writes them to <session-id>/subagents/*.jsonl next to
+    the main transcript; older versions wrote agent-*.jsonl into the project
+    directory, identified by the sessionId on their first line. Either side
+    may be compressed (.jsonl.gz, .jsonl.zst).
+    """
+    path = Path(filepath)
+    session_id = transcript_stem(path)
+    found = sorted(f for f in (path.parent / session_id / 'subagents').glob('*.jsonl*')
+                   if is_transcript_name(f.name))
+    for candidate in sorted(path.parent.glob('agent-*.jsonl*')):
+        if not is_transcript_name(candidate.name):
+            continue
+        if candidate not in found and _first_record(candidate).get('sessionId') == session_id:
+            found.append(candidate)
+    return found
+
+def _agent_label(block_input):
+    """Label a dispatched agent from its Agent tool_use input."""
+    subagent_type = block_input.get('subagent_type')
+    description = block_input.get('description')
+    if subagent_type and description:
+        return f"{subagent_type}: {description}"
+    return description or subagent_type
+
+def _scan_agent_node(filepath):
+    """Collect one transcript's own usage plus the agents it dispatched.
+
+    Returns dict with usage (its own assistant messages, priced per message),
+    children ({agentId: {'label', 'reported'}} from toolUseResult lines, where
+    reported is the usage the parent saw) and dispatch_uuids (uuids of lines
+    that issued Agent tool calls, for parentUuid fallback linking).
+    """
+    usage = new_usage()
+    children = {}
+    dispatch_uuids = set()
+    labels = {}
+    context = new_context()
+    for data in iter_usage_records(filepath):
+        if data.get('type') == 'assistant':
+            for block in _content_blocks(data):
+                if (block.get('type') == 'tool_use' and block.get('name') in AGENT_TOOLS
+                        and isinstance(block.get('input'), dict)):
+                    labels[block.get('id')] = _agent_label(block['input'])
+                    if data.get('uuid'):
+                        dispatch_uuids.add(data['uuid'])
+        event = extract_usage_event(data, context)
+        if event is None:
+            continue
+        agent_id, result, api_usage, model, messages = event
+        if agent_id is None:
+            add_api_usage(usage, api_usage, model, messages)
+            continue
+        child = children.get(agent_id)
+        if child is None:
+            label = labels.get(_tool_result_id(data)) or _describe_agent(agent_id, result)
+            child = children[agent_id] = {'label': label, 'reported': new_usage()}
+        add_api_usage(child['reported'], api_usage, model)
+    return {'usage': usage, 'children': children, 'dispatch_uuids': dispatch_uuids}
+
+def build_agent_tree(filepath):
+    """Rebuild the dispatch tree of a session from its main and sidechain transcripts.
+
+    A sidechain's parent is the transcript whose toolUseResult names its
+    agentId; otherwise the transcript that issued the Agent call its first
+    line's parentUuid points at; otherwise the main session. Agents that
+    only appear in a toolUseResult (transcript missing) become leaves
+    carrying the usage their parent reported.
+
+    Returns the root node: {id, label, file, usage, children: [...]} with
+    'inclusive' usage (own + all descendants) filled in.
+    """
+    root_scan = _scan_agent_node(filepath)
+    nodes = {None: {'id': 'main', 'label': MAIN_DESCRIPTION, 'file': str(filepath),
+                    'usage': root_scan['usage'], 'children': []}}
+    scans = {None: root_scan}
+    first_parent_uuid = {}
+    for agent_file in discover_subagent_files(filepath):
+        first = _first_record(agent_file)
+        agent_id = first.get('agentId') or transcript_stem(agent_file).replace('agent-', '', 1)
+        if agent_id in nodes:
+            continue
+        scans[agent_id] = _scan_agent_node(agent_file)
+        nodes[agent_id] = {'id': agent_id, 'label': None, 'file': str(agent_file),
+                           'usage': scans[agent_id]['usage'], 'children': []}
+        first_parent_uuid[agent_id] = first.get('parentUuid')
+
+    parent_of = {}
+    for node_id, scan in scans.items():
+        for child_id, child in scan['children'].items():
+            if child_id == node_id:
+                continue
+            parent_of.setdefault(child_id, node_id)
+            if child_id not in nodes:
+                nodes[child_id] = {'id': child_id, 'label': child['label'], 'file': None,
+                                   'usage': child['reported'], 'children': []}
+            elif nodes[child_id]['label'] is None:
+                nodes[child_id]['label'] = child['label']
+
+    dispatcher = {uuid: node_id for node_id, scan in scans.items() for uuid in scan['dispatch_uuids']}
+    for node_id in nodes:
+        if node_id is not None and node_id not in parent_of:
+            parent = dispatcher.get(first_parent_uuid.get(node_id))
+            parent_of[node_id] = parent if parent != node_id else None
+
+    # Attach children, refusing links that would close a cycle
+    for node_id, parent_id in parent_of.items():
+        ancestor = parent_id
+        while ancestor is not None and ancestor != node_id:
+            ancestor = parent_of.get(ancestor)
+        if ancestor == node_id:
+            parent_id = None
+        nodes[parent_id]['children'].append(nodes[node_id])
+
+    def fill(node):
+        node['label'] = node['label'] or f"agent-{node['id']}"
+        node['inclusive'] = dict(node['usage'])
+        node['children'].sort(key=lambda child: str(child['id']))
+        for child in node['children']:
+            merge_usage(node['inclusive'], fill(child))
+        return node['inclusive']
+
+    fill(nodes[None])
+    return nodes[None]
+
+def _total_tokens(usage):
+    """Return input + output + cache tokens of a usage accumulator."""
+    return usage['input_tokens'] + usage['output_tokens'] + usage['cache_creation'] + usage['cache_read']
+
+def print_agent_tree(root):
+    """Print the dispatch tree with exclusive and inclusive tokens and cost."""
+    print()
+    print("AGENT TREE (exclusive = own messages, inclusive = own + descendants):")
+    print("-" * 100)
+    print(f"{'Agent':<52} {'Msgs':>5} {'Excl tokens':>12} {'Incl tokens':>12} {'Excl $':>8} {'Incl $':>8}")
+    print("-" * 100)
+
+    def show(node, prefix, is_last, depth):
+        branch = '' if depth == 0 else ('└─ ' if is_last else '├─ ')
+        name = f"{prefix}{branch}{node['id']}  {node['label']}"
+        print(f"{name[:52]:<52} {node['usage']['messages']:>5} "
+              f"{format_tokens(_total_tokens(node['usage'])):>12} "
+              f"{format_tokens(_total_tokens(node['inclusive'])):>12} "
+              f"${calculate_cost(node['usage']):>7.2f} ${calculate_cost(node['inclusive']):>7.2f}")
+        child_prefix = prefix if depth == 0 else prefix + ('   ' if is_last else '│  ')
+        for i, child in enumerate(node['children']):
+            show(child, child_prefix, i == len(node['children']) - 1, depth + 1)
+
+    show(root, '', True, 0)
+    print("-" * 100)
+
+# ---------------------------------------------------------------------------
+# Subagent concurrency: dispatch waves, parallelism and stragglers
+# ---------------------------------------------------------------------------
+
+def analyze_concurrency(filepath):
+    """Rebuild each subagent's run interval from the main transcript.
+
+    An agent starts at the timestamp of the Agent/Task tool_use that
+    dispatched it and ends at its tool_result, or at start + totalDurationMs
+    when that is later (background dispatches return before the agent
+    finishes). Agents whose intervals overlap form one wave. Per wave:
+    wall time, busy time (sum of agent durations), achieved parallelism
+    (busy / wall), peak concurrency, the critical-path agent (the last to
+    finish) and the straggler loss: wall time after the median agent had
+    finished.
+
+    Returns dict with agents (sorted by start) and waves, each wave
+    holding its agents plus start, end, wall, busy, parallelism, peak,
+    critical, straggler_loss and gap_before (idle seconds since the
+    previous wave ended).
+    """
+    dispatched = {}
+    agents = []
+    for data in iter_transcript_records(filepath):
+        if data.get('isSidechain'):
+            continue
+        ts = _parse_timestamp(data.get('timestamp'))
+        if data.get('type') == 'assistant':
+            for block in _content_blocks(data):
+                if (block.get('type') == 'tool_use' and block.get('name') in AGENT_TOOLS
+                        and block.get('id') not in dispatched and ts is not None):
+                    block_input = block.get('input') if isinstance(block.get('input'), dict) else {}
+                    dispatched[block['id']] = {'label': _agent_label(block_input) or block['id'],
+                                               'start': ts}
+        elif data.get('type') == 'user':
+            for block in _content_blocks(data):
+                agent = dispatched.pop(block.get('tool_use_id'), None) if block.get('type') == 'tool_result' else None
+                if agent is None or ts is None:
+                    continue
+                result = data.get('toolUseResult') if isinstance(data.get('toolUseResult'), dict) else {}
+                end = ts
+                duration_ms = result.get('totalDurationMs')
+                if isinstance(duration_ms, (int, float)):
+                    end = max(end, agent['start'] + duration_ms / 1000)
+                agent['end'] = end
+                agent['duration'] = end - agent['start']
+                agents.append(agent)
+    agents.sort(key=lambda agent: (agent['start'], agent['end']))
+
+    waves = []
+    for agent in agents:
+        if waves and agent['start'] < waves[-1]['end']:
+            wave = waves[-1]
+            wave['agents'].append(agent)
+            wave['end'] = max(wave['end'], agent['end'])
+        else:
+            waves.append({'agents': [agent], 'start': agent['start'], 'end': agent['end']})
+    previous_end = None
+    for wave in waves:
+        wave_agents = wave['agents']
+        wave['wall'] = wave['end'] - wave['start']
+        wave['busy'] = sum(agent['duration'] for agent in wave_agents)
+        wave['parallelism'] = wave['busy'] / wave['wall'] if wave['wall'] > 0 else float(len(wave_agents))
+        wave['critical'] = max(wave_agents, key=lambda agent: agent['end'])
+        # Peak concurrency: sweep starts (+1) and ends (-1), ends first on ties
+        running = 0
+        wave['peak'] = 0
+        for _, step in sorted([(agent['start'], 1) for agent in wave_agents]
+                              + [(agent['end'], -1) for agent in wave_agents]):
+            running += step
+            wave['peak'] = max(wave['peak'], running)
+        wave['straggler_loss'] = wave['end'] - _percentile([agent['end'] for agent in wave_agents], 50)
+        wave['gap_before'] = wave['start'] - previous_end if previous_end is not None else None
+        previous_end = wave['end']
+    return {'agents': agents, 'waves': waves}
+
+def _format_seconds(seconds):
+    """Format a duration as 42s, 3m05s or 1h02m."""
+    seconds = max(0, round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+def print_concurrency_report(profile, width=60):
+    """Print the concurrency timeline, per-wave efficiency and straggler totals."""
+    agents = profile['agents']
+    waves = profile['waves']
+    print()
+    print("SUBAGENT CONCURRENCY:")
+    print("-" * 100)
+    if not agents:
+        print("  No completed Agent/Task dispatches with timestamps found.")
+        print("-" * 100)
+        return
+
+    start = waves[0]['start']
+    span = waves[-1]['end'] - start
+    wall = sum(wave['wall'] for wave in waves)
+    busy = sum(wave['busy'] for wave in waves)
+    gaps = sum(wave['gap_before'] or 0 for wave in waves)
+    lost = sum(wave['straggler_loss'] for wave in waves)
+    print(f"  Agents: {len(agents)}   waves: {len(waves)}   span: {_format_seconds(span)}   "
+          f"agents running: {_format_seconds(wall)}   idle between waves: {_format_seconds(gaps)}")
+    print(f"  Achieved parallelism: {busy / wall if wall > 0 else 0.0:.2f}   "
+          f"peak: {max(wave['peak'] for wave in waves)} agents at once   "
+          f"straggler loss: {_format_seconds(lost)}")
     print()
+
+    # One column per slice of the span; digit = agents active during the slice
+    if span > 0:
+        row = []
+        for column in range(width):
+            low = start + column * span / width
+            high = start + (column + 1) * span / width
+            active = sum(1 for agent in agents if agent['start'] < high and agent['end'] > low)
+            row.append('.' if active == 0 else (str(active) if active < 10 else '+'))
+        print(f"  Timeline (agents active; '.' = none): |{''.join(row)}|")
+        print()
+
+    print(f"  {'Wave':<5} {'Start':<10} {'Agents':>6} {'Wall':>8} {'Par.':>5} {'Straggler':>9} "
+          f"{'Gap before':>10}  Critical path")
+    for number, wave in enumerate(waves, 1):
+        gap = _format_seconds(wave['gap_before']) if wave['gap_before'] is not None else '-'
+        critical = wave['critical']
+        print(f"  {number:<5} {'+' + _format_seconds(wave['start'] - start):<10} {len(wave['agents']):>6} "
+              f"{_format_seconds(wave['wall']):>8} {wave['parallelism']:>5.2f} "
+              f"{_format_seconds(wave['straggler_loss']):>9} {gap:>10}  "
+              f"{critical['label'][:40]} ({_format_seconds(critical['duration'])})")
+    print("-" * 100)
+
+# ---------------------------------------------------------------------------
+# A/B compare: two sets of sessions, bootstrap CIs from analyze-v2.py
+# ---------------------------------------------------------------------------
+
+COMPARE_METRICS = (
+    ('session_cost', 'Cost / session', '$'),
+    ('session_tokens', 'Tokens / session', ''),
+    ('call_cost', 'Cost / call', '$'),
+    ('call_tokens', 'Tokens / call', ''),
+)
+
+def _load_analyze_v2():
+    """Load tests/verification/analyze-v2.py (hyphenated filename) for its statistics.
+
+    Returns the module, or None when numpy or the file is unavailable; the
+    rest of this script stays stdlib-only.
+    """
+    import importlib.util
+    path = Path(__file__).resolve().parent.parent / 'verification' / 'analyze-v2.py'
+    if not path.exists():
+        return None
+    spec = importlib.util.spec_from_file_location('analyze_v2', path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process-pool workers can unpickle its functions
+    sys.modules['analyze_v2'] = module
+    try:
+        spec.loader.exec_module(module)
+    except ImportError:
+        del sys.modules['analyze_v2']
+        return None
+    return module
+
+def _session_distribution(path, source):
+    """Summarize one session for comparison: totals plus per-call main-session samples."""
+    summary = {'path': str(path), 'session_cost': 0.0, 'session_tokens': 0,
+               'call_cost': [], 'call_tokens': []}
+    for row in iter_usage_rows(source):
+        tokens = sum(row[5:9])
+        summary['session_cost'] += row[9]
+        summary['session_tokens'] += tokens
+        if row[2] is None:
+            summary['call_cost'].append(row[9])
+            summary['call_tokens'].append(tokens)
+    return summary
+
+def _compare_worker(filepath):
+    """Summarize one session file or archive in a pool worker (list of summaries)."""
+    try:
+        if not is_archive(filepath):
+            return [_session_distribution(filepath, filepath)]
+        return [_session_distribution(f"{filepath}:{name}", stream)
+                for name, stream in iter_archive_sessions(filepath)]
+    except READ_ERRORS as e:
+        return [{'path': str(filepath), 'error': str(e)}]
+
+def collect_distributions(files, jobs):
+    """Summarize every session in files across a process pool, sorted by path."""
+    sessions = [summary for file_results in _map_files(_compare_worker, files, jobs)
+                for summary in file_results]
+    return sorted(sessions, key=lambda summary: summary['path'])
+
+def session_pair_key(path, pattern=None):
+    """Return the key that matches a session to its counterpart in the other set.
+
+    By default this is the transcript file name without suffixes. With
+    pattern, it is the first capture group (or the whole match) of
+    pattern.search over the session path, or None when it does not match.
+    """
+    if pattern is None:
+        return transcript_stem(path)
+    match = pattern.search(str(path))
+    if match is None:
+        return None
+    return match.group(1) if pattern.groups else match.group(0)
+
+def pair_sessions(baseline, candidate, pattern=None):
+    """Align baseline and candidate summaries by session_pair_key for --paired.
+
+    Returns (baseline, candidate, problems). The first two hold the matched
+    sessions in key order. problems describes every session that cannot be
+    paired: no key, a duplicate key, no counterpart, unreadable or without
+    usage. Callers must not drop sessions before pairing.
+    """
+    problems = []
+    keyed = []
+    for label, sessions in (('baseline', baseline), ('candidate', candidate)):
+        by_key = {}
+        for summary in sessions:
+            key = session_pair_key(summary['path'], pattern)
+            if key is None:
+                problems.append(f"{label} session {summary['path']} does not match --pair-key")
+            elif key in by_key:
+                problems.append(f"{label} sessions {by_key[key]['path']} and {summary['path']} "
+                                f"share pair key '{key}'")
+            else:
+                by_key[key] = summary
+        keyed.append(by_key)
+    before, after = keyed
+
+    for key in sorted(before.keys() ^ after.keys()):
+        label, summary = ('baseline', before[key]) if key in before else ('candidate', after[key])
+        problems.append(f"{label} session {summary['path']} has no counterpart (pair key '{key}')")
+    matched = sorted(before.keys() & after.keys())
+    for key in matched:
+        for label, summary in (('baseline', before[key]), ('candidate', after[key])):
+            if 'error' in summary:
+                problems.append(f"{label} session {summary['path']} is unreadable: {summary['error']}")
+            elif not summary['session_tokens']:
+                problems.append(f"{label} session {summary['path']} has no usage")
+    return [before[key] for key in matched], [after[key] for key in matched], problems
+
+def compare_sessions(baseline, candidate, stats, paired=False):
+    """Compare two lists of session summaries metric by metric.
+
+    Each set gets a bootstrap CI on its median. The difference of medians
+    (candidate - baseline) gets an unpaired two-sample bootstrap CI; with
+    paired=True the session metrics are paired by position (lists aligned
+    by pair_sessions) instead, with a bootstrap CI on the median paired
+    difference and a Wilcoxon signed-rank test. Per-call metrics are always
+    unpaired.
+    """
+    rows = []
+    for key, label, unit in COMPARE_METRICS:
+        per_session = not key.startswith('call_')
+        if per_session:
+            before = [s[key] for s in baseline]
+            after = [s[key] for s in candidate]
+        else:
+            before = [value for s in baseline for value in s[key]]
+            after = [value for s in candidate for value in s[key]]
+        row = {'metric': label, 'unit': unit,
+               'baseline': stats.bootstrap_ci(before), 'candidate': stats.bootstrap_ci(after),
+               'wilcoxon': None}
+        if paired and per_session:
+            deltas = [a - b for a, b in zip(after, before)]
+            row['delta'] = stats.bootstrap_ci(deltas)
+            row['wilcoxon'] = stats.wilcoxon_signed_rank(after, before)
+        else:
+            row['delta'] = stats.bootstrap_diff_ci(after, before)
+        rows.append(row)
+    return rows
+
+def _format_compact(value, unit):
+    """Format a dollar amount or token count compactly: -$1.25, $0.0312, 1.4M, 53.2k."""
+    if value != value:
+        return 'n/a'
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    if unit == '$':
+        return f"{sign}${value:,.2f}" if value >= 1 else f"{sign}${value:.4f}"
+    for threshold, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'k')):
+        if value >= threshold:
+            return f"{sign}{value / threshold:.1f}{suffix}"
+    return f"{sign}{value:.0f}"
+
+def _format_ci(estimate, unit):
+    """Format 'point [lower, upper]' for tokens or dollars."""
+    return (f"{_format_compact(estimate['point_estimate'], unit)} "
+            f"[{_format_compact(estimate['ci_lower'], unit)}, {_format_compact(estimate['ci_upper'], unit)}]")
+
+def print_compare_report(rows, n_baseline, n_candidate, paired=False):
+    """Print medians with 95% CIs per set, the difference and a verdict per metric."""
     print("=" * 100)
+    print("A/B COMPARISON (candidate vs baseline, medians with 95% bootstrap CIs)")
+    print("=" * 100)
+    print(f"  Sessions: baseline {n_baseline}, candidate {n_candidate}"
+          f"{'   (paired by session key)' if paired else ''}")
+    print()
+    print(f"  {'Metric':<17} {'Baseline':<27} {'Candidate':<27} {'Difference':<27}")
+    print("-" * 100)
+    for row in rows:
+        print(f"  {row['metric']:<17} {_format_ci(row['baseline'], row['unit']):<27} "
+              f"{_format_ci(row['candidate'], row['unit']):<27} {_format_ci(row['delta'], row['unit']):<27}")
+    print("-" * 100)
+    for row in rows:
+        delta = row['delta']
+        if delta['ci_upper'] < 0:
+            verdict = 'candidate is lower (CI excludes 0)'
+        elif delta['ci_lower'] > 0:
+            verdict = 'candidate is higher (CI excludes 0)'
+        else:
+            verdict = 'no detectable difference (CI includes 0)'
+        wilcoxon = row['wilcoxon']
+        if wilcoxon is not None:
+            p_value = wilcoxon['p_value']
+            verdict += (f"; Wilcoxon p = {p_value:.4f}" if p_value == p_value
+                        else f"; Wilcoxon n/a ({wilcoxon['method']})")
+        print(f"  {row['metric']:<17} {verdict}")
+    print()
+    print("=" * 100)
+
+def main_compare(args):
+    """Handle --baseline: compare the PATH sessions (candidate) against the baseline set."""
+    stats = _load_analyze_v2()
+    if stats is None:
+        print("Error: --baseline needs numpy and tests/verification/analyze-v2.py")
+        sys.exit(1)
+    baseline_files = discover_session_files(args.baseline)
+    candidate_files = discover_session_files(args.paths)
+    for label, paths, files in (('baseline', args.baseline, baseline_files),
+                                ('candidate', args.paths, candidate_files)):
+        if not files:
+            print(f"Error: No {label} session files found in: {' '.join(paths)}")
+            sys.exit(1)
+
+    baseline = collect_distributions(baseline_files, args.jobs)
+    candidate = collect_distributions(candidate_files, args.jobs)
+    if args.paired:
+        # Pair before anything is dropped, so one missing session cannot shift the rest
+        baseline, candidate, problems = pair_sessions(baseline, candidate, args.pair_key)
+        if problems:
+            print("Error: --paired needs every session matched to one with usage in the other set:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+    else:
+        for summary in baseline + candidate:
+            if 'error' in summary:
+                print(f"  Skipped unreadable file {summary['path']}: {summary['error']}")
+        # Sessions without usage (empty or unparseable files) would drag medians to 0
+        baseline = [s for s in baseline if 'error' not in s and s['session_tokens']]
+        candidate = [s for s in candidate if 'error' not in s and s['session_tokens']]
+    for label, sessions in (('baseline', baseline), ('candidate', candidate)):
+        if not sessions:
+            print(f"Error: No {label} sessions with usage found")
+            sys.exit(1)
+    print_compare_report(compare_sessions(baseline, candidate, stats, args.paired),
+                         len(baseline), len(candidate), args.paired)
+
+def _since_date(value):
+    """argparse type for --since: a YYYY-MM-DD date, normalized."""
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD") from None
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Analyze token usage from Claude Code session transcripts.")
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help="session .jsonl file, or directories/globs for a batch rollup")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="worker processes for batch mode (default: CPU count)")
+    parser.add_argument('--top', type=int, default=20,
+                        help="agent descriptions to list in batch mode (default: 20)")
+    parser.add_argument('--no-progress', action='store_true',
+                        help="suppress the batch progress indicator")
+    parser.add_argument('--watch', action='store_true',
+                        help="parse only lines appended since the last run, keeping "
+                             "running totals in a sidecar checkpoint")
+    parser.add_argument('--follow', action='store_true',
+                        help="like --watch, but keep polling and refresh the report")
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="seconds between polls with --follow (default: 2)")
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help="checkpoint file (default: <session>.usage-checkpoint.json)")
+    parser.add_argument('--ingest', metavar='DB',
+                        help="add new or changed sessions under PATH to a SQLite usage index and exit")
+    parser.add_argument('--index', metavar='DB',
+                        help="report from a SQLite usage index, ingesting changed PATHs first "
+                             "(no PATH: report on the whole index)")
+    parser.add_argument('--export', metavar='FILE',
+                        help="write one row per usage event of the PATH sessions to FILE "
+                             "(.npz needs numpy; .parquet/.arrow need pyarrow) and exit")
+    parser.add_argument('--latency', action='store_true',
+                        help="add a per-turn latency and tokens/s profile (single session)")
+    parser.add_argument('--cache', action='store_true',
+                        help="add a prompt-cache hit ratio timeline with cache-bust detection "
+                             "(single session)")
+    parser.add_argument('--context', action='store_true',
+                        help="add effective context size per call with compactions, per-phase "
+                             "growth rates and projections to the 200k/1M limits (single session)")
+    parser.add_argument('--tools', action='store_true',
+                        help="add tool-result attribution: which tool outputs grew the input "
+                             "and what carrying them cost (single session)")
+    parser.add_argument('--waves', action='store_true',
+                        help="add a subagent concurrency timeline with per-wave parallelism, "
+                             "idle gaps and straggler loss (single session)")
+    parser.add_argument('--tree', action='store_true',
+                        help="add the subagent dispatch tree with inclusive/exclusive cost, "
+                             "reading sidechain transcripts (single session)")
+    parser.add_argument('--baseline', nargs='+', metavar='PATH',
+                        help="compare the PATH sessions (candidate) against these baseline sessions "
+                             "with bootstrap CIs (needs numpy)")
+    parser.add_argument('--paired', action='store_true',
+                        help="with --baseline, pair sessions by transcript file name and add a "
+                             "Wilcoxon signed-rank test")
+    parser.add_argument('--pair-key', type=re.compile, metavar='REGEX',
+                        help="with --paired, pair by the first group (or whole match) of REGEX "
+                             "in the session path instead of the file name")
+    parser.add_argument('--since', type=_since_date, metavar='YYYY-MM-DD',
+                        help="with --index, only count usage on or after this UTC date")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.index:
+        parser.error("at least one PATH is required")
+    if args.pair_key and not args.paired:
+        parser.error("--pair-key needs --paired")
+    if args.since and not args.index:
+        parser.error("--since needs --index")
+    if args.ingest or args.index:
+        # The index modes return before any other report runs
+        ignored = [flag for flag, value in (
+            ('--index', args.ingest and args.index), ('--watch', args.watch),
+            ('--follow', args.follow), ('--checkpoint', args.checkpoint),
+            ('--export', args.export), ('--latency', args.latency), ('--cache', args.cache),
+            ('--context', args.context), ('--tools', args.tools), ('--waves', args.waves),
+            ('--tree', args.tree), ('--baseline', args.baseline), ('--paired', args.paired),
+        ) if value]
+        if ignored:
+            mode = '--ingest' if args.ingest else '--index'
+            parser.error(f"{mode} cannot be combined with {', '.join(ignored)}")
+    return args
+
+def _is_single_session(paths):
+    """Return True when the arguments name exactly one transcript file."""
+    return (len(paths) == 1 and not glob.has_magic(paths[0])
+            and not Path(paths[0]).is_dir() and not is_archive(paths[0]))
+
+def main_index(args):
+    """Handle --ingest and --index: keep the SQLite index fresh, then query it."""
+    db_path = args.ingest or args.index
+    files = discover_session_files(args.paths) if args.paths else []
+    if args.paths and not files:
+        print(f"Error: No session files found in: {' '.join(args.paths)}")
+        sys.exit(1)
+
+    progress = not args.no_progress and sys.stderr.isatty()
+    conn = open_index(db_path)
+    try:
+        summary = ingest_sessions(conn, files, args.jobs, progress)
+        if args.ingest:
+            print(f"Indexed {summary['ingested']} session(s) ({format_tokens(summary['rows'])} usage rows), "
+                  f"skipped {summary['skipped']} unchanged, into {db_path}")
+            for path, error in summary['errors']:
+                print(f"  Skipped unreadable file {path}: {error}")
+            return
+
+        if _is_single_session(args.paths) and not args.since:
+            started = time.perf_counter()
+            main_usage, subagent_usage = index_session_usage(conn, args.paths[0])
+            scan_stats = {'index_seconds': time.perf_counter() - started}
+            print_session_report(main_usage, subagent_usage, scan_stats)
+            return
+
+        rollup = index_rollup(conn, files or None, args.since)
+        rollup['errors'] = summary['errors']
+        print_batch_report(rollup, args.top)
+    finally:
+        conn.close()
+
+def main():
+    args = parse_args()
+
+    if args.ingest or args.index:
+        main_index(args)
+        return
+    if args.baseline:
+        main_compare(args)
+        return
+    if args.export:
+        main_export(args)
+        return
+
+    if _is_single_session(args.paths):
+        main_session_file = args.paths[0]
+        if not Path(main_session_file).exists():
+            print(f"Error: Session file not found: {main_session_file}")
+            sys.exit(1)
+
+        if (args.watch or args.follow) and detect_compression(main_session_file):
+            print("Error: --watch/--follow need an uncompressed, growing session file")
+            sys.exit(1)
+        if args.watch or args.follow:
+            checkpoint_path = args.checkpoint or default_checkpoint_path(main_session_file)
+            if args.follow:
+                follow_session(main_session_file, checkpoint_path, args.interval)
+                return
+            scan_stats = {}
+            state = update_session_checkpoint(main_session_file, checkpoint_path, scan_stats)
+            print_session_report(state['main'], state['subagents'], scan_stats)
+            return
+
+        # Analyze the session
+        scan_stats = {}
+        main_usage, subagent_usage = analyze_main_session(main_session_file, scan_stats)
+        print_session_report(main_usage, subagent_usage, scan_stats)
+        if args.latency:
+            print_latency_report(analyze_latency(main_session_file), args.top)
+        if args.cache:
+            print_cache_report(analyze_cache(main_session_file), top=args.top)
+        if args.context:
+            print_context_report(analyze_context(main_session_file))
+        if args.tools:
+            print_tool_report(analyze_tool_results(main_session_file), args.top)
+        if args.tree:
+            print_agent_tree(build_agent_tree(main_session_file))
+        if args.waves:
+            print_concurrency_report(analyze_concurrency(main_session_file))
+        return
+
+    if args.watch or args.follow:
+        print("Error: --watch/--follow take a single session file")
+        sys.exit(1)
+    if args.latency or args.cache or args.context or args.tools or args.tree or args.waves:
+        print("Error: --latency/--cache/--context/--tools/--tree/--waves take a single session file")
+        sys.exit(1)
+
+    files = discover_session_files(args.paths)
+    if not files:
+        print(f"Error: No session files found in: {' '.join(args.paths)}")
+        sys.exit(1)
+
+    progress = not args.no_progress and sys.stderr.isatty()
+    rollup = run_batch(files, args.jobs, progress)
+    print_batch_report(rollup, args.top)
 
 if __name__ == '__main__':
     main()
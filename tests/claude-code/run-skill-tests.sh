@@ -53,6 +53,7 @@ while [[ $# -gt 0 ]]; do
             echo "Tests:"
             echo "  test-subagent-driven-development.sh  Test skill loading and requirements"
             echo "  test-reviewer-prompt-parity.sh       Verify agent/template prompt match"
+            echo "  test-token-usage-rows.sh             Verify per-message usage row attribution"
             echo "  ../verification/test-workflow-contract-audit.sh  Verify cross-surface workflow contracts"
             echo ""
             echo "Integration Tests (use --integration):"
@@ -71,6 +72,7 @@ done
 tests=(
     "test-subagent-driven-development.sh"
     "test-reviewer-prompt-parity.sh"
+    "test-token-usage-rows.sh"
     "../verification/test-workflow-contract-audit.sh"
 )
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env bash
+# Verify analyze-token-usage.py attributes per-message usage rows correctly.
+# A later line of a main-session message (same message.id, grown usage) must
+# fold into that message's row, even when a subagent result or another main
+# message is written in between. Runs the script directly — no Claude Code
+# session needed.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]:-$0}")" && pwd)"
+ANALYZER="$SCRIPT_DIR/analyze-token-usage.py"
+
+PASS=0
+FAIL=0
+
+echo "=== Token Usage Row Tests ==="
+echo ""
+
+TMP_DIR="$(mktemp -d)"
+trap 'rm -rf "$TMP_DIR"' EXIT
+SESSION="$TMP_DIR/session.jsonl"
+
+# msg_1 streams 5 then 500 output tokens; a subagent result and msg_2 land
+# between its two lines.
+cat > "$SESSION" <<'EOF'
+{"type":"assistant","timestamp":"2026-10-01T10:00:00Z","message":{"id":"msg_1","model":"claude-sonnet-4-5","content":[{"type":"text","text":"a"}],"usage":{"input_tokens":10,"output_tokens":5}}}
+{"type":"user","timestamp":"2026-10-01T10:00:01Z","toolUseResult":{"agentId":"agent_1","prompt":"Review the diff","usage":{"input_tokens":40,"output_tokens":100}},"message":{"content":[{"type":"tool_result","tool_use_id":"toolu_1"}]}}
+{"type":"assistant","timestamp":"2026-10-01T10:00:02Z","message":{"id":"msg_2","model":"claude-sonnet-4-5","content":[{"type":"text","text":"b"}],"usage":{"input_tokens":20,"output_tokens":7}}}
+{"type":"assistant","timestamp":"2026-10-01T10:00:03Z","message":{"id":"msg_1","model":"claude-sonnet-4-5","content":[{"type":"text","text":"c"}],"usage":{"input_tokens":10,"output_tokens":500}}}
+EOF
+
+rows=$(python3 - "$ANALYZER" "$SESSION" <<'PY'
+import importlib.util
+import sys
+
+spec = importlib.util.spec_from_file_location("analyze_token_usage", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+for row in module.iter_usage_rows(sys.argv[2]):
+    print(f"{row[2] or 'main'} in={row[5]} out={row[6]}")
+PY
+)
+
+check() {
+  local expected="$1" name="$2"
+  if grep -qx "$expected" <<< "$rows"; then
+    echo "PASS: $name"
+    PASS=$((PASS + 1))
+  else
+    echo "FAIL: $name (expected '$expected')"
+    echo "$rows" | sed 's/^/      /'
+    FAIL=$((FAIL + 1))
+  fi
+}
+
+check "main in=10 out=500" "later line of msg_1 folds into msg_1's row"
+check "main in=20 out=7" "msg_2 keeps only its own usage"
+check "agent_1 in=40 out=100" "subagent row keeps only the subagent's usage"
+
+row_count=$(wc -l <<< "$rows" | tr -d ' ')
+if [[ "$row_count" -eq 3 ]]; then
+  echo "PASS: one row per message"
+  PASS=$((PASS + 1))
+else
+  echo "FAIL: expected 3 rows, got $row_count"
+  FAIL=$((FAIL + 1))
+fi
+
+echo ""
+echo "=== Results: $PASS passed, $FAIL failed ==="
+if [[ $FAIL -gt 0 ]]; then
+  exit 1
+fi
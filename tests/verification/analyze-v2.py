@@ -1,42 +1,504 @@
 #!/usr/bin/env python3
 """Shared statistical analysis for V2 verification experiments.
 
-Provides bootstrap confidence intervals and Wilcoxon signed-rank test
-for Experiment B (latency) and Experiment C (reflective).
+Provides bootstrap confidence intervals (one- and two-sample), Wilcoxon
+signed-rank test and a paired sign-flip permutation test for Experiment B
+(latency) and Experiment C (reflective), a Friedman omnibus with
+Holm-corrected pairwise tests for k conditions, plus group-sequential interim
+boundaries and a study simulator used by analyze-v3.py / analyze-v4.py
+--interim and --plan. Bootstrap and permutation results are memoized in an
+on-disk cache keyed by their inputs (see cached_result); --no-cache
+bypasses it for one run.
+analyze-token-usage.py --baseline also loads these primitives.
 
 Usage:
-    python3 analyze-v2.py latency <results.csv>
-    python3 analyze-v2.py reflective <results.csv> [session_results.csv]
+    python3 analyze-v2.py latency <results.csv> [--bca] [--resamples N] [--workers N] [--no-cache]
+    python3 analyze-v2.py reflective <results.csv> [session_results.csv] [--no-cache]
+    python3 analyze-v2.py conditions <results.csv> [--no-cache]
 
 Dependencies: numpy (2.1.0). No scipy required.
 """
 
 import csv
+import functools
+import hashlib
+import importlib.machinery
+import inspect
 import json
 import math
+import multiprocessing
 import os
+import sqlite3
+import statistics
 import sys
+import time
+import types
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 
 
+# ---------------------------------------------------------------------------
+# On-disk result cache
+# ---------------------------------------------------------------------------
+
+# Bump to drop every stored result. Editing the module that defines a cached
+# function or statistic already changes its keys. Older entries stop matching
+RESULT_CACHE_VERSION = 1
+# Least recently used entries are evicted beyond this many bytes of results
+RESULT_CACHE_MAX_BYTES = 32 * 2 ** 20
+# Overrides the cache directory; an empty value disables caching
+RESULT_CACHE_ENV = "ANALYZE_CACHE_DIR"
+
+RESULT_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size  INTEGER NOT NULL,
+    used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results(used);
+"""
+
+_result_cache_conn = None
+_result_cache_disabled = False
+
+
+def default_cache_dir():
+    """Return the result cache directory ($ANALYZE_CACHE_DIR or the XDG cache)."""
+    cache_dir = os.environ.get(RESULT_CACHE_ENV)
+    if cache_dir is not None:
+        return cache_dir
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "superpowers-bd", "analyze")
+
+
+def _result_cache():
+    """Open the result cache once per process; None when disabled or unusable."""
+    global _result_cache_conn, _result_cache_disabled
+    if _result_cache_conn is not None or _result_cache_disabled:
+        return _result_cache_conn
+    cache_dir = default_cache_dir()
+    try:
+        if not cache_dir:
+            raise OSError("result cache disabled")
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(cache_dir, "results.sqlite"), timeout=5)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(RESULT_CACHE_SCHEMA)
+    except (OSError, sqlite3.Error):
+        _result_cache_disabled = True
+        return None
+    _result_cache_conn = conn
+    return conn
+
+
+def take_no_cache_flag(argv):
+    """Remove --no-cache from argv in place; if present, disable the result cache.
+
+    Shared by the analyze-v2/v3/v4 command lines so every rerun can bypass
+    stored results without touching $ANALYZE_CACHE_DIR.
+    """
+    global _result_cache_conn, _result_cache_disabled
+    if "--no-cache" not in argv:
+        return
+    argv[:] = [arg for arg in argv if arg != "--no-cache"]
+    if _result_cache_conn is not None:
+        _result_cache_conn.close()
+        _result_cache_conn = None
+    _result_cache_disabled = True
+
+
+def _code_digest(code, digest):
+    """Feed a code object (and nested ones) into digest, skipping addresses."""
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source_digest(module_name):
+    """Digest of a loaded module's source, or "" when it cannot be read."""
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (KeyError, OSError, TypeError):
+        return ""
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def _callable_token(fn):
+    """Stable identity of a statistic function, or None (lambdas, closures).
+
+    Module-qualified name plus a digest of its bytecode and of its module's
+    source, so editing the function or a helper it calls in the same module
+    also changes its cache key.
+    """
+    if isinstance(fn, functools.partial):
+        inner = _callable_token(fn.func)
+        if inner is None:
+            return None
+        return f"partial({inner}, {fn.args!r}, {sorted(fn.keywords.items())!r})"
+    module = getattr(fn, "__module__", None)
+    qualname = getattr(fn, "__qualname__", None)
+    if not module or not qualname or "<" in qualname:
+        return None
+    code = getattr(inspect.unwrap(fn), "__code__", None)
+    if code is None:
+        return f"{module}.{qualname}"
+    digest = hashlib.sha256(_module_source_digest(module).encode())
+    _code_digest(code, digest)
+    return f"{module}.{qualname}:{digest.hexdigest()[:16]}"
+
+
+def _result_key(func, signature, args, kwargs, normalize):
+    """Content hash of a call, or None when an argument has no stable identity."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    digest = hashlib.sha256(f"{RESULT_CACHE_VERSION}|{np.__version__}|{_callable_token(func)}".encode())
+    for name, value in bound.arguments.items():
+        if name in normalize:
+            value = normalize[name](value)
+        if callable(value):
+            token = _callable_token(value)
+            if token is None:
+                return None
+        elif isinstance(value, (np.ndarray, list, tuple)):
+            arr = np.ascontiguousarray(value, dtype=float)
+            token = f"array{arr.shape}:{hashlib.sha256(arr.tobytes()).hexdigest()}"
+        else:
+            token = repr(value)
+        digest.update(f"|{name}={token}".encode())
+    return digest.hexdigest()
+
+
+def _evict_results(conn):
+    """Drop least recently used results until the store fits RESULT_CACHE_MAX_BYTES."""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= RESULT_CACHE_MAX_BYTES:
+        return
+    stale = []
+    for key, size in conn.execute("SELECT key, size FROM results ORDER BY used"):
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        stale.append((key,))
+        total -= size
+    conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+
+def cached_result(normalize=None):
+    """Decorator: memoize a statistics function's dict result on disk.
+
+    The key hashes the cache version, numpy version, the function's
+    identity (name, bytecode and module source) and every bound argument:
+    array contents, the statistic's identity and scalar parameters such
+    as n_resamples, ci, seed and method. Results
+    are stored as JSON, whose float repr round-trips exactly, so a hit is
+    bit-identical to recomputing. Calls whose statistic has no stable
+    identity (lambdas, closures) are computed uncached, and any cache
+    error falls back to computing.
+
+    Args:
+        normalize: Optional {parameter: fn} applied to values before
+            hashing, for parameters that do not affect the result
+            beyond fn(value).
+    """
+    normalize = normalize or {}
+
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = _result_cache()
+            key = None if conn is None else _result_key(func, signature, args, kwargs, normalize)
+            if key is None:
+                return func(*args, **kwargs)
+            try:
+                row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    with conn:
+                        conn.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                    return json.loads(row[0])
+            except sqlite3.Error:
+                return func(*args, **kwargs)
+            result = func(*args, **kwargs)
+            value = json.dumps(result)
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                 (key, value, len(value), time.time()))
+                    _evict_results(conn)
+            except sqlite3.Error:
+                pass
+            return result
+        return wrapper
+    return decorate
+
+
 # ---------------------------------------------------------------------------
 # Statistical primitives
 # ---------------------------------------------------------------------------
 
-def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42):
+# Peak elements per resample chunk (index matrix + resampled values):
+# 2**22 elements is ~32 MB of int64 indices plus ~32 MB of float64 values.
+BOOTSTRAP_CHUNK_ELEMENTS = 2 ** 22
+
+# Resamples per independently seeded block of the parallel bootstrap. Fixed,
+# so block boundaries (and results) do not depend on the worker count.
+BOOTSTRAP_BLOCK_RESAMPLES = 2 ** 16
+
+# Statistics with an equivalent axis-wise reduction; results are identical
+# to np.apply_along_axis(stat_fn, 1, ...) row by row.
+_AXIS_REDUCERS = {
+    np.mean: lambda arr: np.mean(arr, axis=1),
+    np.median: lambda arr: np.median(arr, axis=1),
+    np.std: lambda arr: np.std(arr, axis=1),
+    np.var: lambda arr: np.var(arr, axis=1),
+    np.min: lambda arr: np.min(arr, axis=1),
+    np.max: lambda arr: np.max(arr, axis=1),
+    np.sum: lambda arr: np.sum(arr, axis=1),
+}
+
+
+def _axis_reducer(stat_fn):
+    """Return a row-wise reduction equivalent to stat_fn, or None if unknown.
+
+    Recognizes the functions in _AXIS_REDUCERS and functools.partial of
+    np.quantile / np.percentile with a scalar q, e.g.
+    partial(np.percentile, q=90).
+    """
+    reducer = _AXIS_REDUCERS.get(stat_fn)
+    if reducer is not None:
+        return reducer
+    if (isinstance(stat_fn, functools.partial) and stat_fn.func in (np.quantile, np.percentile)
+            and not stat_fn.args and set(stat_fn.keywords) == {"q"} and np.ndim(stat_fn.keywords["q"]) == 0):
+        func, q = stat_fn.func, stat_fn.keywords["q"]
+        return lambda arr: func(arr, q, axis=1)
+    return None
+
+
+def _row_reducer(stat_fn):
+    """Return a function applying stat_fn to every row of a 2-D array."""
+    reducer = _axis_reducer(stat_fn)
+    if reducer is None:
+        def reducer(arr):
+            return np.apply_along_axis(stat_fn, axis=1, arr=arr)
+    return reducer
+
+
+def bootstrap_joint_distribution(samples, stat_fn, n_resamples, rng):
+    """Compute stat_fn over n_resamples joint bootstrap resamples of several samples.
+
+    Each resample row holds fresh indices for every sample side by side (one
+    rng.integers draw with a per-column upper bound), so row r of every
+    sample comes from the same draw, in the same order as a loop of
+    rng.choice calls per sample per iteration. Rows are drawn in chunks so
+    the index matrix never exceeds BOOTSTRAP_CHUNK_ELEMENTS; consecutive
+    chunks consume the generator exactly like one full draw, so results
+    match an unchunked run under the same seed. Known statistics run as one
+    axis-wise reduction per chunk; other callables fall back to
+    np.apply_along_axis.
+
+    Args:
+        samples: List of non-empty 1-D numpy arrays.
+        stat_fn: Statistic function. Must accept 1-D array.
+        n_resamples: Number of bootstrap resamples.
+        rng: numpy Generator to draw resample indices from.
+
+    Returns:
+        List of numpy arrays of shape (n_resamples,), one per sample.
+    """
+    sizes = [len(sample) for sample in samples]
+    total = sum(sizes)
+    # A scalar bound draws the same stream as a constant per-column bound, faster
+    high = sizes[0] if len(samples) == 1 else np.repeat(sizes, sizes)
+    bounds = np.cumsum([0] + sizes)
+    reducer = _row_reducer(stat_fn)
+    chunk_rows = max(1, BOOTSTRAP_CHUNK_ELEMENTS // total)
+    stats = [np.empty(n_resamples, dtype=float) for _ in samples]
+    for start in range(0, n_resamples, chunk_rows):
+        rows = min(chunk_rows, n_resamples - start)
+        indices = rng.integers(0, high, size=(rows, total))
+        for k, sample in enumerate(samples):
+            stats[k][start:start + rows] = reducer(sample[indices[:, bounds[k]:bounds[k + 1]]])
+    return stats
+
+
+def bootstrap_distribution(values, stat_fn, n_resamples, rng):
+    """Compute stat_fn over n_resamples bootstrap resamples of one sample.
+
+    See bootstrap_joint_distribution for chunking and reproducibility.
+
+    Args:
+        values: 1-D numpy array of observed values (non-empty).
+        stat_fn: Statistic function. Must accept 1-D array.
+        n_resamples: Number of bootstrap resamples.
+        rng: numpy Generator to draw resample indices from.
+
+    Returns:
+        numpy array of shape (n_resamples,) with one statistic per resample.
+    """
+    return bootstrap_joint_distribution([values], stat_fn, n_resamples, rng)[0]
+
+
+def _bootstrap_block(task):
+    """Process-pool task: one seeded block of bootstrap_joint_distribution."""
+    samples, stat_fn, n_resamples, seed_seq = task
+    return bootstrap_joint_distribution(samples, stat_fn, n_resamples,
+                                        np.random.default_rng(seed_seq))
+
+
+def _workers_can_import():
+    """Return True when pool workers can unpickle this module's functions.
+
+    Forked workers inherit sys.modules. Spawned and forkserver workers
+    re-import the module by name, which only works for a script run
+    directly or a module findable on sys.path, not one loaded from a file
+    path under another name.
+    """
+    if sys.modules.get(__name__) is None:
+        return False
+    if __name__ == "__main__" or multiprocessing.get_start_method() == "fork":
+        return True
+    return importlib.machinery.PathFinder.find_spec(__name__) is not None
+
+
+def parallel_bootstrap_joint_distribution(samples, stat_fn, n_resamples, seed, workers):
+    """Like bootstrap_joint_distribution, split across a process pool.
+
+    Resamples are cut into blocks of BOOTSTRAP_BLOCK_RESAMPLES, and block i
+    draws from its own generator seeded by child i of
+    np.random.SeedSequence(seed).spawn(n_blocks). Blocks are reassembled in
+    order, so the output is bit-identical for any worker count; it differs
+    from a single-generator run under the same seed. stat_fn must be
+    picklable (a module-level function or functools.partial of one).
+
+    Args:
+        samples: List of non-empty 1-D numpy arrays.
+        stat_fn: Statistic function. Must accept 1-D array.
+        n_resamples: Number of bootstrap resamples.
+        seed: Root seed for the per-block streams.
+        workers: Worker processes; 0 means os.cpu_count(), 1 runs in-process
+            (as does any count when workers could not import this module).
+
+    Returns:
+        List of numpy arrays of shape (n_resamples,), one per sample.
+    """
+    n_blocks = -(-n_resamples // BOOTSTRAP_BLOCK_RESAMPLES)
+    children = np.random.SeedSequence(seed).spawn(n_blocks)
+    tasks = [(samples, stat_fn, min(BOOTSTRAP_BLOCK_RESAMPLES, n_resamples - i * BOOTSTRAP_BLOCK_RESAMPLES),
+              child) for i, child in enumerate(children)]
+    workers = min(workers or os.cpu_count() or 1, n_blocks)
+    if workers <= 1 or not _workers_can_import():
+        blocks = [_bootstrap_block(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_bootstrap_block, tasks))
+    return [np.concatenate([block[k] for block in blocks] or [np.empty(0)])
+            for k in range(len(samples))]
+
+
+def _resample_statistics(samples, stat_fn, n_resamples, seed, workers):
+    """Bootstrap distributions: one seeded generator, or per-block streams."""
+    if workers is None:
+        return bootstrap_joint_distribution(samples, stat_fn, n_resamples,
+                                            np.random.default_rng(seed))
+    return parallel_bootstrap_joint_distribution(samples, stat_fn, n_resamples, seed, workers)
+
+
+def jackknife_distribution(values, stat_fn):
+    """Compute stat_fn on every leave-one-out subsample of values.
+
+    Subsamples are built as index rows in chunks, like bootstrap resamples.
+
+    Args:
+        values: 1-D numpy array of observed values (at least 2).
+        stat_fn: Statistic function. Must accept 1-D array.
+
+    Returns:
+        numpy array of shape (n,); entry i omits values[i].
+    """
+    n = len(values)
+    reducer = _row_reducer(stat_fn)
+    cols = np.arange(n - 1)
+    stats = np.empty(n, dtype=float)
+    chunk_rows = max(1, BOOTSTRAP_CHUNK_ELEMENTS // n)
+    for start in range(0, n, chunk_rows):
+        omitted = np.arange(start, min(n, start + chunk_rows))
+        indices = cols[None, :] + (cols[None, :] >= omitted[:, None])
+        stats[omitted] = reducer(values[indices])
+    return stats
+
+
+def _jackknife_influence(values, stat_fn):
+    """Jackknife influence values of stat_fn on values (zeros if n < 2)."""
+    if len(values) < 2:
+        return np.zeros(len(values))
+    leave_one_out = jackknife_distribution(values, stat_fn)
+    return leave_one_out.mean() - leave_one_out
+
+
+def _bca_bounds(boot_stats, point, influences, ci):
+    """Bias-corrected and accelerated (BCa) percentile bounds.
+
+    Bias correction z0 comes from the share of bootstrap statistics below
+    the point estimate. Acceleration comes from jackknife influence values
+    (mean of leave-one-out statistics minus each one), pooled across
+    samples as in Efron & Tibshirani (1993), ch. 14.
+
+    Args:
+        boot_stats: Bootstrap distribution of the statistic.
+        point: Point estimate on the observed data.
+        influences: List of jackknife influence arrays, one per sample.
+        ci: Confidence level.
+
+    Returns:
+        (lower, upper) tuple of floats.
+    """
+    normal = statistics.NormalDist()
+    n_resamples = len(boot_stats)
+    below = np.count_nonzero(boot_stats < point) / n_resamples
+    # Keep z0 finite when every resample falls on one side of the estimate
+    below = min(max(below, 0.5 / n_resamples), 1 - 0.5 / n_resamples)
+    z0 = normal.inv_cdf(below)
+
+    numerator = sum(float(np.sum(u ** 3)) / len(u) ** 3 for u in influences if len(u))
+    denominator = 6.0 * sum(float(np.sum(u ** 2)) / len(u) ** 2 for u in influences if len(u)) ** 1.5
+    accel = numerator / denominator if denominator > 0 else 0.0
+
+    alpha = 1.0 - ci
+    bounds = []
+    for z_alpha in (normal.inv_cdf(alpha / 2), normal.inv_cdf(1 - alpha / 2)):
+        shifted = z0 + z_alpha
+        bounds.append(float(np.percentile(boot_stats, 100 * normal.cdf(z0 + shifted / (1 - accel * shifted)))))
+    return bounds[0], bounds[1]
+
+
+@cached_result(normalize={"workers": lambda workers: workers is not None})
+def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42,
+                 method="percentile", workers=None):
     """Compute bootstrap confidence interval for a statistic.
 
     Args:
         values: Array-like of observed values.
         stat_fn: Statistic function (default: np.median). Must accept 1-D array.
+            Mean, median, quantiles and other known reductions are vectorized
+            (see bootstrap_joint_distribution).
         n_resamples: Number of bootstrap resamples (default: 10,000).
         ci: Confidence level (default: 0.95).
         seed: RNG seed for reproducibility.
+        method: "percentile" (default) or "bca" (bias-corrected and accelerated).
+        workers: None (default) draws every resample from one generator
+            seeded with seed. An int uses per-block SeedSequence streams over
+            that many processes (0 = all cores); see
+            parallel_bootstrap_joint_distribution.
 
     Returns:
-        dict with keys: point_estimate, ci_lower, ci_upper, ci_level, n, n_resamples
+        dict with keys: point_estimate, ci_lower, ci_upper, ci_level, n, n_resamples, method
     """
     values = np.asarray(values, dtype=float)
     n = len(values)
@@ -48,19 +510,21 @@ def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42
             "ci_level": ci,
             "n": 0,
             "n_resamples": n_resamples,
+            "method": method,
         }
 
-    rng = np.random.default_rng(seed)
     point = float(stat_fn(values))
 
-    # Generate all resamples at once: shape (n_resamples, n)
-    indices = rng.integers(0, n, size=(n_resamples, n))
-    resampled = values[indices]
-    bootstrap_stats = np.apply_along_axis(stat_fn, axis=1, arr=resampled)
+    bootstrap_stats = _resample_statistics([values], stat_fn, n_resamples, seed, workers)[0]
 
-    alpha = 1.0 - ci
-    lower = float(np.percentile(bootstrap_stats, 100 * alpha / 2))
-    upper = float(np.percentile(bootstrap_stats, 100 * (1 - alpha / 2)))
+    if method == "bca":
+        lower, upper = _bca_bounds(bootstrap_stats, point, [_jackknife_influence(values, stat_fn)], ci)
+    elif method == "percentile":
+        alpha = 1.0 - ci
+        lower = float(np.percentile(bootstrap_stats, 100 * alpha / 2))
+        upper = float(np.percentile(bootstrap_stats, 100 * (1 - alpha / 2)))
+    else:
+        raise ValueError(f"Unknown bootstrap CI method {method!r}; use 'percentile' or 'bca'")
 
     return {
         "point_estimate": point,
@@ -69,6 +533,72 @@ def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42
         "ci_level": ci,
         "n": n,
         "n_resamples": n_resamples,
+        "method": method,
+    }
+
+
+@cached_result(normalize={"workers": lambda workers: workers is not None})
+def bootstrap_diff_ci(x, y, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42,
+                      method="percentile", workers=None):
+    """Compute bootstrap confidence interval for stat(x) - stat(y), unpaired.
+
+    Each sample is resampled independently, so x and y may differ in length.
+    Every resample draws x's indices then y's from one generator, matching a
+    loop of rng.choice(x) / rng.choice(y) per iteration.
+
+    Args:
+        x: Array-like of first sample values.
+        y: Array-like of second sample values.
+        stat_fn: Statistic function (default: np.median). Must accept 1-D array.
+        n_resamples: Number of bootstrap resamples (default: 10,000).
+        ci: Confidence level (default: 0.95).
+        seed: RNG seed for reproducibility.
+        method: "percentile" (default) or "bca" (bias-corrected and accelerated).
+        workers: None (default) for one seeded generator, or a process count
+            for per-block streams (see bootstrap_ci).
+
+    Returns:
+        dict with keys: point_estimate, ci_lower, ci_upper, ci_level, n_x, n_y, n_resamples, method
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) == 0 or len(y) == 0:
+        return {
+            "point_estimate": float("nan"),
+            "ci_lower": float("nan"),
+            "ci_upper": float("nan"),
+            "ci_level": ci,
+            "n_x": len(x),
+            "n_y": len(y),
+            "n_resamples": n_resamples,
+            "method": method,
+        }
+
+    point = float(stat_fn(x) - stat_fn(y))
+
+    x_stats, y_stats = _resample_statistics([x, y], stat_fn, n_resamples, seed, workers)
+    diffs = x_stats - y_stats
+
+    if method == "bca":
+        # Leaving out a y value moves the difference the opposite way
+        influences = [_jackknife_influence(x, stat_fn), -_jackknife_influence(y, stat_fn)]
+        lower, upper = _bca_bounds(diffs, point, influences, ci)
+    elif method == "percentile":
+        alpha = 1.0 - ci
+        lower = float(np.percentile(diffs, 100 * alpha / 2))
+        upper = float(np.percentile(diffs, 100 * (1 - alpha / 2)))
+    else:
+        raise ValueError(f"Unknown bootstrap CI method {method!r}; use 'percentile' or 'bca'")
+
+    return {
+        "point_estimate": point,
+        "ci_lower": lower,
+        "ci_upper": upper,
+        "ci_level": ci,
+        "n_x": len(x),
+        "n_y": len(y),
+        "n_resamples": n_resamples,
+        "method": method,
     }
 
 
@@ -80,6 +610,10 @@ def _normal_cdf(z):
 def _rank_with_ties(values):
     """Assign ranks to values, averaging ranks for tied values.
 
+    Vectorized: np.unique sorts once and returns each value's tie group
+    and group sizes; a group ending at 1-based position e with c members
+    gets the average rank e - (c - 1) / 2.
+
     Args:
         values: 1-D array-like of values to rank.
 
@@ -87,29 +621,55 @@ def _rank_with_ties(values):
         numpy array of ranks (1-based, ties averaged).
     """
     arr = np.asarray(values, dtype=float)
-    n = len(arr)
-    order = np.argsort(arr)
-    ranks = np.empty(n, dtype=float)
+    _, inverse, counts = np.unique(arr, return_inverse=True, return_counts=True)
+    group_ends = np.cumsum(counts)
+    return (group_ends - (counts - 1) / 2.0)[inverse.reshape(-1)]
+
+
+# Below this many nonzero differences the exact null distribution is used
+WILCOXON_EXACT_MAX_N = 9
+
+
+@functools.lru_cache(maxsize=None)
+def _signed_rank_null_counts(doubled_ranks):
+    """Count sign assignments giving each value of 2*T+ under the null.
+
+    Every rank is positive or negative with equal probability, so the null
+    distribution of T+ is the subset-sum distribution of the ranks, built
+    by dynamic programming. Ranks are doubled so tied (half-integer) ranks
+    stay integral. Cached per rank tuple: without ties that is one entry
+    per n.
+
+    Args:
+        doubled_ranks: Tuple of ints, 2 * rank for each nonzero difference.
+
+    Returns:
+        Read-only numpy int64 array; entry t counts subsets summing to t.
+    """
+    counts = np.zeros(sum(doubled_ranks) + 1, dtype=np.int64)
+    counts[0] = 1
+    for rank in doubled_ranks:
+        shifted = counts.copy()
+        shifted[rank:] += counts[:len(counts) - rank]
+        counts = shifted
+    counts.setflags(write=False)
+    return counts
 
-    i = 0
-    while i < n:
-        # Find run of tied values
-        j = i + 1
-        while j < n and arr[order[j]] == arr[order[i]]:
-            j += 1
-        # Average rank for ties (ranks are 1-based)
-        avg_rank = (i + 1 + j) / 2.0
-        for k in range(i, j):
-            ranks[order[k]] = avg_rank
-        i = j
 
-    return ranks
+def _exact_signed_rank_p(ranks, t_stat):
+    """Two-sided exact p-value of the smaller signed-rank sum t_stat."""
+    doubled = tuple(sorted(int(round(2 * r)) for r in ranks))
+    counts = _signed_rank_null_counts(doubled)
+    tail = int(counts[:int(round(2 * t_stat)) + 1].sum())
+    return min(1.0, 2.0 * tail / 2 ** len(doubled))
 
 
 def wilcoxon_signed_rank(x, y):
     """Wilcoxon signed-rank test for paired samples.
 
-    Pure Python + numpy implementation (no scipy).
+    Pure Python + numpy implementation (no scipy). Up to
+    WILCOXON_EXACT_MAX_N nonzero differences the p-value is exact;
+    above that it uses the tie-corrected normal approximation.
 
     Args:
         x: Array-like of first sample values.
@@ -155,16 +715,17 @@ def wilcoxon_signed_rank(x, y):
     t_stat = min(t_plus, t_minus)
 
     # Step 5: Significance
-    if n < 10:
+    if n <= WILCOXON_EXACT_MAX_N:
+        # Exact null distribution (conditional on tied ranks)
         return {
             "T_plus": t_plus,
             "T_minus": t_minus,
             "T_stat": t_stat,
             "n_nonzero": n,
             "z_stat": float("nan"),
-            "p_value": float("nan"),
-            "sufficient": False,
-            "method": "insufficient_sample_size",
+            "p_value": round(_exact_signed_rank_p(ranks, t_stat), 6),
+            "sufficient": True,
+            "method": "exact",
         }
 
     # Normal approximation for n >= 10
@@ -209,6 +770,418 @@ def wilcoxon_signed_rank(x, y):
     }
 
 
+# Up to this many pairs every sign pattern is enumerated (2**20 ~ 1M rows)
+PERMUTATION_EXACT_MAX_N = 20
+
+
+def sign_flip_pvalues(deltas, n_permutations=100_000, seed=42,
+                      exact_max_n=PERMUTATION_EXACT_MAX_N):
+    """Two-sided sign-flip p-values for one or more paired-delta columns.
+
+    Under H0 each paired difference is symmetric about zero, so its sign
+    is exchangeable. Flip patterns are packed bit matrices (one bit per
+    pair, uint8 rows); after unpacking, the permuted sums of a whole chunk
+    and of every column come from one matrix product:
+    sum - 2 * (bits @ deltas). All columns share the same patterns, and a
+    column's p equals the one it gets on its own. Up to exact_max_n pairs
+    all 2**n patterns are enumerated (the binary codes 0..2**n-1 are the
+    packed rows) and p is exact; above that, n_permutations random
+    patterns give a Monte-Carlo p of (extreme + 1) / (n_permutations + 1).
+    Chunks are capped at BOOTSTRAP_CHUNK_ELEMENTS bits.
+
+    Args:
+        deltas: Array-like of shape (n,) or (n, m): paired differences,
+            one column per comparison.
+        n_permutations: Random flip patterns when n > exact_max_n.
+        seed: Random seed for reproducibility.
+        exact_max_n: Largest n enumerated exhaustively.
+
+    Returns:
+        tuple: (p-value array of shape (m,), patterns used, "exact" or
+        "monte_carlo")
+    """
+    d = np.asarray(deltas, dtype=float)
+    if d.ndim == 1:
+        d = d[:, None]
+    n = d.shape[0]
+
+    exact = n <= exact_max_n
+    total = 2 ** n if exact else n_permutations
+    rng = None if exact else np.random.default_rng(seed)
+    d_sum = d.sum(axis=0)
+    # Patterns tying the observed |sum| count as extreme despite rounding
+    threshold = np.abs(d_sum) - 1e-9 * np.maximum(1.0, np.abs(d).sum(axis=0))
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // n)
+
+    extreme = np.zeros(d.shape[1], dtype=np.int64)
+    for start in range(0, total, chunk):
+        rows = min(chunk, total - start)
+        if exact:
+            codes = np.arange(start, start + rows, dtype="<u8")
+            packed = codes.view(np.uint8).reshape(rows, 8)
+        else:
+            packed = rng.integers(0, 256, size=(rows, (n + 7) // 8), dtype=np.uint8)
+        bits = np.unpackbits(packed, axis=1, count=n, bitorder="little")
+        sums = d_sum - 2.0 * (bits @ d)
+        extreme += np.count_nonzero(np.abs(sums) >= threshold, axis=0)
+
+    p_values = extreme / total if exact else (extreme + 1) / (total + 1)
+    return p_values, total, "exact" if exact else "monte_carlo"
+
+
+@cached_result()
+def sign_flip_test(delta, n_permutations=100_000, seed=42,
+                   exact_max_n=PERMUTATION_EXACT_MAX_N):
+    """Paired sign-flip permutation test on the mean difference.
+
+    Single-column form of sign_flip_pvalues (exact up to exact_max_n
+    pairs, Monte-Carlo above).
+
+    Args:
+        delta: 1-D array-like of paired differences (treatment - baseline).
+        n_permutations: Random flip patterns when n > exact_max_n.
+        seed: Random seed for reproducibility.
+        exact_max_n: Largest n enumerated exhaustively.
+
+    Returns:
+        dict with keys: mean_delta, p_value, n, n_permutations, method
+    """
+    d = np.asarray(delta, dtype=float)
+    n = len(d)
+    if n == 0:
+        return {"mean_delta": float("nan"), "p_value": 1.0, "n": 0,
+                "n_permutations": 0, "method": "no_data"}
+
+    p_values, total, method = sign_flip_pvalues(d, n_permutations, seed, exact_max_n)
+    return {
+        "mean_delta": float(d.mean()),
+        "p_value": round(float(p_values[0]), 6),
+        "n": n,
+        "n_permutations": total,
+        "method": method,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Group-sequential interim analysis
+# ---------------------------------------------------------------------------
+
+# Pre-registered defaults: one-sided alpha 0.025 (two-sided 0.05), 80% power
+SEQUENTIAL_ALPHA = 0.025
+SEQUENTIAL_BETA = 0.20
+# Standardized paired effect (Cohen's d_z) the futility boundary is built for
+SEQUENTIAL_EFFECT_SIZE = 0.8
+# Grid points per look for the numerical integration of crossing probabilities
+SEQUENTIAL_GRID_POINTS = 1001
+# Grid half-width in standard deviations of the score at each look
+SEQUENTIAL_GRID_SDS = 10.0
+
+
+def obrien_fleming_spending(t, rate):
+    """Lan-DeMets O'Brien-Fleming-type error spending function.
+
+    Args:
+        t: Information fraction (pairs so far / planned pairs).
+        rate: Total error to spend by t = 1.
+
+    Returns:
+        Cumulative error spent by t: 2 - 2 * Phi(z_{1 - rate/2} / sqrt(t)).
+    """
+    if t <= 0:
+        return 0.0
+    normal = statistics.NormalDist()
+    return 2.0 * (1.0 - normal.cdf(normal.inv_cdf(1.0 - rate / 2.0) / math.sqrt(min(t, 1.0))))
+
+
+def _score_density(points, prev_points, prev_density, step, drift):
+    """Sub-density of the score statistic S at points after step more pairs.
+
+    S_n = Z_n * sqrt(n) has independent N(drift * step, step) increments.
+    prev_density is the sub-density on the previous look's continuation
+    grid (None at the first look) and is integrated with the trapezoid rule.
+    """
+    scale = math.sqrt(step)
+    norm = scale * math.sqrt(2.0 * math.pi)
+    if prev_points is None:
+        return np.exp(-0.5 * ((points - drift * step) / scale) ** 2) / norm
+    weights = np.full(len(prev_points), prev_points[1] - prev_points[0])
+    weights[[0, -1]] *= 0.5
+    kernel = np.exp(-0.5 * ((points[:, None] - prev_points[None, :] - drift * step) / scale) ** 2)
+    return kernel @ (weights * prev_density) / norm
+
+
+def _tail_boundary(points, density, target, upper):
+    """Point b on the grid with sub-density mass target above (or below) b."""
+    cells = 0.5 * (density[1:] + density[:-1]) * np.diff(points)
+    if upper:
+        above = np.concatenate([np.cumsum(cells[::-1])[::-1], [0.0]])
+        if target <= 0:
+            return math.inf
+        if target >= above[0]:
+            return -math.inf
+        return float(np.interp(target, above[::-1], points[::-1]))
+    below = np.concatenate([[0.0], np.cumsum(cells)])
+    if target <= 0:
+        return -math.inf
+    if target >= below[-1]:
+        return math.inf
+    return float(np.interp(target, below, points))
+
+
+def _spend_boundaries(planned, rate, drift, upper, opposite):
+    """z-boundaries spending rate under drift at looks after 1..planned pairs.
+
+    upper=True spends through an upper (efficacy) boundary, otherwise a lower
+    (futility) one. opposite lists the other boundary per look; it may be
+    None for an upper boundary (non-binding futility is ignored).
+    A lower boundary is capped at the upper one and meets it at the last look.
+    """
+    bounds = []
+    spent = 0.0
+    prev_points = prev_density = None
+    for n in range(1, planned + 1):
+        sd = math.sqrt(n)
+        step = 1 if prev_points is not None else n
+        if n > 1 and prev_points is None:
+            # Every path stopped at an earlier look
+            bounds.append(opposite[n - 1] if opposite is not None else math.inf)
+            continue
+        points = np.linspace(drift * n - SEQUENTIAL_GRID_SDS * sd,
+                             drift * n + SEQUENTIAL_GRID_SDS * sd, SEQUENTIAL_GRID_POINTS)
+        density = _score_density(points, prev_points, prev_density, step, drift)
+        target = obrien_fleming_spending(n / planned, rate) - spent
+        spent += target
+        bound = _tail_boundary(points, density, target, upper) / sd
+        if not upper:
+            bound = opposite[n - 1] if n == planned else min(bound, opposite[n - 1])
+        bounds.append(bound)
+
+        if upper:
+            lower, higher = (opposite[n - 1] if opposite is not None else -math.inf), bound
+        else:
+            lower, higher = bound, opposite[n - 1]
+        low_s = max(lower * sd, points[0])
+        high_s = min(higher * sd, points[-1])
+        if high_s <= low_s:
+            prev_points = prev_density = None
+            continue
+        region = np.linspace(low_s, high_s, SEQUENTIAL_GRID_POINTS)
+        prev_density = _score_density(region, prev_points, prev_density, step, drift)
+        prev_points = region
+    return bounds
+
+
+def group_sequential_boundaries(planned, alpha=SEQUENTIAL_ALPHA, beta=SEQUENTIAL_BETA,
+                                effect_size=SEQUENTIAL_EFFECT_SIZE):
+    """Pre-registered efficacy and futility boundaries, one look per pair.
+
+    Efficacy spends alpha under H0 with an O'Brien-Fleming-type function,
+    ignoring futility (non-binding, so stopping for futility never inflates
+    alpha). Futility spends beta the same way under the alternative
+    effect_size with both boundaries in place. Crossing probabilities are
+    integrated numerically over the score's continuation region
+    (Armitage-McPherson-Rowe recursion). At the last look the boundaries
+    meet.
+
+    Args:
+        planned: Planned number of paired cycles (looks).
+        alpha: One-sided type I error to spend.
+        beta: Type II error to spend (1 - power).
+        effect_size: Alternative standardized paired effect (Cohen's d_z).
+
+    Returns:
+        List of dicts, one per look, with keys: look, information,
+        alpha_spent, beta_spent, efficacy_z, futility_z
+    """
+    efficacy = _spend_boundaries(planned, alpha, 0.0, True, None)
+    futility = _spend_boundaries(planned, beta, effect_size, False, efficacy)
+    return [
+        {
+            "look": n,
+            "information": round(n / planned, 4),
+            "alpha_spent": round(obrien_fleming_spending(n / planned, alpha), 6),
+            "beta_spent": round(obrien_fleming_spending(n / planned, beta), 6),
+            "efficacy_z": round(efficacy[n - 1], 4),
+            "futility_z": round(futility[n - 1], 4),
+        }
+        for n in range(1, planned + 1)
+    ]
+
+
+def interim_analysis(delta, planned, alpha=SEQUENTIAL_ALPHA, beta=SEQUENTIAL_BETA,
+                     effect_size=SEQUENTIAL_EFFECT_SIZE):
+    """Group-sequential interim decision on paired deltas.
+
+    The look statistic is the z-equivalent of the one-sided sign-flip
+    permutation p-value, signed by the mean delta, so it stays
+    distribution-free and honest at small n. Pairs beyond planned are
+    judged at the final look.
+
+    Args:
+        delta: 1-D array-like of paired differences (treatment - baseline).
+        planned: Planned number of paired cycles.
+        alpha: One-sided type I error to spend.
+        beta: Type II error to spend (1 - power).
+        effect_size: Alternative standardized paired effect (Cohen's d_z).
+
+    Returns:
+        dict with keys: n, planned, information, mean_delta, z_stat,
+        efficacy_z, futility_z, decision, boundaries, alpha, beta,
+        effect_size. decision is CONTINUE, STOP-CONFIRMED or STOP-FUTILE.
+    """
+    d = np.asarray(delta, dtype=float)
+    n = len(d)
+    boundaries = group_sequential_boundaries(planned, alpha, beta, effect_size)
+
+    if n == 0:
+        z_stat = 0.0
+        current = {"efficacy_z": math.inf, "futility_z": -math.inf}
+    else:
+        p_one_sided = sign_flip_test(d)["p_value"] / 2.0
+        z_stat = 0.0 if p_one_sided >= 0.5 else math.copysign(
+            statistics.NormalDist().inv_cdf(1.0 - p_one_sided), float(d.mean()))
+        current = boundaries[min(n, planned) - 1]
+
+    if z_stat >= current["efficacy_z"]:
+        decision = "STOP-CONFIRMED"
+    elif z_stat <= current["futility_z"]:
+        decision = "STOP-FUTILE"
+    else:
+        decision = "CONTINUE"
+
+    return {
+        "n": n,
+        "planned": planned,
+        "information": round(min(n / planned, 1.0), 4),
+        "mean_delta": float(d.mean()) if n > 0 else float("nan"),
+        "z_stat": round(z_stat, 4),
+        "efficacy_z": current["efficacy_z"],
+        "futility_z": current["futility_z"],
+        "decision": decision,
+        "boundaries": boundaries,
+        "alpha": alpha,
+        "beta": beta,
+        "effect_size": effect_size,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sample-size planning (simulation)
+# ---------------------------------------------------------------------------
+
+def simulate_paired_studies(treatment, baseline, runs, failures, n_cycles,
+                            n_studies=20_000, seed=42):
+    """Simulate studies of n_cycles cycles by resampling observed cycles.
+
+    Each study draws n_cycles observed cycles with replacement. A drawn
+    cycle brings its paired scores (NaN when either condition failed, so
+    it is not paired) and its individual run and parse-failure counts.
+    Draws are one index matrix per chunk of studies, and every per-study
+    statistic is a masked axis reduction.
+
+    Args:
+        treatment: Per-cycle treatment scores, NaN where the cycle is unpaired.
+        baseline: Per-cycle baseline scores, NaN where the cycle is unpaired.
+        runs: Per-cycle count of individual reviewer runs.
+        failures: Per-cycle count of individual parse failures.
+        n_cycles: Cycles per simulated study.
+        n_studies: Number of simulated studies.
+        seed: Random seed for reproducibility.
+
+    Returns:
+        dict of arrays of shape (n_studies,) with keys: n_paired, parse_rate,
+        mean_treatment, mean_baseline, stdev_treatment, stdev_baseline.
+        Means are NaN without pairs; stdevs use ddof=1 and are 0 below two
+        pairs, as in the analyzers.
+    """
+    scores = {"treatment": np.asarray(treatment, dtype=float),
+              "baseline": np.asarray(baseline, dtype=float)}
+    runs = np.asarray(runs, dtype=float)
+    failures = np.asarray(failures, dtype=float)
+    paired = ~(np.isnan(scores["treatment"]) | np.isnan(scores["baseline"]))
+    rng = np.random.default_rng(seed)
+
+    out = {key: np.empty(n_studies) for key in (
+        "n_paired", "parse_rate", "mean_treatment", "mean_baseline",
+        "stdev_treatment", "stdev_baseline")}
+    chunk_rows = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(1, n_cycles))
+    for start in range(0, n_studies, chunk_rows):
+        rows = min(chunk_rows, n_studies - start)
+        block = slice(start, start + rows)
+        indices = rng.integers(0, len(paired), size=(rows, n_cycles))
+        mask = paired[indices]
+        n_paired = mask.sum(axis=1)
+        total_runs = runs[indices].sum(axis=1)
+        out["n_paired"][block] = n_paired
+        out["parse_rate"][block] = np.divide(failures[indices].sum(axis=1), total_runs,
+                                             out=np.zeros(rows), where=total_runs > 0)
+        for name, values in scores.items():
+            drawn = np.where(mask, values[indices], 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = drawn.sum(axis=1) / n_paired
+                deviations = np.where(mask, drawn - mean[:, None], 0.0)
+                stdev = np.sqrt((deviations ** 2).sum(axis=1) / (n_paired - 1))
+            out["mean_" + name][block] = mean
+            out["stdev_" + name][block] = np.where(n_paired > 1, stdev, 0.0)
+    return out
+
+
+PLAN_TARGET = 0.8
+PLAN_MAX_CYCLES = 40
+PLAN_STUDIES = 20_000
+
+
+def plan_sample_size(treatment, baseline, runs, failures, stdev_ratio, decision_class,
+                     target=PLAN_TARGET, max_cycles=PLAN_MAX_CYCLES, n_studies=PLAN_STUDIES):
+    """Find the smallest cycle count that reaches VERIFIED with probability >= target.
+
+    For every candidate size from 1 to max_cycles, simulates n_studies studies
+    with simulate_paired_studies (same seed per size) and applies the caller's
+    stdev_ratio and decision_class to all simulated studies at once.
+
+    Args:
+        treatment, baseline, runs, failures: Per-cycle arrays as taken by
+            simulate_paired_studies.
+        stdev_ratio: Elementwise fn(n_paired, mean_treatment, mean_baseline,
+            stdev_treatment, stdev_baseline) -> float array.
+        decision_class: Elementwise fn(n_paired, parse_rate, stdev_ratio)
+            -> array of class names.
+        target: Required probability of a VERIFIED decision class.
+        max_cycles: Largest candidate cycle count.
+        n_studies: Simulated studies per candidate size.
+
+    Returns:
+        dict with keys: target, n_studies, observed_cycles, observed_paired,
+        sizes (list of per-size dicts), recommended (int or None)
+    """
+    sizes = []
+    recommended = None
+    for n_cycles in range(1, max_cycles + 1):
+        sim = simulate_paired_studies(treatment, baseline, runs, failures,
+                                      n_cycles, n_studies)
+        ratios = stdev_ratio(sim["n_paired"], sim["mean_treatment"], sim["mean_baseline"],
+                             sim["stdev_treatment"], sim["stdev_baseline"])
+        classes = decision_class(sim["n_paired"], sim["parse_rate"], ratios)
+        p_verified = float(np.mean(classes == "VERIFIED"))
+        sizes.append({
+            "cycles": n_cycles,
+            "p_verified": round(p_verified, 4),
+            "p_observed_or_better": round(float(np.mean(classes != "INCONCLUSIVE")), 4),
+            "median_n_paired": float(np.median(sim["n_paired"])),
+            "median_stdev_ratio": round(float(np.median(ratios)), 4),
+        })
+        if recommended is None and p_verified >= target:
+            recommended = n_cycles
+
+    return {
+        "target": target,
+        "n_studies": n_studies,
+        "observed_cycles": len(runs),
+        "observed_paired": int(np.sum(~np.isnan(np.asarray(treatment, dtype=float)))),
+        "sizes": sizes,
+        "recommended": recommended,
+    }
+
 # ---------------------------------------------------------------------------
 # Latency analysis (Experiment B)
 # ---------------------------------------------------------------------------
@@ -233,7 +1206,7 @@ def _classify_overhead(overhead_ms):
         return "BLOCKING"
 
 
-def analyze_latency(csv_path):
+def analyze_latency(csv_path, ci_method="percentile", n_resamples=10_000, workers=None):
     """Analyze Experiment B latency results.
 
     Reads CSV with columns: variant, run|cycle, duration_ms, status, attempt, pass_label
@@ -243,6 +1216,10 @@ def analyze_latency(csv_path):
 
     Args:
         csv_path: Path to latency results CSV.
+        ci_method: Bootstrap CI method, "percentile" (default) or "bca".
+        n_resamples: Bootstrap resamples per CI (default: 10,000).
+        workers: None (default) for the single-generator bootstrap, or a
+            process count for the parallel one (0 = all cores).
 
     Returns:
         dict with per-variant analysis and overall summary.
@@ -279,13 +1256,15 @@ def analyze_latency(csv_path):
 
     baseline_values = np.array(by_variant[baseline_key])
     baseline_median = float(np.median(baseline_values))
-    baseline_ci = bootstrap_ci(baseline_values)
+    baseline_ci = bootstrap_ci(baseline_values, n_resamples=n_resamples, method=ci_method,
+                               workers=workers)
 
     results = {
         "csv_path": csv_path,
         "total_runs": total_runs,
         "failed_runs": failed_runs,
         "failure_rate": round(failed_runs / total_runs, 4) if total_runs > 0 else 0,
+        "ci_method": ci_method,
         "baseline": {
             "variant": baseline_key,
             "n": len(baseline_values),
@@ -305,22 +1284,16 @@ def analyze_latency(csv_path):
         classification = _classify_overhead(overhead)
 
         # Bootstrap CI on overhead: resample each group independently
-        overhead_samples = []
-        rng = np.random.default_rng(42)
-        for _ in range(10_000):
-            v_sample = np.median(rng.choice(durations_arr, size=len(durations_arr), replace=True))
-            b_sample = np.median(rng.choice(baseline_values, size=len(baseline_values), replace=True))
-            overhead_samples.append(v_sample - b_sample)
-        overhead_samples = np.array(overhead_samples)
-        ci_lower = float(np.percentile(overhead_samples, 2.5))
-        ci_upper = float(np.percentile(overhead_samples, 97.5))
+        diff_ci = bootstrap_diff_ci(durations_arr, baseline_values, n_resamples=n_resamples,
+                                    method=ci_method, workers=workers)
         overhead_ci = {
             "point_estimate": overhead,
-            "ci_lower": ci_lower,
-            "ci_upper": ci_upper,
-            "ci_level": 0.95,
+            "ci_lower": diff_ci["ci_lower"],
+            "ci_upper": diff_ci["ci_upper"],
+            "ci_level": diff_ci["ci_level"],
             "n": len(durations_arr),
-            "n_resamples": 10_000,
+            "n_resamples": diff_ci["n_resamples"],
+            "method": ci_method,
         }
 
         # Proof level: OBSERVED is the honest ceiling for latency
@@ -416,7 +1389,8 @@ def analyze_reflective(csv_path, session_results_path=None):
     methods = sorted(set(row["method"] for row in rows))
     if len(methods) != 2:
         return {
-            "error": f"Expected exactly 2 methods, found {len(methods)}: {methods}",
+            "error": (f"Expected exactly 2 methods, found {len(methods)}: {methods}"
+                      " (use 'conditions' mode for more)"),
             "csv_path": csv_path,
         }
 
@@ -509,6 +1483,9 @@ def analyze_reflective(csv_path, session_results_path=None):
     # Wilcoxon signed-rank test
     wilcoxon = wilcoxon_signed_rank(scores_b, scores_a)
 
+    # Sign-flip permutation test on mean delta_score
+    permutation = sign_flip_test(delta_scores)
+
     # Bootstrap CI on mean delta_score
     delta_ci = bootstrap_ci(delta_scores, stat_fn=np.mean) if n_paired > 0 else bootstrap_ci([])
 
@@ -599,6 +1576,7 @@ def analyze_reflective(csv_path, session_results_path=None):
             "delta_recall": round(delta_recall, 4),
         },
         "wilcoxon": wilcoxon,
+        "permutation": permutation,
         "bootstrap_ci_delta": delta_ci,
         "verdict": verdict,
         "decision_class": decision_class,
@@ -615,6 +1593,335 @@ def analyze_reflective(csv_path, session_results_path=None):
     return results
 
 
+# ---------------------------------------------------------------------------
+# k-condition repeated-measures analysis (Friedman + post-hoc)
+# ---------------------------------------------------------------------------
+
+# Reference conditions, listed first so pairwise deltas read "other - reference"
+BASELINE_CONDITIONS = ("none", "baseline", "current", "uniform", "generalist")
+
+
+def _chi2_sf(x, df):
+    """Chi-square survival function for integer df (closed-form series)."""
+    if x <= 0:
+        return 1.0
+    half = x / 2.0
+    if df % 2 == 0:
+        term = total = 1.0
+        for i in range(1, df // 2):
+            term *= half / i
+            total += term
+        return min(1.0, math.exp(-half) * total)
+    total = math.erfc(math.sqrt(half))
+    for i in range(1, (df - 1) // 2 + 1):
+        total += math.exp(-half + (i - 0.5) * math.log(half) - math.lgamma(i + 0.5))
+    return min(1.0, total)
+
+
+def _rank_rows(matrix):
+    """Within-row ranks (1-based, ties averaged) of a 2-D array."""
+    less = (matrix[:, :, None] > matrix[:, None, :]).sum(axis=2)
+    equal = (matrix[:, :, None] == matrix[:, None, :]).sum(axis=2)
+    return less + (equal + 1) / 2.0
+
+
+def friedman_test(matrix, n_permutations=10_000, seed=42):
+    """Friedman rank test for k conditions measured on the same n blocks.
+
+    Ranks within each block (cycle), with the tie-corrected statistic
+    Q = (k-1) * (sum R_j^2 - n^2 k (k+1)^2 / 4) / (sum r_ij^2 - n k (k+1)^2 / 4).
+    The p-value comes from n_permutations within-block permutations of
+    the ranks, drawn as one random-key argsort per chunk. The denominator
+    is invariant under them, so each permuted Q is a row reduction. The
+    asymptotic chi-square (k-1 df) p-value is reported alongside.
+
+    Args:
+        matrix: Array-like of shape (n_blocks, k).
+        n_permutations: Within-block permutations for the p-value.
+        seed: Random seed for reproducibility.
+
+    Returns:
+        dict with keys: statistic, df, p_value, p_chi2, mean_ranks,
+        n_blocks, k, n_permutations
+    """
+    x = np.asarray(matrix, dtype=float)
+    n, k = x.shape
+    ranks = _rank_rows(x)
+    offset = n * k * (k + 1) ** 2 / 4.0
+    denominator = float((ranks ** 2).sum()) - offset
+    result = {"df": k - 1, "mean_ranks": [round(float(r), 4) for r in ranks.mean(axis=0)],
+              "n_blocks": n, "k": k, "n_permutations": n_permutations}
+    if denominator <= 0:
+        # Every block tied across all conditions
+        return dict(result, statistic=0.0, p_value=1.0, p_chi2=1.0)
+
+    def statistic(rank_sums):
+        return (k - 1) * ((rank_sums ** 2).sum(axis=-1) - n * offset) / denominator
+
+    observed = float(statistic(ranks.sum(axis=0)))
+    threshold = observed - 1e-9 * max(1.0, observed)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // (n * k))
+    extreme = 0
+    for start in range(0, n_permutations, chunk):
+        rows = min(chunk, n_permutations - start)
+        order = np.argsort(rng.random((rows, n, k)), axis=2)
+        permuted = np.take_along_axis(np.broadcast_to(ranks, (rows, n, k)), order, axis=2)
+        extreme += int(np.count_nonzero(statistic(permuted.sum(axis=1)) >= threshold))
+
+    return dict(result,
+                statistic=round(observed, 4),
+                p_value=round((extreme + 1) / (n_permutations + 1), 6),
+                p_chi2=round(_chi2_sf(observed, k - 1), 6))
+
+
+def holm_adjust(p_values):
+    """Holm step-down adjusted p-values (family-wise error control)."""
+    p = np.asarray(p_values, dtype=float)
+    m = len(p)
+    order = np.argsort(p, kind="stable")
+    adjusted = np.minimum(1.0, np.maximum.accumulate(p[order] * (m - np.arange(m))))
+    out = np.empty(m)
+    out[order] = adjusted
+    return out
+
+
+def paired_bootstrap_means(matrix, n_resamples, rng):
+    """Column means over bootstrap resamples of whole rows (blocks).
+
+    One index matrix per chunk resamples every column together, so all
+    pairwise differences come from the same resamples.
+
+    Args:
+        matrix: numpy array of shape (n_blocks, k).
+        n_resamples: Number of bootstrap resamples.
+        rng: numpy Generator to draw resample indices from.
+
+    Returns:
+        numpy array of shape (n_resamples, k).
+    """
+    n, k = matrix.shape
+    means = np.empty((n_resamples, k))
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // (n * k))
+    for start in range(0, n_resamples, chunk):
+        rows = min(chunk, n_resamples - start)
+        means[start:start + rows] = matrix[rng.integers(0, n, size=(rows, n))].mean(axis=1)
+    return means
+
+
+def posthoc_pairwise(matrix, names, n_resamples=10_000, ci=0.95, seed=42, alpha=0.05):
+    """All pairwise paired comparisons with Holm correction.
+
+    Column j - column i (i < j) for every pair. Sign-flip p-values for all
+    pairs share one flip matrix (sign_flip_pvalues), and bootstrap CIs on
+    the mean delta share one block-resample matrix
+    (paired_bootstrap_means).
+
+    Args:
+        matrix: Array-like of shape (n_blocks, k).
+        names: Condition names, one per column.
+        n_resamples: Bootstrap resamples for the CIs.
+        ci: Confidence level.
+        seed: Random seed for reproducibility.
+        alpha: Family-wise significance level for the Holm-adjusted p.
+
+    Returns:
+        List of dicts with keys: a, b, mean_delta, ci_lower, ci_upper,
+        p_value, p_holm, significant
+    """
+    x = np.asarray(matrix, dtype=float)
+    pairs = [(i, j) for i in range(len(names)) for j in range(i + 1, len(names))]
+    first, second = (np.array(side) for side in zip(*pairs))
+    deltas = x[:, second] - x[:, first]
+
+    p_values = sign_flip_pvalues(deltas, seed=seed)[0]
+    p_holm = holm_adjust(p_values)
+    means = paired_bootstrap_means(x, n_resamples, np.random.default_rng(seed))
+    boot_deltas = means[:, second] - means[:, first]
+    tail = 100 * (1.0 - ci) / 2
+    lower = np.percentile(boot_deltas, tail, axis=0)
+    upper = np.percentile(boot_deltas, 100 - tail, axis=0)
+
+    return [
+        {
+            "a": names[i],
+            "b": names[j],
+            "mean_delta": round(float(deltas[:, col].mean()), 4),
+            "ci_lower": float(lower[col]),
+            "ci_upper": float(upper[col]),
+            "p_value": round(float(p_values[col]), 6),
+            "p_holm": round(float(p_holm[col]), 6),
+            "significant": bool(p_holm[col] < alpha),
+        }
+        for col, (i, j) in enumerate(pairs)
+    ]
+
+
+def analyze_conditions(csv_path, alpha=0.05):
+    """Analyze k >= 2 conditions scored on the same cycles.
+
+    Reads CSV with columns: cycle|run, condition|method, score and an
+    optional parse_ok / parse_failed status (reflective results and
+    v3/v4 aggregates both qualify). Cycles where every condition parsed
+    form complete blocks for a Friedman omnibus test and Holm-corrected
+    pairwise post-hoc comparisons.
+
+    Args:
+        csv_path: Path to results CSV.
+        alpha: Significance level for the omnibus and Holm-adjusted tests.
+
+    Returns:
+        dict with per-condition summaries, friedman and pairwise results.
+    """
+    rows = _read_csv(csv_path)
+    if not rows:
+        return {"error": "No data rows found", "csv_path": csv_path}
+
+    cycle_key = "cycle" if "cycle" in rows[0] else "run"
+    condition_key = "condition" if "condition" in rows[0] else "method"
+    missing = [label for key, label in [(cycle_key, "cycle/run"),
+                                        (condition_key, "condition/method"),
+                                        ("score", "score")] if key not in rows[0]]
+    if missing:
+        return {"error": f"Missing required columns: {', '.join(missing)}",
+                "csv_path": csv_path}
+    parse_key = next((key for key in ("parse_ok", "parse_failed") if key in rows[0]), None)
+
+    scores = defaultdict(dict)
+    parse_failures = 0
+    for row in rows:
+        parse_ok = True
+        if parse_key == "parse_ok":
+            parse_ok = row[parse_key].lower() in ("true", "1", "yes")
+        elif parse_key == "parse_failed":
+            parse_ok = row[parse_key].lower() in ("false", "0", "no")
+        try:
+            score = float(row["score"]) if parse_ok else None
+        except ValueError:
+            score = None
+        if score is None:
+            parse_failures += 1
+            continue
+        scores[row[cycle_key]][row[condition_key]] = score
+
+    names = sorted(set(row[condition_key] for row in rows))
+    names = ([c for c in BASELINE_CONDITIONS if c in names]
+             + [c for c in names if c not in BASELINE_CONDITIONS])
+    if len(names) < 2:
+        return {"error": f"Expected at least 2 conditions, found {len(names)}: {names}",
+                "csv_path": csv_path}
+
+    blocks = [cycle for cycle in sorted(scores, key=lambda c: int(c) if c.isdigit() else c)
+              if all(name in scores[cycle] for name in names)]
+    if len(blocks) < 2:
+        return {"error": f"Need at least 2 cycles with every condition parsed, found {len(blocks)}",
+                "csv_path": csv_path}
+    matrix = np.array([[scores[cycle][name] for name in names] for cycle in blocks])
+
+    friedman = friedman_test(matrix)
+    pairwise = posthoc_pairwise(matrix, names, alpha=alpha)
+
+    results = {
+        "csv_path": csv_path,
+        "conditions": [
+            {"name": name,
+             "mean": round(float(matrix[:, col].mean()), 4),
+             "median": round(float(np.median(matrix[:, col])), 4),
+             "mean_rank": friedman["mean_ranks"][col]}
+            for col, name in enumerate(names)
+        ],
+        "n_blocks": len(blocks),
+        "total_runs": len(rows),
+        "parse_failures": parse_failures,
+        "alpha": alpha,
+        "friedman": friedman,
+        "omnibus_significant": friedman["p_value"] < alpha,
+        "pairwise": pairwise,
+    }
+
+    summary_path = csv_path.rsplit(".", 1)[0] + "-conditions-summary.json"
+    _write_json(summary_path, results)
+    results["summary_path"] = summary_path
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Found-tensor loader (per_area_json parsed once per row)
+# ---------------------------------------------------------------------------
+
+SEVERITY_LEVELS = ("none", "minor", "important", "critical")
+
+
+def load_found_tensor(scores_rows, area_ids):
+    """Parse per_area_json once per row into dense NumPy tensors.
+
+    Axes are cycle x condition x reviewer x area. Cycles sort numerically
+    when they are digits, conditions and reviewers are sorted, areas follow
+    area_ids. Rows whose parse_ok is false or whose JSON does not parse are
+    skipped. Duplicate rows for the same slot are merged (found OR-ed,
+    highest severity kept). Recall and find counts are then axis reductions.
+
+    Args:
+        scores_rows: Rows of scores.csv (cycle, condition, reviewer,
+            parse_ok, per_area_json).
+        area_ids: Area ids to index along the last axis.
+
+    Returns:
+        dict with keys: cycles, conditions, reviewers, areas (axis labels),
+        found (bool, shape (C, K, R, A)), severity (int8 index into
+        SEVERITY_LEVELS, 0 when absent), present (bool, shape (C, K, R),
+        True where a parsed row exists)
+    """
+    entries = []
+    for row in scores_rows:
+        if row.get("parse_ok", "false").lower() not in ("true", "1", "yes"):
+            continue
+        try:
+            per_area = json.loads(row["per_area_json"])
+        except (json.JSONDecodeError, KeyError):
+            continue
+        try:
+            reviewer_num = int(row.get("reviewer", 0))
+        except (ValueError, TypeError):
+            reviewer_num = 0
+        entries.append((row["cycle"], row["condition"], reviewer_num, per_area))
+
+    cycles = sorted({e[0] for e in entries}, key=lambda c: int(c) if c.isdigit() else c)
+    conditions = sorted({e[1] for e in entries})
+    reviewers = sorted({e[2] for e in entries})
+    areas = list(area_ids)
+    cycle_idx = {c: i for i, c in enumerate(cycles)}
+    condition_idx = {c: i for i, c in enumerate(conditions)}
+    reviewer_idx = {r: i for i, r in enumerate(reviewers)}
+    severity_idx = {s: i for i, s in enumerate(SEVERITY_LEVELS)}
+
+    slots, found_rows, severity_rows = [], [], []
+    for cycle, condition, reviewer_num, per_area in entries:
+        slots.append((cycle_idx[cycle], condition_idx[condition], reviewer_idx[reviewer_num]))
+        cells = [per_area.get(a, {}) for a in areas]
+        found_rows.append([bool(cell.get("found", False)) for cell in cells])
+        severity_rows.append([severity_idx.get(cell.get("severity"), 0) for cell in cells])
+
+    shape = (len(cycles), len(conditions), len(reviewers), len(areas))
+    found = np.zeros(shape, dtype=bool)
+    severity = np.zeros(shape, dtype=np.int8)
+    present = np.zeros(shape[:3], dtype=bool)
+    index = tuple(np.array(slots, dtype=np.intp).reshape(-1, 3).T)
+    present[index] = True
+    np.logical_or.at(found, index, np.array(found_rows, dtype=bool).reshape(-1, len(areas)))
+    np.maximum.at(severity, index, np.array(severity_rows, dtype=np.int8).reshape(-1, len(areas)))
+
+    return {
+        "cycles": cycles,
+        "conditions": conditions,
+        "reviewers": reviewers,
+        "areas": areas,
+        "found": found,
+        "severity": severity,
+        "present": present,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -683,6 +1990,8 @@ def _print_latency_report(results):
         print(f"{variant:<12} {data['n']:>4} {data['median_ms']:>9.0f}ms "
               f"{data['overhead_ms']:>+9.0f}ms {data['classification']:>10} {ci_str:>20}")
 
+    if results.get("ci_method") == "bca":
+        print("\nCIs: bias-corrected and accelerated (BCa) bootstrap")
     print(f"\nDecision class: {results['decision_class']}")
     print("=" * 60)
 
@@ -720,11 +2029,18 @@ def _print_reflective_report(results):
     print(f"\nWilcoxon signed-rank test:")
     print(f"  T+ = {w['T_plus']:.1f}, T- = {w['T_minus']:.1f}, T = {w['T_stat']:.1f}")
     print(f"  n_nonzero = {w['n_nonzero']}, method = {w['method']}")
-    if w["sufficient"]:
+    if w["method"] == "exact":
+        print(f"  exact p = {w['p_value']:.6f}")
+    elif w["sufficient"]:
         print(f"  z = {w['z_stat']:.4f}, p = {w['p_value']:.6f}")
     else:
         print(f"  Insufficient sample size for normal approximation")
 
+    perm = results["permutation"]
+    print(f"\nSign-flip permutation test ({perm['method']}, "
+          f"{perm['n_permutations']:,} flips):")
+    print(f"  p = {perm['p_value']:.6f}")
+
     print(f"\nBootstrap 95% CI on mean delta_score:")
     print(f"  [{ci['ci_lower']:.4f}, {ci['ci_upper']:.4f}]")
 
@@ -743,12 +2059,65 @@ def _print_reflective_report(results):
     print("=" * 60)
 
 
+def _print_conditions_report(results):
+    """Print human-readable k-condition analysis report."""
+    if "error" in results:
+        print(f"ERROR: {results['error']}")
+        return
+
+    print("\n" + "=" * 60)
+    print(f"K-CONDITION ANALYSIS ({len(results['conditions'])} conditions)")
+    print("=" * 60)
+
+    print(f"\nComplete cycles: {results['n_blocks']}  "
+          f"Parse failures: {results['parse_failures']}/{results['total_runs']}")
+
+    print(f"\n{'Condition':<20} {'Mean':>8} {'Median':>8} {'Mean rank':>10}")
+    print("-" * 49)
+    for cond in results["conditions"]:
+        print(f"{cond['name']:<20} {cond['mean']:>8.2f} {cond['median']:>8.2f} {cond['mean_rank']:>10.2f}")
+
+    f = results["friedman"]
+    print(f"\nFriedman test: Q = {f['statistic']:.4f}, df = {f['df']}")
+    print(f"  permutation p = {f['p_value']:.6f} ({f['n_permutations']:,} permutations), "
+          f"chi-square p = {f['p_chi2']:.6f}")
+    print(f"  Omnibus significant at {results['alpha']}: {results['omnibus_significant']}")
+
+    print("\nPairwise (B - A), sign-flip p with Holm correction:")
+    print(f"{'A':<14} {'B':<14} {'Delta':>8} {'95% CI':>20} {'p':>9} {'p_holm':>9}")
+    print("-" * 78)
+    for pair in results["pairwise"]:
+        ci_str = f"[{pair['ci_lower']:.2f}, {pair['ci_upper']:.2f}]"
+        flag = " *" if pair["significant"] else ""
+        print(f"{pair['a']:<14} {pair['b']:<14} {pair['mean_delta']:>+8.2f} {ci_str:>20} "
+              f"{pair['p_value']:>9.4f} {pair['p_holm']:>9.4f}{flag}")
+    if not results["omnibus_significant"]:
+        print("  (omnibus not significant: treat pairwise results as descriptive)")
+    print("=" * 60)
+
+
+def _option(options, flag, default, cast=int):
+    """Return the non-negative value after flag in options converted by cast, or default."""
+    if flag not in options:
+        return default
+    try:
+        value = cast(options[options.index(flag) + 1])
+    except (IndexError, ValueError):
+        value = None
+    if value is None or not value >= 0:
+        print(f"ERROR: {flag} needs a non-negative {'integer' if cast is int else 'number'}")
+        sys.exit(1)
+    return value
+
+
 def main():
     """CLI entry point."""
+    take_no_cache_flag(sys.argv)
     if len(sys.argv) < 3:
         print("Usage:")
-        print("  python3 analyze-v2.py latency <results.csv>")
-        print("  python3 analyze-v2.py reflective <results.csv> [session_results.csv]")
+        print("  python3 analyze-v2.py latency <results.csv> [--bca] [--resamples N] [--workers N] [--no-cache]")
+        print("  python3 analyze-v2.py reflective <results.csv> [session_results.csv] [--no-cache]")
+        print("  python3 analyze-v2.py conditions <results.csv> [--no-cache]")
         sys.exit(1)
 
     mode = sys.argv[1]
@@ -759,14 +2128,21 @@ def main():
         sys.exit(1)
 
     if mode == "latency":
-        results = analyze_latency(csv_path)
+        options = sys.argv[3:]
+        ci_method = "bca" if "--bca" in options else "percentile"
+        n_resamples = _option(options, "--resamples", 10_000)
+        workers = _option(options, "--workers", None)
+        results = analyze_latency(csv_path, ci_method, n_resamples, workers)
         _print_latency_report(results)
     elif mode == "reflective":
         session_path = sys.argv[3] if len(sys.argv) > 3 else None
         results = analyze_reflective(csv_path, session_path)
         _print_reflective_report(results)
+    elif mode == "conditions":
+        results = analyze_conditions(csv_path)
+        _print_conditions_report(results)
     else:
-        print(f"ERROR: Unknown mode '{mode}'. Use 'latency' or 'reflective'.")
+        print(f"ERROR: Unknown mode '{mode}'. Use 'latency', 'reflective' or 'conditions'.")
         sys.exit(1)
 
 
@@ -9,17 +9,29 @@ test-decorrelated-v3.sh. Computes:
   - Bootstrap 95% CI on mean aggregate delta_score
   - CONFIRMED / PARTIAL / DENIED / INCONCLUSIVE verdict
   - VERIFIED / OBSERVED / INCONCLUSIVE decision class
+  - Group-sequential interim decision (--interim): CONTINUE /
+    STOP-CONFIRMED / STOP-FUTILE after each cycle
+  - Sample-size plan (--plan): smallest cycle count reaching VERIFIED
+    with a target probability, simulated from the observed cycles
   - Per-domain recall analysis (descriptive only — 3 bugs per domain)
   - Individual reviewer in-domain recall analysis
   - JSON summary output to <aggregates_dir>/aggregates-summary.json
 
 Usage:
-    python3 analyze-v3.py <scores.csv> <aggregates.csv>
+    python3 analyze-v3.py <scores.csv> <aggregates.csv> [--no-cache]
+    python3 analyze-v3.py <scores.csv> <aggregates.csv> --interim \
+        [--planned-cycles N] [--effect-size D]
+    python3 analyze-v3.py <scores.csv> <aggregates.csv> --plan \
+        [--target P] [--max-cycles N] [--studies N]
+
+--no-cache recomputes bootstrap and permutation results instead of reading
+them from analyze-v2.py's on-disk result cache.
 
 Dependencies: numpy (2.1.0). No scipy required.
 
-Statistical primitives (wilcoxon_signed_rank, bootstrap_ci) are imported
-from analyze-v2.py via importlib since the filename is hyphenated.
+Statistical primitives (wilcoxon_signed_rank, bootstrap_ci, sign_flip_test)
+are imported from analyze-v2.py via importlib since the filename is
+hyphenated; the script exits with an error when analyze-v2.py is missing.
 """
 
 import csv
@@ -49,6 +61,8 @@ def _load_analyze_v2():
         if path.exists():
             spec = importlib.util.spec_from_file_location("analyze_v2", path)
             mod = importlib.util.module_from_spec(spec)
+            # Registered so process-pool workers can unpickle its functions
+            sys.modules["analyze_v2"] = mod
             spec.loader.exec_module(mod)
             return mod
     return None
@@ -58,79 +72,7 @@ _v2 = _load_analyze_v2()
 if _v2 is not None:
     wilcoxon_signed_rank = _v2.wilcoxon_signed_rank
     bootstrap_ci = _v2.bootstrap_ci
-else:
-    # Fallback: minimal local copies (analyze-v2.py not found on path)
-
-    def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42):
-        """Bootstrap CI. Fallback copy from analyze-v2.py."""
-        values = np.asarray(values, dtype=float)
-        n = len(values)
-        if n == 0:
-            return {"point_estimate": float("nan"), "ci_lower": float("nan"),
-                    "ci_upper": float("nan"), "ci_level": ci, "n": 0,
-                    "n_resamples": n_resamples}
-        rng = np.random.default_rng(seed)
-        point = float(stat_fn(values))
-        indices = rng.integers(0, n, size=(n_resamples, n))
-        stats = np.apply_along_axis(stat_fn, 1, values[indices])
-        alpha = 1.0 - ci
-        return {"point_estimate": point,
-                "ci_lower": float(np.percentile(stats, 100 * alpha / 2)),
-                "ci_upper": float(np.percentile(stats, 100 * (1 - alpha / 2))),
-                "ci_level": ci, "n": n, "n_resamples": n_resamples}
-
-    def _ncdf(z):
-        return 0.5 * math.erfc(-z / math.sqrt(2))
-
-    def _rank_ties(values):
-        arr = np.asarray(values, dtype=float)
-        n, order = len(arr), np.argsort(arr)
-        ranks = np.empty(n, dtype=float)
-        i = 0
-        while i < n:
-            j = i + 1
-            while j < n and arr[order[j]] == arr[order[i]]:
-                j += 1
-            for k in range(i, j):
-                ranks[order[k]] = (i + 1 + j) / 2.0
-            i = j
-        return ranks
-
-    def wilcoxon_signed_rank(x, y):
-        """Wilcoxon signed-rank. Fallback copy from analyze-v2.py."""
-        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
-        if len(x) != len(y):
-            raise ValueError(f"Length mismatch: {len(x)} vs {len(y)}")
-        d = x - y
-        d_nz = d[d != 0]
-        n = len(d_nz)
-        if n == 0:
-            return {"T_plus": 0.0, "T_minus": 0.0, "T_stat": 0.0,
-                    "n_nonzero": 0, "z_stat": float("nan"),
-                    "p_value": 1.0, "sufficient": False,
-                    "method": "no_nonzero_differences"}
-        ranks = _rank_ties(np.abs(d_nz))
-        t_plus = float(np.sum(ranks[d_nz > 0]))
-        t_minus = float(np.sum(ranks[d_nz < 0]))
-        t_stat = min(t_plus, t_minus)
-        if n < 10:
-            return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                    "n_nonzero": n, "z_stat": float("nan"),
-                    "p_value": float("nan"), "sufficient": False,
-                    "method": "insufficient_sample_size"}
-        mean_t = n * (n + 1) / 4.0
-        var_t = n * (n + 1) * (2 * n + 1) / 24.0
-        _, counts = np.unique(np.abs(d_nz), return_counts=True)
-        var_t -= sum(c * (c**2 - 1) / 48.0 for c in counts if c > 1)
-        if var_t <= 0:
-            return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                    "n_nonzero": n, "z_stat": 0.0, "p_value": 1.0,
-                    "sufficient": True, "method": "normal_approximation_degenerate"}
-        z = (t_stat - mean_t) / math.sqrt(var_t)
-        return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                "n_nonzero": n, "z_stat": round(z, 4),
-                "p_value": round(2.0 * (1.0 - _ncdf(abs(z))), 6),
-                "sufficient": True, "method": "normal_approximation"}
+    load_found_tensor = _v2.load_found_tensor
 
 
 # ---------------------------------------------------------------------------
@@ -264,6 +206,17 @@ def _build_paired_arrays(by_cycle):
     )
 
 
+def _stdev_ratio(n_paired, mean_a, mean_b, stdev_a, stdev_b):
+    """Larger condition stdev over the pooled mean (inf when the mean is ~0).
+
+    Elementwise over arrays, e.g. one value per simulated study in --plan.
+    """
+    pooled = np.abs(np.where(np.asarray(n_paired) > 0, (np.asarray(mean_a) + mean_b) / 2, 1.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.maximum(stdev_a, stdev_b) / pooled
+    return np.where(pooled > 1e-9, ratio, np.inf)
+
+
 def _compute_primary_stats(n_paired, spec_arr, gen_arr, delta):
     """Compute descriptive statistics, Wilcoxon, and bootstrap CI.
 
@@ -276,8 +229,7 @@ def _compute_primary_stats(n_paired, spec_arr, gen_arr, delta):
     mean_g = float(np.mean(gen_arr)) if n_paired > 0 else nan
     stdev_s = float(np.std(spec_arr, ddof=1)) if n_paired > 1 else 0.0
     stdev_g = float(np.std(gen_arr, ddof=1)) if n_paired > 1 else 0.0
-    pooled = (mean_s + mean_g) / 2 if n_paired > 0 else 1
-    stdev_ratio = max(stdev_s, stdev_g) / abs(pooled) if abs(pooled) > 1e-9 else float("inf")
+    stdev_ratio = float(_stdev_ratio(n_paired, mean_s, mean_g, stdev_s, stdev_g))
 
     wsr = wilcoxon_signed_rank(spec_arr, gen_arr)
     delta_ci = bootstrap_ci(delta, stat_fn=np.mean) if n_paired > 0 else bootstrap_ci([])
@@ -333,12 +285,14 @@ def _determine_verdict(mean_delta, delta_ci, wilcoxon, delta_fp, delta_recall):
 
 
 def _determine_decision_class(n_paired, parse_rate, stdev_ratio):
-    """Apply decision class rules from plan §Task 7 Step 3."""
-    if n_paired >= 15 and parse_rate <= 0.05 and stdev_ratio <= 0.35:
-        return "VERIFIED"
-    if n_paired >= 10 and parse_rate <= 0.10:
-        return "OBSERVED"
-    return "INCONCLUSIVE"
+    """Apply decision class rules from plan §Task 7 Step 3.
+
+    Elementwise over arrays, e.g. one class per simulated study in --plan.
+    """
+    n_paired, parse_rate = np.asarray(n_paired), np.asarray(parse_rate)
+    verified = (n_paired >= 15) & (parse_rate <= 0.05) & (np.asarray(stdev_ratio) <= 0.35)
+    observed = (n_paired >= 10) & (parse_rate <= 0.10)
+    return np.where(verified, "VERIFIED", np.where(observed, "OBSERVED", "INCONCLUSIVE"))
 
 
 def analyze_primary(aggregates_rows, scores_rows):
@@ -374,7 +328,7 @@ def analyze_primary(aggregates_rows, scores_rows):
     delta_recall = mean_rec_s - mean_rec_g
 
     verdict = _determine_verdict(scores["mean_delta"], delta_ci, wsr, delta_fp, delta_recall)
-    decision_class = _determine_decision_class(n_paired, parse_rate, stdev_ratio)
+    decision_class = str(_determine_decision_class(n_paired, parse_rate, stdev_ratio))
 
     return {
         "n_paired": n_paired,
@@ -395,55 +349,109 @@ def analyze_primary(aggregates_rows, scores_rows):
             "delta_recall": round(delta_recall, 4),
         },
         "wilcoxon": wsr,
+        "permutation": _v2.sign_flip_test(delta),
         "bootstrap_ci_delta": delta_ci,
         "verdict": verdict,
         "decision_class": decision_class,
     }
 
 
+# ---------------------------------------------------------------------------
+# Interim analysis (group-sequential early stopping)
+# ---------------------------------------------------------------------------
+
+# Planned paired cycles (NUM_CYCLES in test-decorrelated-v3.sh)
+PLANNED_CYCLES = 15
+
+
+def analyze_interim(aggregates_rows, scores_rows, planned, effect_size):
+    """Group-sequential interim analysis on the cycles completed so far.
+
+    Applies the pre-registered boundaries of analyze-v2.py interim_analysis
+    (O'Brien-Fleming-type alpha and beta spending, one look per paired
+    cycle) to the per-cycle aggregate delta_score (specialist - generalist), and
+    adds the verdict the full analysis would give at this look.
+
+    Args:
+        aggregates_rows: Rows from aggregates.csv.
+        scores_rows: Rows from scores.csv.
+        planned: Planned number of paired cycles.
+        effect_size: Alternative standardized effect for the futility bound.
+
+    Returns:
+        dict from interim_analysis plus verdict and decision_class.
+    """
+    by_cycle = _group_aggregate_rows(aggregates_rows)
+    _, spec_arr, gen_arr, *_ = _build_paired_arrays(by_cycle)
+    interim = _v2.interim_analysis(spec_arr - gen_arr, planned, effect_size=effect_size)
+    primary = analyze_primary(aggregates_rows, scores_rows)
+    interim["verdict"] = primary["verdict"]
+    interim["decision_class"] = primary["decision_class"]
+    return interim
+
+
+# ---------------------------------------------------------------------------
+# Sample-size planning (simulated studies from observed cycles)
+# ---------------------------------------------------------------------------
+
+def _cycle_arrays(aggregates_rows, scores_rows):
+    """Per-cycle specialist/generalist scores (NaN if unpaired), runs and parse failures."""
+    by_cycle = _group_aggregate_rows(aggregates_rows)
+    runs, failures = defaultdict(int), defaultdict(int)
+    for row in scores_rows:
+        runs[row["cycle"]] += 1
+        failures[row["cycle"]] += not _parse_ok(row)
+
+    cycles = sorted(set(by_cycle) | set(runs), key=_sort_key)
+    treatment, baseline = [], []
+    for cycle in cycles:
+        data = by_cycle.get(cycle, {})
+        specialist, generalist = data.get("specialist"), data.get("generalist")
+        paired = specialist is not None and generalist is not None
+        treatment.append(specialist["score"] if paired else float("nan"))
+        baseline.append(generalist["score"] if paired else float("nan"))
+    return (np.array(treatment), np.array(baseline),
+            np.array([runs[c] for c in cycles]), np.array([failures[c] for c in cycles]))
+
+
 # ---------------------------------------------------------------------------
 # Per-domain analysis (descriptive — 3 bugs per domain)
 # ---------------------------------------------------------------------------
 
-def _domain_union_recalls(by_cycle_cond, bug_ids):
+def _domain_union_recalls(tensor, bug_ids):
     """Compute per-cycle union recall for specialist and generalist for bug_ids.
 
+    Only cycles with at least one parsed row in both conditions count.
+
     Returns:
         tuple: (spec_recalls list, gen_recalls list)
     """
-    n = len(bug_ids)
-    spec_recalls, gen_recalls = [], []
-    for cycle in sorted(by_cycle_cond.keys(), key=_sort_key):
-        spec_ent = by_cycle_cond[cycle].get("specialist", [])
-        gen_ent = by_cycle_cond[cycle].get("generalist", [])
-        if not spec_ent or not gen_ent:
-            continue
-        spec_found = {b: any(e.get(b, {}).get("found", False) for e in spec_ent)
-                      for b in bug_ids}
-        gen_found = {b: any(e.get(b, {}).get("found", False) for e in gen_ent)
-                     for b in bug_ids}
-        spec_recalls.append(sum(spec_found.values()) / n)
-        gen_recalls.append(sum(gen_found.values()) / n)
-    return spec_recalls, gen_recalls
-
-
-def analyze_per_domain(scores_rows):
+    conditions = tensor["conditions"]
+    if "specialist" not in conditions or "generalist" not in conditions:
+        return [], []
+    spec_k, gen_k = conditions.index("specialist"), conditions.index("generalist")
+    cols = [tensor["areas"].index(b) for b in bug_ids]
+    present = tensor["present"]
+    keep = present[:, spec_k].any(axis=1) & present[:, gen_k].any(axis=1)
+    # Union over reviewers, then recall over the domain's bugs: (cycles, conditions)
+    recalls = tensor["found"][keep][:, :, :, cols].any(axis=2).mean(axis=2)
+    return recalls[:, spec_k].tolist(), recalls[:, gen_k].tolist()
+
+
+def analyze_per_domain(tensor):
     """Compute per-domain recall for specialist vs generalist (union rule).
 
     Descriptive stats only — 3 bugs per domain is too few for formal testing.
 
+    Args:
+        tensor: Found tensor from load_found_tensor(scores_rows, AREA_IDS).
+
     Returns:
         dict: {domain: {recall_specialist, recall_generalist, delta_recall, ...}}
     """
-    by_cycle_cond = defaultdict(lambda: defaultdict(list))
-    for row in scores_rows:
-        per_area = _safe_parse_area(row)
-        if per_area is not None:
-            by_cycle_cond[row["cycle"]][row["condition"]].append(per_area)
-
     results = {}
     for domain, bug_ids in DOMAINS.items():
-        spec_r, gen_r = _domain_union_recalls(by_cycle_cond, bug_ids)
+        spec_r, gen_r = _domain_union_recalls(tensor, bug_ids)
         spec_arr = np.array(spec_r, dtype=float)
         gen_arr = np.array(gen_r, dtype=float)
         mean_s = float(np.mean(spec_arr)) if len(spec_arr) > 0 else float("nan")
@@ -467,74 +475,49 @@ def analyze_per_domain(scores_rows):
 # Individual reviewer analysis helpers
 # ---------------------------------------------------------------------------
 
-def _parse_reviewer_entries(scores_rows):
-    """Return list of {cycle, condition, reviewer, per_area} for parsed rows."""
-    entries = []
-    for row in scores_rows:
-        per_area = _safe_parse_area(row)
-        if per_area is None:
-            continue
-        try:
-            reviewer_num = int(row.get("reviewer", 0))
-        except (ValueError, TypeError):
-            reviewer_num = 0
-        entries.append({
-            "cycle": row["cycle"],
-            "condition": row["condition"],
-            "reviewer": reviewer_num,
-            "per_area": per_area,
-        })
-    return entries
-
-
-def _reviewer_recalls_for_domain(entries, reviewer_num, bug_ids):
+def _reviewer_recalls_for_domain(tensor, reviewer_num, bug_ids):
     """Compute per-cycle recall arrays for one specialist reviewer vs generalists.
 
+    Only cycles where the specialist reviewer parsed and at least one
+    generalist parsed count. The generalist value is the mean of the
+    parsed generalists' individual recalls.
+
     Returns:
         tuple: (spec_recalls list, gen_recalls list)
     """
-    n = len(bug_ids)
-    spec_by_cycle = defaultdict(list)
-    gen_by_cycle = defaultdict(list)
-    for e in entries:
-        if e["condition"] == "specialist" and e["reviewer"] == reviewer_num:
-            spec_by_cycle[e["cycle"]].append(e["per_area"])
-        elif e["condition"] == "generalist":
-            gen_by_cycle[e["cycle"]].append(e["per_area"])
-
-    spec_recalls, gen_recalls = [], []
-    for cycle in sorted(spec_by_cycle.keys(), key=_sort_key):
-        spec_ent = spec_by_cycle[cycle]
-        spec_count = sum(
-            1 for b in bug_ids
-            if any(e.get(b, {}).get("found", False) for e in spec_ent)
-        )
-        gen_ent = gen_by_cycle.get(cycle, [])
-        if not gen_ent:
-            continue
-        gen_per = [
-            sum(1 for b in bug_ids if e.get(b, {}).get("found", False)) / n
-            for e in gen_ent
-        ]
-        spec_recalls.append(spec_count / n)
-        gen_recalls.append(float(np.mean(gen_per)))
-    return spec_recalls, gen_recalls
-
-
-def analyze_individual_reviewers(scores_rows):
+    conditions, reviewers = tensor["conditions"], tensor["reviewers"]
+    if ("specialist" not in conditions or "generalist" not in conditions
+            or reviewer_num not in reviewers):
+        return [], []
+    spec_k, gen_k = conditions.index("specialist"), conditions.index("generalist")
+    r = reviewers.index(reviewer_num)
+    cols = [tensor["areas"].index(b) for b in bug_ids]
+    found, present = tensor["found"], tensor["present"]
+
+    keep = present[:, spec_k, r] & present[:, gen_k].any(axis=1)
+    spec = found[keep, spec_k, r][:, cols].mean(axis=1)
+    gen_present = present[keep, gen_k]
+    gen_recalls = found[keep, gen_k][:, :, cols].mean(axis=2)
+    gen = (gen_recalls * gen_present).sum(axis=1) / gen_present.sum(axis=1)
+    return spec.tolist(), gen.tolist()
+
+
+def analyze_individual_reviewers(tensor):
     """Compare each specialist's in-domain recall vs mean generalist recall.
 
     Reviewer N (specialist) maps to domain N per REVIEWER_DOMAIN.
     Generalist baseline is mean per-reviewer recall (not union) for the domain.
 
+    Args:
+        tensor: Found tensor from load_found_tensor(scores_rows, AREA_IDS).
+
     Returns:
         dict: {reviewer_N: {domain, mean_specialist_in_domain_recall, ...}}
     """
-    entries = _parse_reviewer_entries(scores_rows)
     results = {}
     for reviewer_num, domain in REVIEWER_DOMAIN.items():
         bug_ids = DOMAINS[domain]
-        spec_r, gen_r = _reviewer_recalls_for_domain(entries, reviewer_num, bug_ids)
+        spec_r, gen_r = _reviewer_recalls_for_domain(tensor, reviewer_num, bug_ids)
         spec_arr = np.array(spec_r, dtype=float)
         gen_arr = np.array(gen_r, dtype=float)
         mean_s = float(np.mean(spec_arr)) if len(spec_arr) > 0 else float("nan")
@@ -606,11 +589,18 @@ def _print_primary_section(primary):
     print("\nWilcoxon signed-rank (specialist vs generalist):")
     print(f"  T+ = {w['T_plus']:.1f},  T- = {w['T_minus']:.1f},  T = {w['T_stat']:.1f}")
     print(f"  n_nonzero = {w['n_nonzero']},  method = {w['method']}")
-    if w["sufficient"]:
+    if w["method"] == "exact":
+        print(f"  exact p = {w['p_value']:.6f}")
+    elif w["sufficient"]:
         print(f"  z = {w['z_stat']:.4f},  p = {w['p_value']:.6f}")
     else:
         print("  Insufficient sample for normal approximation")
 
+    perm = primary["permutation"]
+    print(f"\nSign-flip permutation test ({perm['method']}, "
+          f"{perm['n_permutations']:,} flips):")
+    print(f"  p = {perm['p_value']:.6f}")
+
     print("\nBootstrap 95% CI on mean delta_score (specialist - generalist):")
     print(f"  [{ci['ci_lower']:.4f}, {ci['ci_upper']:.4f}]")
     ci_excl = (ci["ci_lower"] > 0 or ci["ci_upper"] < 0)
@@ -680,6 +670,59 @@ def _print_report(primary, domain, individual, cost):
     print("\n" + "=" * 65)
 
 
+def _print_interim_report(interim):
+    """Print group-sequential interim report; the last line is the decision."""
+    print("\n" + "=" * 65)
+    print(" V3 INTERIM ANALYSIS (group-sequential)")
+    print("=" * 65)
+    print(f"\nPaired cycles: {interim['n']} of {interim['planned']} planned "
+          f"(information {interim['information']:.0%})")
+    print(f"Design: O'Brien-Fleming-type spending, one-sided alpha {interim['alpha']}, "
+          f"power {1 - interim['beta']:.0%} at d_z = {interim['effect_size']}")
+
+    current = min(interim["n"], interim["planned"])
+    print(f"\n{'Look':>5} {'Info':>6} {'Futility z':>11} {'Efficacy z':>11}")
+    print("-" * 36)
+    for look in interim["boundaries"]:
+        marker = "  <- now" if look["look"] == current else ""
+        print(f"{look['look']:>5} {look['information']:>6.0%} {look['futility_z']:>11.3f} "
+              f"{look['efficacy_z']:>11.3f}{marker}")
+
+    print(f"\nMean delta_score (specialist - generalist): {interim['mean_delta']:+.2f}")
+    if interim["futility_z"] == interim["efficacy_z"]:
+        bounds = f"final look: confirmed if z >= {interim['efficacy_z']:.3f}"
+    else:
+        bounds = f"continue while {interim['futility_z']:.3f} < z < {interim['efficacy_z']:.3f}"
+    print(f"Sign-flip z: {interim['z_stat']:.3f}  ({bounds})")
+    print(f"Verdict at this look: {interim['verdict']} ({interim['decision_class']})")
+    print(f"\nDecision: {interim['decision']}")
+
+
+def _print_plan_report(plan):
+    """Print the simulated sample-size plan."""
+    print("\n" + "=" * 65)
+    print(" V3 SAMPLE-SIZE PLAN (simulated from observed cycles)")
+    print("=" * 65)
+    print(f"\nObserved cycles: {plan['observed_cycles']} ({plan['observed_paired']} paired)")
+    print(f"Simulated studies per size: {plan['n_studies']:,}")
+
+    print(f"\n{'Cycles':>6} {'P(VERIFIED)':>12} {'P(>=OBSERVED)':>14} "
+          f"{'Paired':>7} {'Stdev ratio':>12}")
+    print("-" * 55)
+    for size in plan["sizes"]:
+        marker = "  <- recommended" if size["cycles"] == plan["recommended"] else ""
+        print(f"{size['cycles']:>6} {size['p_verified']:>12.1%} "
+              f"{size['p_observed_or_better']:>14.1%} {size['median_n_paired']:>7.0f} "
+              f"{size['median_stdev_ratio']:>12.3f}{marker}")
+
+    if plan["recommended"] is None:
+        print(f"\nVERIFIED is not reached with probability >= {plan['target']:.0%} "
+              f"within {len(plan['sizes'])} cycles")
+    else:
+        print(f"\nSmallest run reaching VERIFIED with probability >= {plan['target']:.0%}: "
+              f"{plan['recommended']} cycles")
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -687,10 +730,18 @@ def _print_report(primary, domain, individual, cost):
 def main():
     """CLI entry point.
 
-    Usage: python3 analyze-v3.py <scores.csv> <aggregates.csv>
+    Usage: python3 analyze-v3.py <scores.csv> <aggregates.csv> [--no-cache]
+               [--interim [--planned-cycles N] [--effect-size D]]
+               [--plan [--target P] [--max-cycles N] [--studies N]]
     """
+    if _v2 is None:
+        print("ERROR: analyze-v3.py needs analyze-v2.py next to this script")
+        sys.exit(1)
+    _v2.take_no_cache_flag(sys.argv)
     if len(sys.argv) < 3:
-        print("Usage: python3 analyze-v3.py <scores.csv> <aggregates.csv>")
+        print("Usage: python3 analyze-v3.py <scores.csv> <aggregates.csv> [--no-cache]")
+        print("         [--interim [--planned-cycles N] [--effect-size D]]")
+        print("         [--plan [--target P] [--max-cycles N] [--studies N]]")
         sys.exit(1)
 
     scores_path, aggregates_path = sys.argv[1], sys.argv[2]
@@ -708,9 +759,31 @@ def main():
         print("ERROR: aggregates.csv has no data rows")
         sys.exit(1)
 
+    options = sys.argv[3:]
+    if "--interim" in options:
+        planned = _v2._option(options, "--planned-cycles", PLANNED_CYCLES, int)
+        effect_size = _v2._option(options, "--effect-size", _v2.SEQUENTIAL_EFFECT_SIZE, float)
+        if planned < 1 or effect_size <= 0:
+            print("ERROR: --planned-cycles and --effect-size must be positive")
+            sys.exit(1)
+        _print_interim_report(analyze_interim(aggregates_rows, scores_rows, planned, effect_size))
+        return
+    if "--plan" in options:
+        target = _v2._option(options, "--target", _v2.PLAN_TARGET, float)
+        max_cycles = _v2._option(options, "--max-cycles", _v2.PLAN_MAX_CYCLES, int)
+        n_studies = _v2._option(options, "--studies", _v2.PLAN_STUDIES, int)
+        if not 0 < target <= 1 or max_cycles < 1 or n_studies < 1:
+            print("ERROR: --target must be in (0, 1]; --max-cycles and --studies positive")
+            sys.exit(1)
+        _print_plan_report(_v2.plan_sample_size(
+            *_cycle_arrays(aggregates_rows, scores_rows), _stdev_ratio,
+            _determine_decision_class, target, max_cycles, n_studies))
+        return
+
     primary = analyze_primary(aggregates_rows, scores_rows)
-    domain = analyze_per_domain(scores_rows)
-    individual = analyze_individual_reviewers(scores_rows)
+    found = load_found_tensor(scores_rows, AREA_IDS)
+    domain = analyze_per_domain(found)
+    individual = analyze_individual_reviewers(found)
     cost = summarize_cost(aggregates_rows, scores_rows)
 
     _print_report(primary, domain, individual, cost)
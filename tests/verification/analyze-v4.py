@@ -9,17 +9,29 @@ test-mixed-model-v4.sh. Computes:
   - Bootstrap 95% CI on mean aggregate delta_score
   - CONFIRMED / PARTIAL / DENIED / INCONCLUSIVE verdict
   - VERIFIED / OBSERVED / INCONCLUSIVE decision class
+  - Group-sequential interim decision (--interim): CONTINUE /
+    STOP-CONFIRMED / STOP-FUTILE after each cycle
+  - Sample-size plan (--plan): smallest cycle count reaching VERIFIED
+    with a target probability, simulated from the observed cycles
   - Unique-find analysis (bugs found only by Opus reviewer per cycle)
   - Cost analysis (Opus ~5x Sonnet per token)
   - JSON summary output to <aggregates_dir>/mixed-model-v4-summary.json
 
 Usage:
-    python3 analyze-v4.py <scores.csv> <aggregates.csv>
+    python3 analyze-v4.py <scores.csv> <aggregates.csv> [--no-cache]
+    python3 analyze-v4.py <scores.csv> <aggregates.csv> --interim \
+        [--planned-cycles N] [--effect-size D]
+    python3 analyze-v4.py <scores.csv> <aggregates.csv> --plan \
+        [--target P] [--max-cycles N] [--studies N]
+
+--no-cache recomputes bootstrap and permutation results instead of reading
+them from analyze-v2.py's on-disk result cache.
 
 Dependencies: numpy (2.1.0). No scipy required.
 
-Statistical primitives (wilcoxon_signed_rank, bootstrap_ci) are imported
-from analyze-v2.py via importlib since the filename is hyphenated.
+Statistical primitives (wilcoxon_signed_rank, bootstrap_ci, sign_flip_test)
+are imported from analyze-v2.py via importlib since the filename is
+hyphenated; the script exits with an error when analyze-v2.py is missing.
 """
 
 import csv
@@ -49,6 +61,8 @@ def _load_analyze_v2():
         if path.exists():
             spec = importlib.util.spec_from_file_location("analyze_v2", path)
             mod = importlib.util.module_from_spec(spec)
+            # Registered so process-pool workers can unpickle its functions
+            sys.modules["analyze_v2"] = mod
             spec.loader.exec_module(mod)
             return mod
     return None
@@ -58,79 +72,7 @@ _v2 = _load_analyze_v2()
 if _v2 is not None:
     wilcoxon_signed_rank = _v2.wilcoxon_signed_rank
     bootstrap_ci = _v2.bootstrap_ci
-else:
-    # Fallback: minimal local copies (analyze-v2.py not found on path)
-
-    def bootstrap_ci(values, stat_fn=np.median, n_resamples=10_000, ci=0.95, seed=42):
-        """Bootstrap CI. Fallback copy from analyze-v2.py."""
-        values = np.asarray(values, dtype=float)
-        n = len(values)
-        if n == 0:
-            return {"point_estimate": float("nan"), "ci_lower": float("nan"),
-                    "ci_upper": float("nan"), "ci_level": ci, "n": 0,
-                    "n_resamples": n_resamples}
-        rng = np.random.default_rng(seed)
-        point = float(stat_fn(values))
-        indices = rng.integers(0, n, size=(n_resamples, n))
-        stats = np.apply_along_axis(stat_fn, 1, values[indices])
-        alpha = 1.0 - ci
-        return {"point_estimate": point,
-                "ci_lower": float(np.percentile(stats, 100 * alpha / 2)),
-                "ci_upper": float(np.percentile(stats, 100 * (1 - alpha / 2))),
-                "ci_level": ci, "n": n, "n_resamples": n_resamples}
-
-    def _ncdf(z):
-        return 0.5 * math.erfc(-z / math.sqrt(2))
-
-    def _rank_ties(values):
-        arr = np.asarray(values, dtype=float)
-        n, order = len(arr), np.argsort(arr)
-        ranks = np.empty(n, dtype=float)
-        i = 0
-        while i < n:
-            j = i + 1
-            while j < n and arr[order[j]] == arr[order[i]]:
-                j += 1
-            for k in range(i, j):
-                ranks[order[k]] = (i + 1 + j) / 2.0
-            i = j
-        return ranks
-
-    def wilcoxon_signed_rank(x, y):
-        """Wilcoxon signed-rank. Fallback copy from analyze-v2.py."""
-        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
-        if len(x) != len(y):
-            raise ValueError(f"Length mismatch: {len(x)} vs {len(y)}")
-        d = x - y
-        d_nz = d[d != 0]
-        n = len(d_nz)
-        if n == 0:
-            return {"T_plus": 0.0, "T_minus": 0.0, "T_stat": 0.0,
-                    "n_nonzero": 0, "z_stat": float("nan"),
-                    "p_value": 1.0, "sufficient": False,
-                    "method": "no_nonzero_differences"}
-        ranks = _rank_ties(np.abs(d_nz))
-        t_plus = float(np.sum(ranks[d_nz > 0]))
-        t_minus = float(np.sum(ranks[d_nz < 0]))
-        t_stat = min(t_plus, t_minus)
-        if n < 10:
-            return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                    "n_nonzero": n, "z_stat": float("nan"),
-                    "p_value": float("nan"), "sufficient": False,
-                    "method": "insufficient_sample_size"}
-        mean_t = n * (n + 1) / 4.0
-        var_t = n * (n + 1) * (2 * n + 1) / 24.0
-        _, counts = np.unique(np.abs(d_nz), return_counts=True)
-        var_t -= sum(c * (c**2 - 1) / 48.0 for c in counts if c > 1)
-        if var_t <= 0:
-            return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                    "n_nonzero": n, "z_stat": 0.0, "p_value": 1.0,
-                    "sufficient": True, "method": "normal_approximation_degenerate"}
-        z = (t_stat - mean_t) / math.sqrt(var_t)
-        return {"T_plus": t_plus, "T_minus": t_minus, "T_stat": t_stat,
-                "n_nonzero": n, "z_stat": round(z, 4),
-                "p_value": round(2.0 * (1.0 - _ncdf(abs(z))), 6),
-                "sufficient": True, "method": "normal_approximation"}
+    load_found_tensor = _v2.load_found_tensor
 
 
 # ---------------------------------------------------------------------------
@@ -240,6 +182,17 @@ def _build_paired_arrays(by_cycle):
     )
 
 
+def _stdev_ratio(n_paired, mean_a, mean_b, stdev_a, stdev_b):
+    """Larger condition stdev over the pooled mean (inf when the mean is ~0).
+
+    Elementwise over arrays, e.g. one value per simulated study in --plan.
+    """
+    pooled = np.abs(np.where(np.asarray(n_paired) > 0, (np.asarray(mean_a) + mean_b) / 2, 1.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.maximum(stdev_a, stdev_b) / pooled
+    return np.where(pooled > 1e-9, ratio, np.inf)
+
+
 def _compute_primary_stats(n_paired, mixed_arr, uniform_arr, delta):
     """Compute descriptive statistics, Wilcoxon, and bootstrap CI.
 
@@ -252,8 +205,7 @@ def _compute_primary_stats(n_paired, mixed_arr, uniform_arr, delta):
     mean_u = float(np.mean(uniform_arr)) if n_paired > 0 else nan
     stdev_m = float(np.std(mixed_arr, ddof=1)) if n_paired > 1 else 0.0
     stdev_u = float(np.std(uniform_arr, ddof=1)) if n_paired > 1 else 0.0
-    pooled = (mean_m + mean_u) / 2 if n_paired > 0 else 1
-    stdev_ratio = max(stdev_m, stdev_u) / abs(pooled) if abs(pooled) > 1e-9 else float("inf")
+    stdev_ratio = float(_stdev_ratio(n_paired, mean_m, mean_u, stdev_m, stdev_u))
 
     wsr = wilcoxon_signed_rank(mixed_arr, uniform_arr)
     delta_ci = bootstrap_ci(delta, stat_fn=np.mean) if n_paired > 0 else bootstrap_ci([])
@@ -309,12 +261,14 @@ def _determine_verdict(mean_delta, delta_ci, wilcoxon, delta_fp, delta_recall):
 
 
 def _determine_decision_class(n_paired, parse_rate, stdev_ratio):
-    """Apply decision class rules."""
-    if n_paired >= 15 and parse_rate <= 0.05 and stdev_ratio <= 0.35:
-        return "VERIFIED"
-    if n_paired >= 10 and parse_rate <= 0.10:
-        return "OBSERVED"
-    return "INCONCLUSIVE"
+    """Apply decision class rules.
+
+    Elementwise over arrays, e.g. one class per simulated study in --plan.
+    """
+    n_paired, parse_rate = np.asarray(n_paired), np.asarray(parse_rate)
+    verified = (n_paired >= 15) & (parse_rate <= 0.05) & (np.asarray(stdev_ratio) <= 0.35)
+    observed = (n_paired >= 10) & (parse_rate <= 0.10)
+    return np.where(verified, "VERIFIED", np.where(observed, "OBSERVED", "INCONCLUSIVE"))
 
 
 def analyze_primary(aggregates_rows, scores_rows):
@@ -350,7 +304,7 @@ def analyze_primary(aggregates_rows, scores_rows):
     delta_recall = mean_rec_m - mean_rec_u
 
     verdict = _determine_verdict(scores["mean_delta"], delta_ci, wsr, delta_fp, delta_recall)
-    decision_class = _determine_decision_class(n_paired, parse_rate, stdev_ratio)
+    decision_class = str(_determine_decision_class(n_paired, parse_rate, stdev_ratio))
 
     return {
         "n_paired": n_paired,
@@ -371,6 +325,7 @@ def analyze_primary(aggregates_rows, scores_rows):
             "delta_recall": round(delta_recall, 4),
         },
         "wilcoxon": wsr,
+        "permutation": _v2.sign_flip_test(delta),
         "bootstrap_ci_delta": delta_ci,
         "verdict": verdict,
         "decision_class": decision_class,
@@ -378,69 +333,109 @@ def analyze_primary(aggregates_rows, scores_rows):
 
 
 # ---------------------------------------------------------------------------
-# Unique-find analysis (bugs found only by Opus reviewer per cycle)
+# Interim analysis (group-sequential early stopping)
 # ---------------------------------------------------------------------------
 
-def _group_mixed_by_cycle(scores_rows):
-    """Group mixed-condition scores by cycle into opus/sonnet per-area dicts.
+# Planned paired cycles (NUM_CYCLES in test-mixed-model-v4.sh)
+PLANNED_CYCLES = 15
+
+
+def analyze_interim(aggregates_rows, scores_rows, planned, effect_size):
+    """Group-sequential interim analysis on the cycles completed so far.
+
+    Applies the pre-registered boundaries of analyze-v2.py interim_analysis
+    (O'Brien-Fleming-type alpha and beta spending, one look per paired
+    cycle) to the per-cycle aggregate delta_score (mixed - uniform), and
+    adds the verdict the full analysis would give at this look.
+
+    Args:
+        aggregates_rows: Rows from aggregates.csv.
+        scores_rows: Rows from scores.csv.
+        planned: Planned number of paired cycles.
+        effect_size: Alternative standardized effect for the futility bound.
 
     Returns:
-        dict: {cycle: {"opus": per_area_dict, "sonnet": [per_area_dict, ...]}}
+        dict from interim_analysis plus verdict and decision_class.
     """
-    by_cycle = defaultdict(lambda: {"opus": {}, "sonnet": []})
+    by_cycle = _group_aggregate_rows(aggregates_rows)
+    _, mixed_arr, uniform_arr, *_ = _build_paired_arrays(by_cycle)
+    interim = _v2.interim_analysis(mixed_arr - uniform_arr, planned, effect_size=effect_size)
+    primary = analyze_primary(aggregates_rows, scores_rows)
+    interim["verdict"] = primary["verdict"]
+    interim["decision_class"] = primary["decision_class"]
+    return interim
+
+
+# ---------------------------------------------------------------------------
+# Sample-size planning (simulated studies from observed cycles)
+# ---------------------------------------------------------------------------
+
+def _cycle_arrays(aggregates_rows, scores_rows):
+    """Per-cycle mixed/uniform scores (NaN if unpaired), runs and parse failures."""
+    by_cycle = _group_aggregate_rows(aggregates_rows)
+    runs, failures = defaultdict(int), defaultdict(int)
     for row in scores_rows:
-        if row["condition"] != "mixed" or not _parse_ok(row):
-            continue
-        per_area = _safe_parse_area(row)
-        if per_area is None:
-            continue
-        cycle = row["cycle"]
-        reviewer = int(row["reviewer"])
-        if reviewer == 1:
-            by_cycle[cycle]["opus"] = per_area
-        else:
-            by_cycle[cycle]["sonnet"].append(per_area)
-    return by_cycle
+        runs[row["cycle"]] += 1
+        failures[row["cycle"]] += not _parse_ok(row)
 
+    cycles = sorted(set(by_cycle) | set(runs), key=_sort_key)
+    treatment, baseline = [], []
+    for cycle in cycles:
+        data = by_cycle.get(cycle, {})
+        mixed, uniform = data.get("mixed"), data.get("uniform")
+        paired = mixed is not None and uniform is not None
+        treatment.append(mixed["score"] if paired else float("nan"))
+        baseline.append(uniform["score"] if paired else float("nan"))
+    return (np.array(treatment), np.array(baseline),
+            np.array([runs[c] for c in cycles]), np.array([failures[c] for c in cycles]))
 
-def _count_unique_for_cycle(opus, sonnets):
-    """Count bugs found only by Opus and not by any Sonnet reviewer.
+
+# ---------------------------------------------------------------------------
+# Unique-find analysis (bugs found only by Opus reviewer per cycle)
+# ---------------------------------------------------------------------------
+
+def _unique_opus_finds(tensor):
+    """Bugs found by Opus (reviewer 1) and by no Sonnet, per mixed cycle.
+
+    Only cycles where Opus parsed and at least two Sonnets parsed count.
 
     Returns:
-        tuple: (unique_count, list of unique bug_ids)
+        bool array of shape (cycles, bugs)
     """
-    unique_bugs = []
-    for bug_id in REAL_BUGS:
-        opus_found = opus.get(bug_id, {}).get("found", False)
-        sonnet_found = any(s.get(bug_id, {}).get("found", False) for s in sonnets)
-        if opus_found and not sonnet_found:
-            unique_bugs.append(bug_id)
-    return len(unique_bugs), unique_bugs
+    if "mixed" not in tensor["conditions"] or 1 not in tensor["reviewers"]:
+        return np.zeros((0, len(tensor["areas"])), dtype=bool)
+    k = tensor["conditions"].index("mixed")
+    opus = tensor["reviewers"].index(1)
+    sonnets = np.arange(len(tensor["reviewers"])) != opus
+    found, present = tensor["found"][:, k], tensor["present"][:, k]
+
+    keep = present[:, opus] & (present[:, sonnets].sum(axis=1) >= 2)
+    return found[keep, opus] & ~found[keep][:, sonnets].any(axis=1)
 
 
-def analyze_unique_finds(scores_rows):
+def analyze_unique_finds(tensor):
     """Count bugs found only by Opus (reviewer 1 in mixed) per cycle.
 
     For each cycle in the mixed condition, identifies bugs that reviewer 1
     (Opus) found but neither reviewer 2 nor 3 (Sonnet) found. These are
     bugs that would not have been discovered without model mixing.
 
+    Args:
+        tensor: Found tensor from load_found_tensor(scores_rows, REAL_BUGS).
+
     Returns:
         dict with per-cycle unique find counts and summary statistics.
     """
-    by_cycle = _group_mixed_by_cycle(scores_rows)
-
-    unique_finds_per_cycle = []
-    unique_bugs_all = defaultdict(int)
-    for cycle in sorted(by_cycle.keys(), key=_sort_key):
-        opus = by_cycle[cycle]["opus"]
-        sonnets = by_cycle[cycle]["sonnet"]
-        if not opus or len(sonnets) < 2:
-            continue
-        count, bugs = _count_unique_for_cycle(opus, sonnets)
-        unique_finds_per_cycle.append(count)
-        for bug_id in bugs:
-            unique_bugs_all[bug_id] += 1
+    unique = _unique_opus_finds(tensor)
+    unique_finds_per_cycle = unique.sum(axis=1).tolist()
+    # Bugs in order of first unique find (cycle, then REAL_BUGS order)
+    counts = unique.sum(axis=0)
+    unique_bugs_all = {}
+    if counts.any():
+        first = unique.argmax(axis=0)
+        for a in np.lexsort((np.arange(len(REAL_BUGS)), first)):
+            if counts[a]:
+                unique_bugs_all[REAL_BUGS[a]] = int(counts[a])
 
     n_cycles = len(unique_finds_per_cycle)
     arr = np.array(unique_finds_per_cycle, dtype=float)
@@ -545,11 +540,18 @@ def _print_primary_section(primary):
     print("\nWilcoxon signed-rank (mixed vs uniform):")
     print(f"  T+ = {w['T_plus']:.1f},  T- = {w['T_minus']:.1f},  T = {w['T_stat']:.1f}")
     print(f"  n_nonzero = {w['n_nonzero']},  method = {w['method']}")
-    if w["sufficient"]:
+    if w["method"] == "exact":
+        print(f"  exact p = {w['p_value']:.6f}")
+    elif w["sufficient"]:
         print(f"  z = {w['z_stat']:.4f},  p = {w['p_value']:.6f}")
     else:
         print("  Insufficient sample for normal approximation")
 
+    perm = primary["permutation"]
+    print(f"\nSign-flip permutation test ({perm['method']}, "
+          f"{perm['n_permutations']:,} flips):")
+    print(f"  p = {perm['p_value']:.6f}")
+
     print("\nBootstrap 95% CI on mean delta_score (mixed - uniform):")
     print(f"  [{ci['ci_lower']:.4f}, {ci['ci_upper']:.4f}]")
     ci_excl = (ci["ci_lower"] > 0 or ci["ci_upper"] < 0)
@@ -615,6 +617,59 @@ def _print_report(primary, unique_finds, cost, sessions):
     print("\n" + "=" * 65)
 
 
+def _print_interim_report(interim):
+    """Print group-sequential interim report; the last line is the decision."""
+    print("\n" + "=" * 65)
+    print(" V4 INTERIM ANALYSIS (group-sequential)")
+    print("=" * 65)
+    print(f"\nPaired cycles: {interim['n']} of {interim['planned']} planned "
+          f"(information {interim['information']:.0%})")
+    print(f"Design: O'Brien-Fleming-type spending, one-sided alpha {interim['alpha']}, "
+          f"power {1 - interim['beta']:.0%} at d_z = {interim['effect_size']}")
+
+    current = min(interim["n"], interim["planned"])
+    print(f"\n{'Look':>5} {'Info':>6} {'Futility z':>11} {'Efficacy z':>11}")
+    print("-" * 36)
+    for look in interim["boundaries"]:
+        marker = "  <- now" if look["look"] == current else ""
+        print(f"{look['look']:>5} {look['information']:>6.0%} {look['futility_z']:>11.3f} "
+              f"{look['efficacy_z']:>11.3f}{marker}")
+
+    print(f"\nMean delta_score (mixed - uniform): {interim['mean_delta']:+.2f}")
+    if interim["futility_z"] == interim["efficacy_z"]:
+        bounds = f"final look: confirmed if z >= {interim['efficacy_z']:.3f}"
+    else:
+        bounds = f"continue while {interim['futility_z']:.3f} < z < {interim['efficacy_z']:.3f}"
+    print(f"Sign-flip z: {interim['z_stat']:.3f}  ({bounds})")
+    print(f"Verdict at this look: {interim['verdict']} ({interim['decision_class']})")
+    print(f"\nDecision: {interim['decision']}")
+
+
+def _print_plan_report(plan):
+    """Print the simulated sample-size plan."""
+    print("\n" + "=" * 65)
+    print(" V4 SAMPLE-SIZE PLAN (simulated from observed cycles)")
+    print("=" * 65)
+    print(f"\nObserved cycles: {plan['observed_cycles']} ({plan['observed_paired']} paired)")
+    print(f"Simulated studies per size: {plan['n_studies']:,}")
+
+    print(f"\n{'Cycles':>6} {'P(VERIFIED)':>12} {'P(>=OBSERVED)':>14} "
+          f"{'Paired':>7} {'Stdev ratio':>12}")
+    print("-" * 55)
+    for size in plan["sizes"]:
+        marker = "  <- recommended" if size["cycles"] == plan["recommended"] else ""
+        print(f"{size['cycles']:>6} {size['p_verified']:>12.1%} "
+              f"{size['p_observed_or_better']:>14.1%} {size['median_n_paired']:>7.0f} "
+              f"{size['median_stdev_ratio']:>12.3f}{marker}")
+
+    if plan["recommended"] is None:
+        print(f"\nVERIFIED is not reached with probability >= {plan['target']:.0%} "
+              f"within {len(plan['sizes'])} cycles")
+    else:
+        print(f"\nSmallest run reaching VERIFIED with probability >= {plan['target']:.0%}: "
+              f"{plan['recommended']} cycles")
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -622,10 +677,18 @@ def _print_report(primary, unique_finds, cost, sessions):
 def main():
     """CLI entry point.
 
-    Usage: python3 analyze-v4.py <scores.csv> <aggregates.csv>
+    Usage: python3 analyze-v4.py <scores.csv> <aggregates.csv> [--no-cache]
+               [--interim [--planned-cycles N] [--effect-size D]]
+               [--plan [--target P] [--max-cycles N] [--studies N]]
     """
+    if _v2 is None:
+        print("ERROR: analyze-v4.py needs analyze-v2.py next to this script")
+        sys.exit(1)
+    _v2.take_no_cache_flag(sys.argv)
     if len(sys.argv) < 3:
-        print("Usage: python3 analyze-v4.py <scores.csv> <aggregates.csv>")
+        print("Usage: python3 analyze-v4.py <scores.csv> <aggregates.csv> [--no-cache]")
+        print("         [--interim [--planned-cycles N] [--effect-size D]]")
+        print("         [--plan [--target P] [--max-cycles N] [--studies N]]")
         sys.exit(1)
 
     scores_path, aggregates_path = sys.argv[1], sys.argv[2]
@@ -643,8 +706,29 @@ def main():
         print("ERROR: aggregates.csv has no data rows")
         sys.exit(1)
 
+    options = sys.argv[3:]
+    if "--interim" in options:
+        planned = _v2._option(options, "--planned-cycles", PLANNED_CYCLES, int)
+        effect_size = _v2._option(options, "--effect-size", _v2.SEQUENTIAL_EFFECT_SIZE, float)
+        if planned < 1 or effect_size <= 0:
+            print("ERROR: --planned-cycles and --effect-size must be positive")
+            sys.exit(1)
+        _print_interim_report(analyze_interim(aggregates_rows, scores_rows, planned, effect_size))
+        return
+    if "--plan" in options:
+        target = _v2._option(options, "--target", _v2.PLAN_TARGET, float)
+        max_cycles = _v2._option(options, "--max-cycles", _v2.PLAN_MAX_CYCLES, int)
+        n_studies = _v2._option(options, "--studies", _v2.PLAN_STUDIES, int)
+        if not 0 < target <= 1 or max_cycles < 1 or n_studies < 1:
+            print("ERROR: --target must be in (0, 1]; --max-cycles and --studies positive")
+            sys.exit(1)
+        _print_plan_report(_v2.plan_sample_size(
+            *_cycle_arrays(aggregates_rows, scores_rows), _stdev_ratio,
+            _determine_decision_class, target, max_cycles, n_studies))
+        return
+
     primary = analyze_primary(aggregates_rows, scores_rows)
-    unique_finds = analyze_unique_finds(scores_rows)
+    unique_finds = analyze_unique_finds(load_found_tensor(scores_rows, REAL_BUGS))
     cost = analyze_cost()
     sessions = summarize_sessions(aggregates_rows, scores_rows)
 
@@ -32,6 +32,9 @@
 #   - Bootstrap 95% CI for mean aggregate delta_score
 #   - CONFIRMED requires: delta >= 1.0, CI excludes 0, p < 0.05,
 #     recall_delta >= 0.10 OR fp_delta <= -1.0
+#   - EARLY_STOP=1 runs the group-sequential interim analysis
+#     (analyze-v4.py --interim) after every cycle and stops on STOP-CONFIRMED
+#     or STOP-FUTILE
 #
 # Verdict:
 #   CONFIRMED    -- Mixed-model aggregate is statistically superior
@@ -484,6 +487,16 @@ $JSON_SUFFIX"
         # Compute union aggregate for this condition in this cycle
         compute_aggregate "$cycle" "$condition"
     done
+
+    # Optional early stopping against pre-registered group-sequential boundaries
+    if [ "${EARLY_STOP:-0}" = "1" ]; then
+        decision=$(python3 "$SCRIPT_DIR/analyze-v4.py" "$TEST_DIR/scores.csv" "$TEST_DIR/aggregates.csv" \
+            --interim --planned-cycles "$NUM_CYCLES" | tee /dev/stderr | sed -n 's/^Decision: //p') || decision=""
+        if [ "$decision" = "STOP-CONFIRMED" ] || [ "$decision" = "STOP-FUTILE" ]; then
+            echo "Stopping after cycle $cycle of $NUM_CYCLES: $decision"
+            break
+        fi
+    fi
 done
 
 # -- Step 7: Persist results before analysis --------------------------------